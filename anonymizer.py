@@ -0,0 +1,155 @@
+import os, re
+from collections import Counter
+
+# granica za chunked obradu velikih tekstova (znakova po komadu)
+ANON_CHUNK_CHARS = int(os.environ.get("ANON_CHUNK_CHARS", "262144"))
+
+# re.IGNORECASE poredi i ove znakove kao iste (pored obicnog lower()); "İ".lower() je
+# "i" + U+0307, pa tacka otpada (inace "OKRİVLJENİ" ne prolazi uslov pravila)
+_FOLD = str.maketrans({"ſ": "s", "ı": "i", "\u0307": "", "ᲀ": "в", "ᲁ": "д", "ᲂ": "о", "ᲃ": "с", "ᲄ": "т", "ᲅ": "т", "ᲆ": "ъ", "ᲇ": "ѣ"})
+_FOLD_RE = re.compile("[ſı\u0307ᲀ-ᲇ]")
+
+def _any(low, words):
+    return any(w in low for w in words)
+
+# (kategorija, regex, zamena, uslov) -- redosled je prioritet, isti kao u ranijem anonymize_sr:
+# svako pravilo radi nad rezultatom prethodnog. Uslov je jeftin potreban uslov za pogodak
+# (t = trenutni tekst, low = lower() originalnog dela, digit = ima li cifara); ako nije
+# ispunjen, regex se ne pokrece. Zamene ne uvode nove kljucne reci ni cifre.
+PII_RULES = [
+    ("EMAIL", re.compile(r'(?i)\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b'), '[EMAIL]',
+     lambda t, low, digit: "@" in t),
+    ("URL", re.compile(r'(?i)\bhttps?://\S+\b'), '[URL]',
+     lambda t, low, digit: "://" in t),
+    ("URL", re.compile(r'(?i)\bwww\.\S+\b'), '[URL]',
+     lambda t, low, digit: "www." in low),
+    ("JMBG", re.compile(r'\b\d{13}\b'), '[JMBG]',
+     lambda t, low, digit: digit),
+    ("PHONE", re.compile(r'(?x)(?<!\d)(?:\+?381|0)\s*(?:\(?\d{2,3}\)?[\s/-]*)\d{3}[\s/-]*\d{3,4}(?!\d)'), '[PHONE]',
+     lambda t, low, digit: digit),
+    ("IBAN", re.compile(r'(?i)\bRS\s*\d(?:\s*\d){19}\b'), '[IBAN]',
+     lambda t, low, digit: digit and "rs" in low),
+    ("CARD_OR_LONG_NUMBER", re.compile(r'(?<!\d)(?:\d[ -]?){13,19}(?!\d)'), '[CARD_OR_LONG_NUMBER]',
+     lambda t, low, digit: digit),
+    ("PLATE", re.compile(r'\b[A-ZČĆŠĐŽ]{1,2}\s*\d{3,4}\s*[- ]?\s*[A-ZČĆŠĐŽ]{1,2}\b'), '[PLATE]',
+     lambda t, low, digit: digit),
+    ("DOC_ID", re.compile(r'(?i)\b(ličn(?:a|e)\s+karta|lk|pasoš|putna\s+isprava|broj\s+dokumenta)\s*[:#]?\s*\w+\b'), r'\1: [DOC_ID]',
+     lambda t, low, digit: _any(low, ("karta", "lk", "pasoš", "isprava", "dokumenta"))),
+    ("ADDRESS", re.compile(r'(?i)\b(ul\.?|ulica|bulevar|булевар|bb)\s+[A-Za-zА-Яа-яČĆŠĐŽčćšđž0-9 .-]{2,}\b'), '[ADDRESS]',
+     lambda t, low, digit: _any(low, ("ul", "булевар", "bb"))),
+    ("NAME", re.compile(r'(?i)\b(tužilac|okrivljeni|okrivljena|optuženi|optužena|tuženi|tužena|tužilja|branilac|punomoćnik|puno(?:m|ć)nik|oštećeni|oštećena|svedok|svjedok|sudija|predsednik\s+veća|predsjednik\s+vijeća)\b\s*[:\-]\s*([A-ZČĆŠĐŽ][a-zčćšđž]+(?:\s+[A-ZČĆŠĐŽ][a-zčćšđž]+){1,2})'),
+     lambda m: f"{m.group(1)}: [NAME]",
+     lambda t, low, digit: (":" in t or "-" in t) and _any(low, ("tuž", "okrivljen", "optužen", "branilac", "puno", "oštećen", "svedok", "svjedok", "sudija", "predsednik", "predsjednik"))),
+    ("INITIALS", re.compile(r'\b([A-ZА-ЯČĆŠĐŽ]\.)\s*([A-ZА-ЯČĆŠĐŽ]\.)\b'), '[INITIALS]',
+     lambda t, low, digit: "." in t),
+]
+
+DIGIT_RE = re.compile(r'\d')
+
+# sredjivanje razmaka; pojedinacni razmaci se ne diraju
+SPACES_RE = re.compile(r'(?: [ \t]|\t)[ \t]*')
+NEWLINES_RE = re.compile(r'\n{3,}')
+
+# Bezbedan rez: kraj razmaka (sa bar jednim \n) posle . ! ? -- nijedno pravilo ne moze
+# da predje preko njega (osim inicijala "M." i "ul." koji se proveravaju posebno), pa
+# obrada delova daje isti rezultat kao obrada celog teksta.
+CUT_RE = re.compile(r'[.!?][^\S\n]*\n\s*')
+
+
+_INITIAL = set("ABCDEFGHIJKLMNOPQRSTUVWXYZАБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯČĆŠĐŽ")
+
+
+class Anonymizer:
+    """Basic Serbian PII scrubber (best-effort). NOT perfect; safety net.
+
+    Isti izlaz kao ranija anonymize_sr (pravila redom, pa sredjivanje razmaka), ali:
+    regexi su kompajlirani jednom, tekst se deli na delove na bezbednim granicama i
+    pravilo se izvrsava nad delom samo ako je njegov jeftin uslov ispunjen.
+    counts broji zamene po kategoriji (zbirno za sve obradjene tekstove).
+    """
+
+    def __init__(self, chunk_chars: int = ANON_CHUNK_CHARS):
+        self.chunk_chars = chunk_chars
+        self.counts = Counter()
+
+    def cut_ok(self, t: str, m: re.Match) -> bool:
+        # inicijal "X." ili "ul." ispred preloma (znak ispred moze postati granica reci posle zamene)
+        i = m.start()
+        if t[i] != "." or i == 0:
+            return True
+        if t[i - 1] in _INITIAL:
+            return False
+        return t[i - 2:i].lower() != "ul"
+
+    def scrub(self, seg: str) -> str:
+        low = seg.lower()
+        if _FOLD_RE.search(low):
+            low = low.translate(_FOLD)
+        digit = DIGIT_RE.search(seg) is not None
+        for cat, pat, repl, cond in PII_RULES:
+            if cond(seg, low, digit):
+                seg, n = pat.subn(repl, seg)
+                if n:
+                    self.counts[cat] += n
+        return seg
+
+    def scrub_piece(self, piece: str) -> str:
+        out, start = [], 0
+        for m in CUT_RE.finditer(piece):
+            if m.end() < len(piece) and self.cut_ok(piece, m):
+                out.append(self.scrub(piece[start:m.end()]))
+                start = m.end()
+        out.append(self.scrub(piece[start:]))
+        return "".join(out)
+
+    def next_cut(self, t: str, pos: int):
+        # prvi bezbedan rez posle pos + chunk_chars; razmak mora biti zavrsen (iza njega nije kraj bafera)
+        for m in CUT_RE.finditer(t, pos + self.chunk_chars):
+            if m.end() == len(t):
+                return None
+            if self.cut_ok(t, m):
+                return m.end()
+        return None
+
+    def stream(self, pieces):
+        """Chunked anonimizacija: pieces su uzastopni delovi teksta, izlaz su delovi rezultata.
+        U memoriji je ~2*chunk_chars ulaza (plus deo do sledeceg bezbednog reza)."""
+        it = iter(pieces)
+        buf, pos, first, ended = "", 0, True, False
+        while True:
+            cut = self.next_cut(buf, pos)
+            if cut is None:
+                if not ended:
+                    parts, n = [buf[pos:]], 0
+                    for piece in it:
+                        parts.append(piece.replace("\u00a0", " "))
+                        n += len(piece)
+                        if n >= self.chunk_chars:
+                            break
+                    else:
+                        ended = True
+                    buf, pos = "".join(parts), 0
+                    continue
+                cut = len(buf)
+            out = NEWLINES_RE.sub("\n\n", SPACES_RE.sub(" ", self.scrub_piece(buf[pos:cut])))
+            if first:
+                out, first = out.lstrip(), False
+            if cut == len(buf):
+                out = out.rstrip()
+            if out:
+                yield out
+            if cut == len(buf):
+                return
+            pos = cut
+
+    def anonymize(self, text: str) -> str:
+        if not text:
+            return text
+        return "".join(self.stream((text,)))
+
+
+_default = Anonymizer()
+
+def anonymize_sr(text: str) -> str:
+    """Basic Serbian PII scrubber (best-effort). NOT perfect; safety net."""
+    return _default.anonymize(text)
@@ -1,59 +1,249 @@
-import re, pickle
-from fastapi import FastAPI, Query
+import os, time, threading
+from fastapi import FastAPI, Header, HTTPException, Query, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, Field
+import numpy as np
+from index_store import load_index
+from query_cache import QueryCache
+from snippets import make_snippet
+from phrase_query import parse_query, phrase_search, match_mask
+from dense_index import open_dense, hybrid_search
 
-IDX = pickle.load(open("bm25_index.pkl","rb"))
-bm25 = IDX["bm25"]
-docs = IDX["docs"]
+try:
+    import orjson
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    import json
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+# mmap direktorijum (convert_index.py / build_index.py) ili stari bm25_index.pkl
+INDEX_PATH = os.environ.get("BM25_INDEX", "bm25_index")
+RELOAD_INTERVAL = float(os.environ.get("RELOAD_INTERVAL", "5"))  # 0 = bez pracenja fajla
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+FACET_LIMIT = int(os.environ.get("FACET_LIMIT", "50"))  # vrednosti po polju u /search?facets=true
+
+def resolve_index_path():
+    if not os.path.isdir(INDEX_PATH) and os.path.exists("bm25_index.pkl"):
+        return "bm25_index.pkl"
+    return INDEX_PATH
+
+def index_version(path):
+    # build_index.py/convert_index.py objavljuju novu verziju i prebace symlink -> nova putanja
+    real = os.path.realpath(path)
+    st = os.stat(real if path.endswith(".pkl") else os.path.join(real, "meta.json"))
+    return f"{os.path.basename(real)}:{st.st_ino}-{st.st_mtime_ns}"
+
+class IndexState:
+    def __init__(self, path):
+        self.path = path
+        # symlink se razresava jednom: verzija i svi fajlovi dolaze iz istog direktorijuma
+        real = os.path.realpath(path)
+        self.version = index_version(real)
+        self.index = load_index(real)
+        self.engine, self.docs, self.filters = self.index.engine, self.index.docs, self.index.filters
+        # upiti se tokenizuju istim tokenizerom kojim je indeks napravljen (meta.json)
+        self.tokenizer = self.index.tokenizer
+        # vektori za mode=dense/hybrid, ako je indeks napravljen sa DENSE_INDEX=1
+        self.dense = open_dense(real) if not path.endswith(".pkl") else None
+        self.loaded_at = time.time()
+
+STATE = IndexState(resolve_index_path())
+CACHE = QueryCache(int(os.environ.get("CACHE_SIZE", "10000")), float(os.environ.get("CACHE_TTL", "300")))
+_reload_lock = threading.Lock()
+
+def reload_index(force=False):
+    """Atomska zamena indeksa: zahtevi u toku zavrsavaju nad starim STATE objektom."""
+    global STATE
+    with _reload_lock:
+        path = resolve_index_path()
+        if not force and path == STATE.path and index_version(path) == STATE.version:
+            return False
+        STATE = IndexState(path)
+        CACHE.clear()
+        return True
+
+def _watch_index():
+    while True:
+        time.sleep(RELOAD_INTERVAL)
+        try:
+            if reload_index():
+                print("Reloaded index:", STATE.path, STATE.version)
+        except Exception as e:
+            # indeks moze biti u sred objave; probaj ponovo sledeci put
+            print("WARN index reload failed:", e)
+
+if RELOAD_INTERVAL > 0:
+    threading.Thread(target=_watch_index, name="index-watch", daemon=True).start()
 
 app = FastAPI(title="Gross Negligence RAG Search API", version="1.0")
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# polja pogotka; podrazumevano kao ranije (RAG front cita hit["text"]), snippet samo uz fields=
+ALL_FIELDS = ("score", "doc_id", "meta", "snippet", "text")
+DEFAULT_FIELDS = ("score", "doc_id", "meta", "text")
+
+def parse_fields(fields: str | None):
+    if not fields:
+        return DEFAULT_FIELDS
+    out = tuple(f.strip() for f in fields.split(",") if f.strip())
+    bad = [f for f in out if f not in ALL_FIELDS]
+    if bad:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(bad)} (allowed: {', '.join(ALL_FIELDS)})")
+    return out
+
+def json_response(obj) -> Response:
+    # direktno serijalizovanje (orjson ako postoji), bez FastAPI jsonable_encoder-a
+    return Response(dumps(obj), media_type="application/json")
+
+def parse(st, q: str):
+    """Upit -> ParsedQuery; fraze ("...") i NEAR/n traze indeks sa pozicijama."""
+    pq = parse_query(q, st.tokenizer)
+    if pq.constrained and st.index.positions is None:
+        raise HTTPException(status_code=400, detail="Phrase and NEAR queries need an index with positions")
+    return pq
+
+MODES = ("bm25", "dense", "hybrid")
+
+def check_mode(st, mode):
+    if mode not in MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown mode: {mode} ({' | '.join(MODES)})")
+    if mode != "bm25" and st.dense is None:
+        raise HTTPException(status_code=400, detail="mode=dense/hybrid needs an index built with DENSE_INDEX=1")
+
+def run_query(st, pq, k, allowed, mode="bm25"):
+    if mode != "bm25":
+        return hybrid_search(st.index, st.dense, pq, k=k, allowed=allowed, mode=mode)
+    if pq.constrained:
+        return phrase_search(st.index, pq, k=k, allowed=allowed)
+    return st.engine.search(pq.terms, k=k, allowed=allowed)
 
-def normalize(t:str)->str:
-    t=t.lower()
-    t=re.sub(r"[^0-9a-zA-Zа-яА-ЯčćšđžČĆŠĐŽ]+", " ", t)
-    return t
+def facet_counts(st, pq, limit, court, upisnik, godina_from, godina_to):
+    """Brojevi po court/upisnik/godina/auto_rule/abstain nad celim skupom pogodaka (ne samo top-k)."""
+    key = ("facets",) + cache_key(st, pq.key(), limit, court, upisnik, godina_from, godina_to)
+    res = CACHE.get(key)
+    if res is None:
+        mask = match_mask(st.index, pq, st.filters.filter(court, upisnik, godina_from, godina_to))
+        res = {"total": int(np.count_nonzero(mask)), "facets": st.filters.facets(mask, limit=limit)}
+        CACHE.put(key, res)
+    return res
+
+def cache_key(st, qtok, k, court, upisnik, godina_from, godina_to):
+    return (st.version, tuple(qtok), k, (court or "").lower(), (upisnik or "").lower(), godina_from or 0, godina_to or 0)
 
 @app.get("/health")
 def health():
-    return {"ok": True, "docs": len(docs)}
+    st = STATE
+    return {"ok": True, "docs": len(st.docs), "index": {"path": st.path, "version": st.version, "loaded_at": st.loaded_at, "dense": st.dense.model if st.dense else None}, "cache": CACHE.stats()}
+
+@app.post("/admin/reload")
+def admin_reload(x_admin_token: str | None = Header(None)):
+    if ADMIN_TOKEN and x_admin_token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Forbidden")
+    reloaded = reload_index(force=True)
+    return {"reloaded": reloaded, "docs": len(STATE.docs), "version": STATE.version}
 
 @app.get("/search")
 def search(
-    q: str = Query(..., min_length=1),
+    q: str = Query(..., min_length=1, description='Words; "exact phrase"; a NEAR/n b (at most n tokens apart)'),
     k: int = Query(10, ge=1, le=25),
     court: str | None = None,
     upisnik: str | None = None,
     godina_from: int | None = None,
     godina_to: int | None = None,
+    fields: str | None = Query(None, description="Comma-separated: score,doc_id,meta,snippet,text"),
+    facets: bool = Query(False, description="Add total and facet counts for the whole match set"),
+    mode: str = Query("bm25", description="bm25 | dense | hybrid (BM25 + vectors, reciprocal rank fusion)"),
+):
+    st = STATE
+    fl = parse_fields(fields)
+    check_mode(st, mode)
+    pq = parse(st, q)
+    qtok = pq.terms
+    key = (mode,) + cache_key(st, pq.key(), k, court, upisnik, godina_from, godina_to)
+    hits = CACHE.get(key)
+    if hits is None:
+        # filteri se razresavaju pre bodovanja -> BM25 samo nad kandidatima
+        allowed = st.filters.filter(court, upisnik, godina_from, godina_to)
+        hits = run_query(st, pq, k, allowed, mode)
+        CACHE.put(key, hits)
+    out = {"query": q, "k": k, "results": [hit(st, i, score, fl, qtok) for i, score in hits]}
+    if facets:
+        out.update(facet_counts(st, pq, FACET_LIMIT, court, upisnik, godina_from, godina_to))
+    return json_response(out)
+
+@app.get("/facets")
+def facets(
+    q: str | None = Query(None, description="Same syntax as /search; empty = all documents"),
+    court: str | None = None,
+    upisnik: str | None = None,
+    godina_from: int | None = None,
+    godina_to: int | None = None,
+    limit: int = Query(0, ge=0, le=10000, description="Max values per field (0 = all)"),
 ):
-    qtok = normalize(q).split()
-    scores = bm25.get_scores(qtok)
-
-    # kandidati sortirani po skoru
-    order = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
-
-    out=[]
-    for i in order:
-        d = docs[i]
-        m = d.get("meta", {}) or {}
-
-        # filteri
-        if court and (m.get("court") or "").lower() != court.lower():
-            continue
-        if upisnik and (m.get("upisnik") or "").lower() != upisnik.lower():
-            continue
-        g = m.get("godina")
-        if godina_from and g and int(g) < godina_from:
-            continue
-        if godina_to and g and int(g) > godina_to:
-            continue
-
-        out.append({
-            "score": float(scores[i]),
-            "doc_id": d.get("doc_id"),
-            "text": d.get("text"),
-            "meta": m,
-        })
-        if len(out) >= k:
-            break
-
-    return {"query": q, "k": k, "results": out}
+    st = STATE
+    pq = parse(st, q or "")
+    return json_response({"query": q, **facet_counts(st, pq, limit, court, upisnik, godina_from, godina_to)})
+
+class BatchQuery(BaseModel):
+    q: str = Field(..., min_length=1)
+    k: int = Field(10, ge=1, le=25)
+    court: str | None = None
+    upisnik: str | None = None
+    godina_from: int | None = None
+    godina_to: int | None = None
+    mode: str = "bm25"
+
+class BatchRequest(BaseModel):
+    queries: list[BatchQuery]
+    fields: str | None = None
+
+MAX_BATCH = int(os.environ.get("MAX_BATCH", "1000"))
+
+@app.post("/search/batch")
+def search_batch(req: BatchRequest):
+    if len(req.queries) > MAX_BATCH:
+        raise HTTPException(status_code=413, detail=f"Too many queries (max {MAX_BATCH})")
+    st = STATE
+    fl = parse_fields(req.fields)
+    for x in req.queries:
+        check_mode(st, x.mode)
+    pqs = [parse(st, x.q) for x in req.queries]
+    qtoks = [pq.terms for pq in pqs]
+    keys = [(x.mode,) + cache_key(st, pq.key(), x.k, x.court, x.upisnik, x.godina_from, x.godina_to) for pq, x in zip(pqs, req.queries)]
+    batch = [CACHE.get(key) for key in keys]
+
+    miss = [i for i, hits in enumerate(batch) if hits is None]
+    if miss:
+        allowed = {i: st.filters.filter(req.queries[i].court, req.queries[i].upisnik, req.queries[i].godina_from, req.queries[i].godina_to) for i in miss}
+        # obicni BM25 upiti idu zajedno kroz search_batch, fraze/NEAR i dense/hybrid pojedinacno
+        plain = [i for i in miss if not pqs[i].constrained and req.queries[i].mode == "bm25"]
+        scored = {}
+        if plain:
+            scored = dict(zip(plain, st.engine.search_batch([qtoks[i] for i in plain], k=[req.queries[i].k for i in plain], allowed=[allowed[i] for i in plain])))
+        for i in miss:
+            hits = scored[i] if i in scored else run_query(st, pqs[i], req.queries[i].k, allowed[i], req.queries[i].mode)
+            batch[i] = hits
+            CACHE.put(keys[i], hits)
+
+    return json_response({"results": [
+        {"query": x.q, "k": x.k, "results": [hit(st, i, score, fl, qtok) for i, score in hits]}
+        for x, qtok, hits in zip(req.queries, qtoks, batch)
+    ]})
+
+def hit(st, i, score, fields=DEFAULT_FIELDS, qtok=()):
+    out = {}
+    text = None
+    for f in fields:
+        if f == "score":
+            out["score"] = score
+        elif f == "doc_id":
+            out["doc_id"] = st.docs.doc_id(i)
+        elif f == "meta":
+            out["meta"] = st.docs.meta(i)
+        elif f in ("text", "snippet"):
+            if text is None:
+                text = st.docs.text(i)
+            out[f] = text if f == "text" else make_snippet(st.index, i, text, qtok)
+    return out
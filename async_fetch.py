@@ -0,0 +1,247 @@
+import os, json, time, random, asyncio, hashlib, tempfile
+from urllib.parse import urlsplit
+import aiohttp
+
+# Asinhrono preuzimanje URL-ova: jedna aiohttp sesija (pool konekcija + keep-alive),
+# token bucket po hostu umesto fiksnog sleep-a, ogranicena konkurentnost,
+# retry sa eksponencijalnim backoff-om na 429/5xx i mrezne greske, sha256 se racuna
+# dok telo stize (telo ide u SpooledTemporaryFile, na disk tek preko FETCH_SPOOL_BYTES).
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", "16"))
+FETCH_PER_HOST = int(os.environ.get("FETCH_PER_HOST", "4"))
+# zahteva u sekundi po hostu i koliko ih sme da ide odjednom posle pauze
+RATE_PER_HOST = float(os.environ.get("RATE_PER_HOST", "0.5"))
+RATE_BURST = float(os.environ.get("RATE_BURST", "1"))
+FETCH_RETRIES = int(os.environ.get("FETCH_RETRIES", "5"))
+FETCH_BACKOFF = float(os.environ.get("FETCH_BACKOFF", "2"))
+FETCH_BACKOFF_MAX = float(os.environ.get("FETCH_BACKOFF_MAX", "120"))
+FETCH_TIMEOUT = float(os.environ.get("FETCH_TIMEOUT", "60"))
+FETCH_SPOOL_BYTES = int(os.environ.get("FETCH_SPOOL_BYTES", str(8 << 20)))
+CHUNK = 64 << 10
+USER_AGENT = "corpus-agent/1.0"
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Klasican token bucket: `rate` tokena u sekundi, najvise `burst` na zalihi."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.t = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self.lock:
+            # lock drzi red: sledeci ceka tek kad prethodni dobije token
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+                self.t = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def penalize(self, seconds: float):
+        # 429 / Retry-After: ceo host miruje, ne samo URL koji je dobio odbijanje
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class HostLimiter:
+    def __init__(self, rate: float = RATE_PER_HOST, burst: float = RATE_BURST):
+        self.rate, self.burst = rate, burst
+        self.buckets = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc.lower()
+        b = self.buckets.get(host)
+        if b is None:
+            b = self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return b
+
+
+class Fetched:
+    """Preuzeto telo: sha256, velicina, Content-Type i fajl objekat premotan na pocetak."""
+
+    def __init__(self, url, final_url, sha256, size, content_type, body, head):
+        self.url = url
+        self.final_url = final_url
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+        self.body = body
+        self.head = head
+
+    def close(self):
+        self.body.close()
+
+
+class FetchError(Exception):
+    def __init__(self, url, status, msg, retry_after=None):
+        super().__init__(f"{status} {msg}")
+        self.url = url
+        self.status = status
+        self.retry_after = retry_after
+
+
+def retry_after(headers) -> float | None:
+    v = headers.get("Retry-After")
+    if not v:
+        return None
+    try:
+        return max(0.0, float(v))
+    except ValueError:
+        return None  # HTTP-date oblik se ne koristi kod ovih servera
+
+
+def backoff(attempt: int) -> float:
+    # full jitter: [0, base * 2^attempt], ograniceno odozgo
+    return random.uniform(0, min(FETCH_BACKOFF_MAX, FETCH_BACKOFF * (2 ** attempt)))
+
+
+def make_session(concurrency: int = FETCH_CONCURRENCY, per_host: int = FETCH_PER_HOST) -> aiohttp.ClientSession:
+    connector = aiohttp.TCPConnector(limit=concurrency, limit_per_host=per_host, keepalive_timeout=60, ttl_dns_cache=600)
+    timeout = aiohttp.ClientTimeout(total=None, connect=FETCH_TIMEOUT, sock_read=FETCH_TIMEOUT)
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, headers={"User-Agent": USER_AGENT})
+
+
+async def fetch_once(session, url: str) -> Fetched:
+    async with session.get(url, allow_redirects=True) as r:
+        if r.status >= 400:
+            raise FetchError(url, r.status, r.reason or "", retry_after(r.headers))
+        h = hashlib.sha256()
+        body = tempfile.SpooledTemporaryFile(max_size=FETCH_SPOOL_BYTES)
+        head, size = b"", 0
+        try:
+            async for chunk in r.content.iter_chunked(CHUNK):
+                h.update(chunk)
+                body.write(chunk)
+                if len(head) < 8:
+                    head += chunk[:8 - len(head)]
+                size += len(chunk)
+        except BaseException:
+            body.close()
+            raise
+        body.seek(0)
+        return Fetched(url, str(r.url), h.hexdigest(), size, r.headers.get("Content-Type"), body, head)
+
+
+async def fetch(session, limiter: HostLimiter, url: str, retries: int = FETCH_RETRIES) -> Fetched:
+    """GET sa rate limitom po hostu; 429/5xx i mrezne greske se ponavljaju sa backoff-om,
+    ostale 4xx odmah podizu FetchError."""
+    bucket = limiter.bucket(url)
+    attempt = 0
+    while True:
+        await bucket.acquire()
+        try:
+            return await fetch_once(session, url)
+        except FetchError as e:
+            if e.status not in RETRY_STATUS or attempt >= retries:
+                raise
+            wait = e.retry_after if e.retry_after is not None else backoff(attempt)
+            if e.status == 429:
+                bucket.penalize(wait)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt >= retries:
+                raise
+            wait = backoff(attempt)
+        attempt += 1
+        await asyncio.sleep(wait)
+
+
+class FetchState:
+    """Append-only JSONL: jedna linija po zavrsenom URL-u (sacuvan ili trajno odbijen).
+    Pri restartu se ti URL-ovi preskacu; nedovrsena poslednja linija (pad usred upisa) se
+    odseca, da se sledeci zapis ne nalepi na nju."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done = {}
+        if os.path.exists(path):
+            end = 0
+            with open(path, "rb") as f:
+                for ln in f:
+                    if not ln.endswith(b"\n"):
+                        break
+                    end += len(ln)
+                    try:
+                        rec = json.loads(ln)
+                    except ValueError:
+                        continue
+                    self.done[rec["url"]] = rec
+            if end < os.path.getsize(path):
+                os.truncate(path, end)
+        self.f = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.done
+
+    def record(self, url: str, **fields):
+        rec = {"url": url, **fields}
+        self.done[url] = rec
+        self.f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+
+async def fetch_all(urls, handle, state: FetchState | None = None, concurrency: int = FETCH_CONCURRENCY,
+                    limiter: HostLimiter | None = None, session=None, log=print):
+    """Preuzima sve URL-ove (preskace one iz state-a) i za svaki poziva `await handle(Fetched)`,
+    koji vraca dict za state fajl. Vraca brojace {ok, skipped, failed}."""
+    limiter = limiter or HostLimiter()
+    own = session is None
+    session = session or make_session(concurrency)
+    sem = asyncio.Semaphore(concurrency)
+    counts = {"ok": 0, "skipped": 0, "failed": 0}
+
+    async def one(url):
+        async with sem:
+            try:
+                res = await fetch(session, limiter, url)
+            except FetchError as e:
+                counts["failed"] += 1
+                log("ERROR:", url, e)
+                if state is not None and e.status not in RETRY_STATUS:
+                    state.record(url, status=e.status)  # trajno (404, 410...) -> ne pokusavaj ponovo
+                return
+            except Exception as e:
+                counts["failed"] += 1
+                log("ERROR:", url, repr(e))
+                return
+            try:
+                info = await handle(res)
+            except Exception as e:
+                counts["failed"] += 1
+                log("ERROR storing:", url, repr(e))
+                return
+            finally:
+                res.close()
+            counts["ok"] += 1
+            if state is not None:
+                state.record(url, status=200, **(info or {}))
+
+    try:
+        todo = []
+        for u in urls:
+            if state is not None and u in state:
+                counts["skipped"] += 1
+            else:
+                todo.append(u)
+        # ograniceno i po broju taskova, da stotine hiljada URL-ova ne postanu odjednom korutine
+        pending = set()
+        for u in todo:
+            if len(pending) >= concurrency * 4:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.add(asyncio.create_task(one(u)))
+        if pending:
+            await asyncio.wait(pending)
+    finally:
+        if own:
+            await session.close()
+    return counts
@@ -0,0 +1,93 @@
+import os, re, sys, random
+from anonymizer import Anonymizer
+from synth_corpus import corpus_texts
+from bench_suite import best_of
+
+# Regresija + propusnost anonimizacije: ranija anonymize_sr (14 uzastopnih re.sub
+# nad celim tekstom) naspram Anonymizer, izlaz mora biti identican (i u chunked modu).
+#   python3 bench_anonymizer.py [dir_sa_txt_fajlovima]   (bez argumenta: synth_corpus.generate)
+# BENCH_DOCS, BENCH_PARAS (pasusa po dokumentu), BENCH_SEED, BENCH_PII (udeo pasusa sa PII), BENCH_REPEAT
+
+BENCH_DOCS = int(os.environ.get("BENCH_DOCS", "500"))
+BENCH_PARAS = int(os.environ.get("BENCH_PARAS", "60"))
+BENCH_SEED = int(os.environ.get("BENCH_SEED", "11"))
+BENCH_PII = float(os.environ.get("BENCH_PII", "0.3"))
+BENCH_REPEAT = int(os.environ.get("BENCH_REPEAT", "3"))
+
+
+def legacy_anonymize_sr(text: str) -> str:
+    if not text:
+        return text
+    t = text.replace(" ", " ")
+
+    t = re.sub(r'(?i)\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b', '[EMAIL]', t)
+    t = re.sub(r'(?i)\bhttps?://\S+\b', '[URL]', t)
+    t = re.sub(r'(?i)\bwww\.\S+\b', '[URL]', t)
+
+    t = re.sub(r'\b\d{13}\b', '[JMBG]', t)
+    t = re.sub(r'(?x)(?<!\d)(?:\+?381|0)\s*(?:\(?\d{2,3}\)?[\s/-]*)\d{3}[\s/-]*\d{3,4}(?!\d)', '[PHONE]', t)
+    t = re.sub(r'(?i)\bRS\s*\d(?:\s*\d){19}\b', '[IBAN]', t)
+    t = re.sub(r'(?<!\d)(?:\d[ -]?){13,19}(?!\d)', '[CARD_OR_LONG_NUMBER]', t)
+    t = re.sub(r'\b[A-ZČĆŠĐŽ]{1,2}\s*\d{3,4}\s*[- ]?\s*[A-ZČĆŠĐŽ]{1,2}\b', '[PLATE]', t)
+    t = re.sub(r'(?i)\b(ličn(?:a|e)\s+karta|lk|pasoš|putna\s+isprava|broj\s+dokumenta)\s*[:#]?\s*\w+\b', r'\1: [DOC_ID]', t)
+    t = re.sub(r'(?i)\b(ul\.?|ulica|bulevar|булевар|bb)\s+[A-Za-zА-Яа-яČĆŠĐŽčćšđž0-9 .-]{2,}\b', '[ADDRESS]', t)
+
+    role_pat = re.compile(r'(?i)\b(tužilac|okrivljeni|okrivljena|optuženi|optužena|tuženi|tužena|tužilja|branilac|punomoćnik|puno(?:m|ć)nik|oštećeni|oštećena|svedok|svjedok|sudija|predsednik\s+veća|predsjednik\s+vijeća)\b\s*[:\-]\s*([A-ZČĆŠĐŽ][a-zčćšđž]+(?:\s+[A-ZČĆŠĐŽ][a-zčćšđž]+){1,2})')
+    t = role_pat.sub(lambda m: f"{m.group(1)}: [NAME]", t)
+
+    t = re.sub(r'\b([A-ZА-ЯČĆŠĐŽ]\.)\s*([A-ZА-ЯČĆŠĐŽ]\.)\b', '[INITIALS]', t)
+
+    t = re.sub(r'[ \t]+', ' ', t)
+    t = re.sub(r'\n{3,}', '\n\n', t)
+    return t.strip()
+
+
+# granicni slucajevi koji se uvek proveravaju (i uz dir sa txt fajlovima): PII koje
+# synth_corpus ne pravi, razmaci (nbsp, tab, prazni redovi) i "İ" (U+0130: re.IGNORECASE
+# ga poredi sa "i", a lower() daje "i" + U+0307)
+EDGE_CASES = [
+    "Kontakt www.sud.rs/odluke i https://portal.sud.rs/predmet?id=1, kartica 4111 1111 1111 1111.",
+    "Vozilo registarskih oznaka BG 123-AB,\u00a0okrivljeni M. P.\tu ul. Njegoševa 12 Beograd.",
+    "Svedok - Petar Petrović izjavio je da je videla A.\n\nB. kako odlazi ka bulevar Oslobođenja 5.",
+    "Оштећени је навео телефон 064/123-4567 и broj dokumenta # AB12345.",
+    "OKRİVLJENİ: Marko Markovic",
+    "PUTNA İSPRAVA: AB12345",
+    "Zapisnik potpisao M.P.Jovanović, overio Д.С.Илић.",
+]
+# i jedan dugi dokument od njih (vise delova u chunked modu)
+EDGE_CASES.append("  \n" + " \n \n".join(EDGE_CASES * 20) + "\n\n\n\n  ")
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    docs = corpus_texts(path, BENCH_DOCS, BENCH_SEED, paras=(BENCH_PARAS, BENCH_PARAS), pii=BENCH_PII)
+    docs += EDGE_CASES
+    mb = sum(len(d.encode("utf-8")) for d in docs) / 1e6
+
+    anon = Anonymizer()
+    old = [legacy_anonymize_sr(d) for d in docs]
+    new = [anon.anonymize(d) for d in docs]
+    t_old = best_of(lambda: [legacy_anonymize_sr(d) for d in docs], BENCH_REPEAT)
+    fast = Anonymizer()
+    t_new = best_of(lambda: [fast.anonymize(d) for d in docs], BENCH_REPEAT)
+    diff = sum(1 for a, b in zip(old, new) if a != b)
+
+    # chunked mod: mali komadi i ulaz u delovima proizvoljne duzine
+    small = Anonymizer(chunk_chars=512)
+    rnd = random.Random(3)
+    diff_chunked = 0
+    for d, ref in zip(docs, old):
+        cuts = sorted(rnd.sample(range(len(d) + 1), min(8, len(d) + 1)))
+        pieces = [d[a:b] for a, b in zip([0] + cuts, cuts + [len(d)])]
+        if "".join(small.stream(pieces)) != ref:
+            diff_chunked += 1
+
+    counts = dict(sorted(anon.counts.items()))
+    print(f"docs={len(docs)} ({mb:.1f} MB) replacements={counts}")
+    print(f"before: {len(docs)/t_old:.0f} docs/s ({mb/t_old:.1f} MB/s)")
+    print(f"after:  {len(docs)/t_new:.0f} docs/s ({mb/t_new:.1f} MB/s)  speedup x{t_old/t_new:.1f}")
+    print(f"mismatches: {diff}, chunked mismatches: {diff_chunked}")
+    if diff or diff_chunked:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import os, re, sys
+from decision_classifier import DecisionClassifier, split_paragraphs
+from synth_corpus import corpus_texts
+from bench_suite import best_of
+
+# Propusnost klasifikatora (docs/s): ranija implementacija pick_decision_paragraph
+# (regexi po pozivu, dva prolaza) naspram DecisionClassifier, uz proveru da su
+# rezultati identicni.
+#   python3 bench_classifier.py [dir_sa_txt_fajlovima]   (bez argumenta: synth_corpus.generate)
+# BENCH_DOCS, BENCH_PARAS (pasusa po dokumentu), BENCH_SEED, BENCH_REPEAT
+
+BENCH_DOCS = int(os.environ.get("BENCH_DOCS", "2000"))
+BENCH_PARAS = int(os.environ.get("BENCH_PARAS", "40"))
+BENCH_SEED = int(os.environ.get("BENCH_SEED", "7"))
+BENCH_REPEAT = int(os.environ.get("BENCH_REPEAT", "3"))
+
+
+def legacy_strip_diacritics(t: str) -> str:
+    return (t.replace("ž","z").replace("Ž","Z")
+             .replace("č","c").replace("Č","C")
+             .replace("ć","c").replace("Ć","C")
+             .replace("š","s").replace("Š","S")
+             .replace("đ","d").replace("Đ","D"))
+
+def legacy_matched_spans(paragraph, regex, span_type):
+    return [{"start": m.start(), "end": m.end(), "type": span_type} for m in regex.finditer(paragraph)]
+
+def legacy_pick_decision_paragraph(txt: str):
+    paras = split_paragraphs(txt)
+    pcount = len(paras)
+    norm_lat = lambda t: legacy_strip_diacritics(t).lower()
+    GROSS_LAT = re.compile(r"\bgrub[a-z]*\s+nepaznj[a-z]*\b", re.IGNORECASE)
+    GROSS_CYR = re.compile(r"\bгруб[а-я]*\s+непажњ[а-я]*\b", re.IGNORECASE)
+    SYN_LAT = re.compile(r"\b(krajnj[a-z]*|tesk[a-z]*|ocigledn[a-z]*|izrazit[a-z]*)\s+nepaznj[a-z]*\b", re.IGNORECASE)
+    SYN_CYR = re.compile(r"\b(крајњ[а-я]*|тешк[а-я]*|очигледн[а-я]*|изразит[а-я]*)\s+непажњ[а-я]*\b", re.IGNORECASE)
+    NEG_LAT = re.compile(r"\b(nije|nisu|ne\s+moze|ne\s+moze\s+se\s+smatrati|ne\s+predstavlja|ne\s+ukazuje|ne\s+postoji)\b", re.IGNORECASE)
+    NEG_CYR = re.compile(r"\b(није|нису|не\s+може|не\s+може\s+се\s+сматрати|не\s+представља|не\s+указује|не\s+постоји)\b", re.IGNORECASE)
+    for idx, p in enumerate(paras):
+        pn_lat, pn_cyr = norm_lat(p), p.lower()
+        if GROSS_LAT.search(pn_lat) or GROSS_CYR.search(pn_cyr):
+            spans = []
+            if GROSS_LAT.search(pn_lat):
+                spans += legacy_matched_spans(pn_lat, GROSS_LAT, "GROSS_LAT")
+            if GROSS_CYR.search(pn_cyr):
+                spans += legacy_matched_spans(pn_cyr, GROSS_CYR, "GROSS_CYR")
+            if NEG_LAT.search(pn_lat) or NEG_CYR.search(pn_cyr):
+                return p, idx, pcount, "GROSS_TERM_NEGATED", 0, 0.95, False, spans
+            return p, idx, pcount, "GROSS_TERM", 1, 0.90, False, spans
+    for idx, p in enumerate(paras):
+        pn_lat, pn_cyr = norm_lat(p), p.lower()
+        if SYN_LAT.search(pn_lat) or SYN_CYR.search(pn_cyr):
+            spans = []
+            if SYN_LAT.search(pn_lat):
+                spans += legacy_matched_spans(pn_lat, SYN_LAT, "SYN_LAT")
+            if SYN_CYR.search(pn_cyr):
+                spans += legacy_matched_spans(pn_cyr, SYN_CYR, "SYN_CYR")
+            return p, idx, pcount, "SYNONYM_ONLY", None, 0.60, True, spans
+    return "", None, pcount, "NO_MATCH", None, 0.0, True, []
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else None
+    docs = corpus_texts(path, BENCH_DOCS, BENCH_SEED, paras=(BENCH_PARAS, BENCH_PARAS))
+    mb = sum(len(d.encode("utf-8")) for d in docs) / 1e6
+    clf = DecisionClassifier()
+
+    old = [legacy_pick_decision_paragraph(d) for d in docs]
+    new = [clf.classify(d) for d in docs]
+    t_old = best_of(lambda: [legacy_pick_decision_paragraph(d) for d in docs], BENCH_REPEAT)
+    t_new = best_of(lambda: [clf.classify(d) for d in docs], BENCH_REPEAT)
+    diff = sum(1 for a, b in zip(old, new) if a != b)
+
+    rules = {}
+    for r in new:
+        rules[r[3]] = rules.get(r[3], 0) + 1
+    print(f"docs={len(docs)} ({mb:.1f} MB) rules={rules}")
+    print(f"before: {len(docs)/t_old:.0f} docs/s ({mb/t_old:.1f} MB/s)")
+    print(f"after:  {len(docs)/t_new:.0f} docs/s ({mb/t_new:.1f} MB/s)  speedup x{t_old/t_new:.1f}")
+    print(f"mismatches: {diff}")
+    if diff:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
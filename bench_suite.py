@@ -0,0 +1,530 @@
+import os, io, sys, json, time, random, shutil, argparse, platform, tempfile, subprocess, contextlib
+from collections import Counter
+from synth_corpus import generate, near_duplicates, render, RENDERERS
+
+# End-to-end benchmark nad sintetickim korpusom (synth_corpus.py): ekstrakcija po formatu,
+# anonimizacija, klasifikacija, near-duplikati (podmetnute kopije), izgradnja korpusa (lokalni storage u temp direktorijumu),
+# izgradnja indeksa i latencija upita (p50/p95/p99, QPS). Rezultat je JSON za poredjenje.
+# Faza fetch je i provera async_fetch.py nad lokalnim aiohttp stub serverom (429 + Retry-After,
+# 5xx retry, 404 u state fajlu, sha256, nastavak posle prekida); pad provere prekida bench.
+#   python3 bench_suite.py --docs 200 --stages fetch
+#   python3 bench_suite.py --docs 5000 --out bench_results.json
+#   python3 bench_suite.py --docs 5000 --out new.json --compare bench_results.json
+# BENCH_DOCS, BENCH_SEED, BENCH_STAGES, BENCH_FORMATS, BENCH_EXTRACT_DOCS, BENCH_QUERIES, BENCH_REPEAT,
+# BENCH_EMBED_MODEL, BENCH_DUP, BENCH_FETCH_DOCS
+BENCH_DOCS = int(os.environ.get("BENCH_DOCS", "2000"))
+BENCH_SEED = int(os.environ.get("BENCH_SEED", "1"))
+BENCH_STAGES = os.environ.get("BENCH_STAGES", "extract,fetch,anonymize,classify,dedup,corpus,index,query,dense")
+BENCH_FORMATS = os.environ.get("BENCH_FORMATS", ",".join(RENDERERS))
+# ekstrakcija (narocito PDF) je sporija -> meri se na prvih N dokumenata
+BENCH_EXTRACT_DOCS = int(os.environ.get("BENCH_EXTRACT_DOCS", "200"))
+BENCH_FETCH_DOCS = int(os.environ.get("BENCH_FETCH_DOCS", "200"))
+BENCH_QUERIES = int(os.environ.get("BENCH_QUERIES", "2000"))
+BENCH_REPEAT = int(os.environ.get("BENCH_REPEAT", "3"))
+BENCH_OUT = os.environ.get("BENCH_OUT", "bench_results.json")
+# udeo dokumenata koji dobijaju near-duplikat kopiju u fazi dedup
+BENCH_DUP = float(os.environ.get("BENCH_DUP", "0.1"))
+# model za fazu dense (bez sentence-transformers paketa: BENCH_EMBED_MODEL=hash:384)
+BENCH_EMBED_MODEL = os.environ.get("BENCH_EMBED_MODEL", os.environ.get("EMBED_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"))
+
+QUERIES = [
+    "gruba nepažnja", "grubu nepažnju", "gruba nepažnja vozača", "krajnja nepažnja",
+    "izrazita nepažnja zaposlenog", "obična nepažnja", "naknada štete", "veštak saobraćajne struke",
+    "груба непажња", "тешка непажња", "непажња запосленог", "накнада штете",
+]
+PHRASE_QUERIES = [
+    '"gruba nepažnja"', '"ne predstavlja grubu nepažnju"', '"nije gruba nepažnja"', '"груба непажња"',
+    'nepažnja NEAR/3 zaposlenog', 'nepažnja NEAR/5 vozača', '"gruba nepažnja" NEAR/10 zaštite',
+    '"naknade štete" veštaka',
+]
+PARAPHRASE_QUERIES = ["krajnja nepažnja vozača", "teška nepažnja zaposlenog", "очигледна непажња", "propust u čuvanju opreme"]
+# metrike koje --compare poredi (vece je bolje / manje je bolje)
+HIGHER = ("docs_per_s", "mb_per_s", "qps", "recall_at_10", "precision", "recall")
+LOWER = ("seconds", "p50_ms", "p95_ms", "p99_ms", "bytes_per_doc")
+
+
+def percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    return sorted_vals[min(len(sorted_vals) - 1, int(round(q * (len(sorted_vals) - 1))))]
+
+
+def throughput(dt: float, n: int, nbytes: int) -> dict:
+    dt = max(dt, 1e-9)
+    return {"seconds": round(dt, 4), "docs": n, "docs_per_s": round(n / dt, 1), "mb_per_s": round(nbytes / 1e6 / dt, 2)}
+
+
+def best_of(fn, repeat: int = BENCH_REPEAT) -> float:
+    best = None
+    for _ in range(max(repeat, 1)):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+def stage_extract(ctx):
+    from office_extract import extract_docx_text, extract_odf_text
+    from pdf_extract import extract_pdf
+    extractors = {
+        "txt": lambda b: b.decode("utf-8", errors="ignore"),
+        "docx": extract_docx_text,
+        "odt": extract_odf_text,
+        "pdf": lambda b: extract_pdf(b)["text"],
+    }
+    docs = ctx["docs"][:BENCH_EXTRACT_DOCS]
+    out = {}
+    for fmt in ctx["formats"]:
+        blobs = [render(d, fmt)[1] for d in docs]
+        fn = extractors[fmt]
+        chars = 0
+
+        def run():
+            nonlocal chars
+            chars = sum(len(fn(b)) for b in blobs)
+        # PDF je spor i deterministican -> jedan prolaz je dovoljan
+        dt = best_of(run, 1 if fmt == "pdf" else BENCH_REPEAT)
+        out[fmt] = {**throughput(dt, len(blobs), sum(map(len, blobs))), "chars": chars}
+    return out
+
+
+def stage_fetch(ctx):
+    """download_and_detect.py (fetch_all + make_store) nad aiohttp stub serverom na localhost-u.
+    Deo URL-ova vraca 429 sa Retry-After, deo 503 dva puta pa telo, deo 404; prvi prolaz se
+    prekida na pola (i ostavlja nedovrsenu liniju u state fajlu), drugi nastavlja iz state fajla.
+    Propusnost je za drugi prolaz."""
+    import asyncio, hashlib
+    from aiohttp import web
+    import async_fetch
+    from async_fetch import FetchState, HostLimiter, fetch_all
+    from download_and_detect import make_store
+    from storage import LocalContainer
+
+    docs = ctx["docs"][:BENCH_FETCH_DOCS]
+    bodies = {f"/doc/{i}": render(d, ctx["formats"][i % len(ctx["formats"])])[1] for i, d in enumerate(docs)}
+    n = len(bodies)
+    flaky_429 = {f"/doc/{i}" for i in range(0, n, 7)}
+    flaky_5xx = {f"/doc/{i}" for i in range(3, n, 11)} - flaky_429
+    missing = [f"/missing/{i}" for i in range(max(1, n // 20))]
+    hits = Counter()
+    hit_at = {}          # path -> [(prolaz, vreme)]
+    phase = [1]
+    RETRY_AFTER = 0.2
+
+    async def handler(request):
+        path = request.path
+        hits[path] += 1
+        hit_at.setdefault(path, []).append((phase[0], time.monotonic()))
+        if path in flaky_429 and hits[path] == 1:
+            return web.Response(status=429, headers={"Retry-After": str(RETRY_AFTER)})
+        if path in flaky_5xx and hits[path] <= 2:
+            return web.Response(status=503)
+        if path not in bodies:
+            return web.Response(status=404)
+        return web.Response(body=bodies[path], content_type="application/octet-stream")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/{tail:.*}", handler)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        base = f"http://127.0.0.1:{port}"
+        urls = [base + p for p in list(bodies) + missing]
+        rawc = LocalContainer(ctx["work"], "fetch_raw")
+        state_path = os.path.join(ctx["work"], "fetch_state.jsonl")
+        store = make_store(rawc)
+        n_stored = 0
+
+        async def first_half(res):
+            nonlocal n_stored
+            info = await store(res)
+            n_stored += 1
+            if n_stored >= n // 2:
+                task.cancel()   # prekid usred preuzimanja (kao Ctrl-C / pad procesa)
+            return info
+
+        state = FetchState(state_path)
+        task = asyncio.ensure_future(fetch_all(urls, first_half, state=state, concurrency=8,
+                                               limiter=HostLimiter(rate=0), log=lambda *a: None))
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        state.close()
+        done_first = set(FetchState(state_path).done)
+        # pad usred upisa: poslednja linija bez \n; sledeci zapis ne sme da se nalepi na nju
+        with open(state_path, "a", encoding="utf-8") as f:
+            f.write('{"url": "' + base + '/torn')
+
+        state = FetchState(state_path)
+        phase[0] = 2
+        hits_before = Counter(hits)
+        t0 = time.perf_counter()
+        counts = await fetch_all(urls, store, state=state, concurrency=8, limiter=HostLimiter(rate=0), log=lambda *a: None)
+        dt = time.perf_counter() - t0
+        state.close()
+        await runner.cleanup()
+        return urls, base, rawc, state_path, done_first, hits_before, counts, dt
+
+    old = async_fetch.FETCH_BACKOFF
+    async_fetch.FETCH_BACKOFF = 0.01
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            urls, base, rawc, state_path, done_first, hits_before, counts, dt = asyncio.run(run())
+    finally:
+        async_fetch.FETCH_BACKOFF = old
+
+    final = FetchState(state_path)
+    final.close()
+    recs = final.done
+    expected = {base + p: hashlib.sha256(b).hexdigest() for p, b in bodies.items()}
+    stored = {b.name.split(".")[0] for b in rawc.list()}
+    checks = {
+        "all_docs_recorded": all(recs.get(u, {}).get("status") == 200 for u in expected),
+        "sha256_matches": all(recs[u].get("blob", "").split(".")[0] == h for u, h in expected.items() if u in recs)
+                          and stored == set(expected.values()),
+        "missing_404_recorded": all(recs.get(base + p, {}).get("status") == 404 for p in missing),
+        # URL koji je bio u letu kad je prvi prolaz prekinut preuzima se ponovo -> "najmanje"
+        "retry_after_429": all(hits[p] >= 2 for p in flaky_429),
+        "retry_5xx": all(hits[p] >= 3 for p in flaky_5xx),
+        "resume_partial": 0 < len(done_first) < len(urls),
+        "resume_skips_done": counts["skipped"] == len(done_first)
+                             and all(hits[u[len(base):]] == hits_before[u[len(base):]] for u in done_first),
+        "resume_completes": counts["skipped"] + counts["ok"] + counts["failed"] == len(urls)
+                            and set(recs) == set(urls),
+    }
+    # ponovni pokusaj posle 429 u istom prolazu ne sme doci pre Retry-After (prekinut prolaz ne pamti cekanje)
+    gaps = [h[1][1] - h[0][1] for h in (hit_at[p] for p in flaky_429) if len(h) > 1 and h[0][0] == h[1][0]]
+    checks["retry_after_429"] = checks["retry_after_429"] and bool(gaps) and min(gaps) >= RETRY_AFTER
+    failed = [k for k, ok in checks.items() if not ok]
+    if failed:
+        raise AssertionError(f"async_fetch checks failed: {', '.join(failed)}")
+    nbytes = sum(len(bodies[u[len(base):]]) for u in expected if u not in done_first)
+    return {**throughput(dt, counts["ok"], nbytes), "urls": len(urls), "resumed_from": len(done_first),
+            "requests": sum(hits.values()), "checks": checks}
+
+
+def stage_anonymize(ctx):
+    from anonymizer import Anonymizer
+    an = Anonymizer()
+    texts = [d.text for d in ctx["docs"]]
+    dt = best_of(lambda: [an.anonymize(t) for t in texts])
+    return throughput(dt, len(texts), ctx["text_bytes"])
+
+
+def stage_classify(ctx):
+    from decision_classifier import DecisionClassifier
+    clf = DecisionClassifier()
+    docs = ctx["docs"]
+    rules = [clf.classify(d.text)[3] for d in docs]
+    dt = best_of(lambda: [clf.classify(d.text) for d in docs])
+    agree = sum(1 for d, r in zip(docs, rules) if r == d.expected_rule)
+    return {**throughput(dt, len(docs), ctx["text_bytes"]),
+            "agreement": round(agree / max(len(docs), 1), 4), "rules": dict(Counter(rules).most_common())}
+
+
+def stage_dedup(ctx):
+    """near_dedup.py nad korpusom + BENCH_DUP podmetnutih kopija (poseban text kontejner):
+    pun i inkrementalni prolaz, stopa duplikata, preciznost/odziv prema podmetnutim kopijama."""
+    import near_dedup
+    from storage import LocalContainer
+    from build_corpus import DEDUP_BLOB_NAME
+    dups = near_duplicates(ctx["docs"], BENCH_DUP, ctx["seed"])
+    textc = LocalContainer(ctx["work"], "dedup_text")
+    corpusc = LocalContainer(ctx["work"], "dedup_corpus")
+    nbytes = 0
+    for d in ctx["docs"] + dups:
+        data = d.text.encode("utf-8")
+        textc.put(d.name, data, overwrite=True, length=len(data))
+        nbytes += len(data)
+    state = os.path.join(ctx["work"], "dedup_state")
+    quiet = lambda *a: None
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        st = near_dedup.run(textc, corpusc, state, log=quiet)
+        t_full = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        near_dedup.run(textc, corpusc, state, log=quiet)
+        t_incr = time.perf_counter() - t0
+    # alias je tacan ako su alias i kanonski ista presuda (original ili njegova kopija)
+    origin = {d.name: d.duplicate_of for d in dups}
+    found = correct = 0
+    with open(corpusc.path(DEDUP_BLOB_NAME), encoding="utf-8") as f:
+        for ln in f:
+            rec = json.loads(ln)
+            if "_dedup" in rec:
+                continue
+            found += 1
+            correct += origin.get(rec["blob"], rec["blob"]) == origin.get(rec["canonical"], rec["canonical"])
+    n = len(ctx["docs"]) + len(dups)
+    return {
+        **throughput(t_full, n, nbytes), "incremental_noop": throughput(t_incr, n, nbytes),
+        "planted": len(dups), "duplicates": st["duplicates"], "duplicate_rate": st["duplicate_rate"],
+        "candidate_pairs": st["candidate_pairs"],
+        "precision": round(correct / max(found, 1), 4), "recall": round(correct / max(len(dups), 1), 4),
+    }
+
+
+def stage_corpus(ctx):
+    from storage import LocalContainer
+    from build_corpus import build, BLOB_NAMES, OUTPUTS
+    textc = LocalContainer(ctx["work"], "text")
+    corpusc = LocalContainer(ctx["work"], "corpus")
+    t0 = time.perf_counter()
+    for d in ctx["docs"]:
+        data = d.text.encode("utf-8")
+        textc.put(d.name, data, overwrite=True, length=len(data))
+    t_upload = time.perf_counter() - t0
+    targets = {k: BLOB_NAMES[k] for k in OUTPUTS}
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        build(targets, textc, corpusc, incremental=False, fmt="jsonl")
+        t_full = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        build(targets, textc, corpusc, incremental=True, fmt="jsonl")
+        t_incr = time.perf_counter() - t0
+    ctx["gold_path"] = corpusc.path(BLOB_NAMES["gross"])
+    return {
+        "outputs": sorted(targets), "upload_seconds": round(t_upload, 4),
+        "full": throughput(t_full, len(ctx["docs"]), ctx["text_bytes"]),
+        "incremental_noop": throughput(t_incr, len(ctx["docs"]), ctx["text_bytes"]),
+        "output_bytes": {k: os.path.getsize(corpusc.path(v)) for k, v in targets.items()},
+    }
+
+
+def stage_index(ctx):
+    import build_index
+    from index_store import StringColumn
+    if "gold_path" not in ctx:
+        raise RuntimeError("needs the corpus stage")
+    index_path = os.path.join(ctx["work"], "bm25_index")
+    build_index.GOLD_JSONL = ctx["gold_path"]
+    build_index.INDEX_PATH = index_path
+    build_index.SEGMENTS_DIR = index_path + "_segments"
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        build_index.main()
+        dt = time.perf_counter() - t0
+    ctx["index_path"] = index_path
+    size = build_index.dir_size(index_path)
+    with open(ctx["gold_path"], "rb") as f:
+        n = sum(1 for ln in f if ln.strip())
+    return {**throughput(dt, n, os.path.getsize(ctx["gold_path"])), "index_bytes": size,
+            "terms": len(StringColumn(os.path.join(index_path, "terms")))}
+
+
+def query_plan(index, queries, n: int):
+    """n upita (q, filteri); 30% sa filterom iz stvarnih metapodataka indeksa, kao u /search."""
+    metas = [index.docs.meta(i) for i in range(min(len(index.docs), 200))]
+    rnd = random.Random(BENCH_SEED)
+    plan = []
+    for _ in range(n):
+        q = rnd.choice(queries)
+        f = {}
+        if metas and rnd.random() < 0.3:
+            m = rnd.choice(metas)
+            key = rnd.choice(("court", "upisnik", "godina"))
+            if key == "godina":
+                f = {"godina_from": m.get("godina"), "godina_to": m.get("godina")}
+            else:
+                f = {key: m.get(key)}
+        plan.append((q, f))
+    return plan
+
+
+def latency(index, plan) -> dict:
+    """Put kao u /search (parsiranje, filteri, BM25 ili fraze, isecci), bez HTTP-a i kesa."""
+    from phrase_query import parse_query, phrase_search
+    from snippets import make_snippet
+    lat, n_hits = [], 0
+    t_all = time.perf_counter()
+    for q, f in plan:
+        t0 = time.perf_counter()
+        pq = parse_query(q, index.tokenizer)
+        allowed = index.filters.filter(f.get("court"), f.get("upisnik"), f.get("godina_from"), f.get("godina_to"))
+        if pq.constrained:
+            hits = phrase_search(index, pq, k=10, allowed=allowed)
+        else:
+            hits = index.engine.search(pq.terms, k=10, allowed=allowed)
+        for i, _ in hits:
+            make_snippet(index, i, index.docs.text(i), pq.terms)
+        lat.append(time.perf_counter() - t0)
+        n_hits += len(hits)
+    dt = time.perf_counter() - t_all
+    lat.sort()
+    ms = lambda q: round(percentile(lat, q) * 1000, 3)
+    return {"queries": len(plan), "mean_hits": round(n_hits / max(len(plan), 1), 2),
+            "seconds": round(dt, 4), "qps": round(len(plan) / max(dt, 1e-9), 1),
+            "p50_ms": ms(0.50), "p95_ms": ms(0.95), "p99_ms": ms(0.99), "max_ms": round(lat[-1] * 1000, 3) if lat else 0.0}
+
+
+def stage_query(ctx):
+    from index_store import load_index
+    if "index_path" not in ctx:
+        raise RuntimeError("needs the index stage")
+    index = load_index(ctx["index_path"])
+    plan = query_plan(index, QUERIES, BENCH_QUERIES)
+    out = {"index_docs": len(index.docs), **latency(index, plan)}
+    t0 = time.perf_counter()
+    index.engine.search_batch([index.tokenizer.tokens(q) for q, _ in plan], k=10)
+    out["batch_qps"] = round(len(plan) / max(time.perf_counter() - t0, 1e-9), 1)
+    if index.positions is not None:
+        out["phrase"] = latency(index, query_plan(index, PHRASE_QUERIES, BENCH_QUERIES))
+    out["facets"] = facet_latency(index, plan[:max(1, BENCH_QUERIES // 4)])
+    return out
+
+
+def facet_latency(index, plan) -> dict:
+    """/facets bez kesa: ceo skup pogodaka + brojevi po svim poljima."""
+    from phrase_query import parse_query, match_mask
+    lat = []
+    for q, f in plan:
+        t0 = time.perf_counter()
+        allowed = index.filters.filter(f.get("court"), f.get("upisnik"), f.get("godina_from"), f.get("godina_to"))
+        index.filters.facets(match_mask(index, parse_query(q, index.tokenizer), allowed))
+        lat.append(time.perf_counter() - t0)
+    lat.sort()
+    ms = lambda q: round(percentile(lat, q) * 1000, 3)
+    return {"queries": len(plan), "qps": round(len(plan) / max(sum(lat), 1e-9), 1),
+            "p50_ms": ms(0.50), "p95_ms": ms(0.95), "p99_ms": ms(0.99)}
+
+
+def stage_dense(ctx):
+    """Vektori nad indeksom iz faze index: izgradnja, memorija po dokumentu, recall@10 IVF-a
+    naspram tacne pretrage i latencija mode=dense/hybrid."""
+    import dense_index
+    from index_store import load_index
+    from phrase_query import parse_query
+    if "index_path" not in ctx:
+        raise RuntimeError("needs the index stage")
+    path = ctx["index_path"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        t0 = time.perf_counter()
+        n = dense_index.build_dense(path, BENCH_EMBED_MODEL)
+        t_build = time.perf_counter() - t0
+    index, dense = load_index(path), dense_index.open_dense(path)
+    plan = query_plan(index, QUERIES + PARAPHRASE_QUERIES, max(1, BENCH_QUERIES // 4))
+    pqs = [parse_query(q, index.tokenizer) for q, _ in plan]
+
+    recall = []
+    for pq in pqs[:200]:
+        qv = dense.embed_query(pq.text)
+        exact = dense.search_exact(qv, 10)
+        if exact:
+            # sintetski korpus ima mnogo istih pasusa -> poredi se skor, ne id (izjednaceni skorovi)
+            floor = exact[-1][1] - 1e-6
+            recall.append(sum(s >= floor for _, s in dense.search(qv, 10)) / len(exact))
+    out = {"model": BENCH_EMBED_MODEL, "dim": dense.dim, "docs": n, "build_seconds": round(t_build, 4),
+           "bytes_per_doc": round(dense.nbytes() / max(n, 1), 1), "recall_at_10": round(sum(recall) / max(len(recall), 1), 4)}
+    for mode in ("dense", "hybrid"):
+        lat = []
+        for pq, (_, f) in zip(pqs, plan):
+            t0 = time.perf_counter()
+            allowed = index.filters.filter(f.get("court"), f.get("upisnik"), f.get("godina_from"), f.get("godina_to"))
+            dense_index.hybrid_search(index, dense, pq, k=10, allowed=allowed, mode=mode)
+            lat.append(time.perf_counter() - t0)
+        lat.sort()
+        ms = lambda q: round(percentile(lat, q) * 1000, 3)
+        out[mode] = {"queries": len(lat), "qps": round(len(lat) / max(sum(lat), 1e-9), 1),
+                     "p50_ms": ms(0.50), "p95_ms": ms(0.95), "p99_ms": ms(0.99)}
+    return out
+
+
+STAGES = {
+    "extract": stage_extract, "fetch": stage_fetch, "anonymize": stage_anonymize, "classify": stage_classify, "dedup": stage_dedup,
+    "corpus": stage_corpus, "index": stage_index, "query": stage_query, "dense": stage_dense,
+}
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def flatten(d: dict, prefix: str = ""):
+    for k, v in d.items():
+        if isinstance(v, dict):
+            yield from flatten(v, f"{prefix}{k}.")
+        else:
+            yield f"{prefix}{k}", v
+
+
+def compare(new: dict, old: dict):
+    """Odnos novo/staro za metrike propusnosti i latencije; '+' znaci poboljsanje."""
+    a = dict(flatten(old.get("stages", {})))
+    for key, v in flatten(new.get("stages", {})):
+        leaf = key.rsplit(".", 1)[-1]
+        if leaf not in HIGHER + LOWER or key not in a or not isinstance(v, (int, float)) or not a[key]:
+            continue
+        ratio = v / a[key]
+        better = ratio > 1 if leaf in HIGHER else ratio < 1
+        print(f"  {key:<40} {a[key]:>12} -> {v:<12} x{ratio:.2f} {'+' if better else '-'}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="End-to-end benchmarks on a synthetic Serbian court corpus.")
+    ap.add_argument("--docs", type=int, default=BENCH_DOCS)
+    ap.add_argument("--seed", type=int, default=BENCH_SEED)
+    ap.add_argument("--stages", default=BENCH_STAGES, help=f"comma-separated: {','.join(STAGES)}")
+    ap.add_argument("--formats", default=BENCH_FORMATS, help="extraction formats: txt,docx,odt,pdf")
+    ap.add_argument("--out", default=BENCH_OUT)
+    ap.add_argument("--compare", help="previous results JSON to compare against")
+    ap.add_argument("--keep", action="store_true", help="keep the temporary work directory")
+    args = ap.parse_args(argv)
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    bad = [s for s in stages if s not in STAGES] + [f for f in formats if f not in RENDERERS]
+    if bad:
+        raise SystemExit(f"Unknown stages/formats: {', '.join(bad)}")
+
+    t0 = time.perf_counter()
+    docs = generate(args.docs, args.seed)
+    t_gen = time.perf_counter() - t0
+    work = tempfile.mkdtemp(prefix="bench_suite_")
+    ctx = {"docs": docs, "seed": args.seed, "formats": formats, "work": work, "text_bytes": sum(len(d.text.encode("utf-8")) for d in docs)}
+    results = {
+        "meta": {
+            "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "commit": git_commit(),
+            "python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count(),
+            "docs": args.docs, "seed": args.seed, "text_bytes": ctx["text_bytes"], "generate_seconds": round(t_gen, 4),
+            "categories": dict(Counter(d.category for d in docs)), "scripts": dict(Counter(d.script for d in docs)),
+        },
+        "stages": {},
+    }
+    try:
+        for name in stages:
+            print(f"[{name}] ...", file=sys.stderr, flush=True)
+            try:
+                results["stages"][name] = STAGES[name](ctx)
+            except (ImportError, RuntimeError) as e:
+                # nedostaje opcioni paket ili prethodna faza -> zabelezi i nastavi
+                results["stages"][name] = {"skipped": f"{type(e).__name__}: {e}"}
+    finally:
+        if args.keep:
+            print(f"Work dir kept: {work}", file=sys.stderr)
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    for name, r in results["stages"].items():
+        flat = dict(flatten(r))
+        shown = {k: v for k, v in flat.items() if k.rsplit(".", 1)[-1] in HIGHER + LOWER + ("skipped", "agreement")}
+        print(f"{name:<10} " + "  ".join(f"{k}={v}" for k, v in shown.items()))
+    print(f"Results -> {args.out}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        print(f"Compare with {args.compare} (commit {old.get('meta', {}).get('commit')}):")
+        compare(results, old)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+import os, time
+from storage import BlobNotFound
+
+
+# raw blobovi bez upotrebljivog teksta (nepodrzan format, prekratak tekst) dobijaju
+# prazan marker u text kontejneru, da se pri sledecem pokretanju ne preuzimaju ponovo;
+# marker pamti formate koje je skripta umela da ekstrahuje (metadata "extractors")
+SKIP_PREFIX = "_skip/"
+
+
+def text_name_for(raw_name: str) -> str:
+    base = os.path.splitext(os.path.basename(raw_name))[0]
+    return f"{base}.txt"
+
+
+def skip_marker_for(out_name: str) -> str:
+    return SKIP_PREFIX + os.path.splitext(out_name)[0] + ".skip"
+
+
+def _delete_quietly(textc, name: str):
+    try:
+        textc.delete(name)
+    except BlobNotFound:
+        pass
+
+
+def mark_skipped(textc, raw_name: str, out_name: str, etag: str, reason: str, extractors=(), overwrite=False):
+    """Skip marker umesto .txt. `overwrite` (izmenjen raw blob): .txt iz prethodnog etag-a
+    se brise, inace bi ostao u korpusu i planirao se ponovo pri svakom pokretanju."""
+    textc.put(skip_marker_for(out_name), b"", overwrite=True,
+              metadata={"source_blob": raw_name, "source_etag": etag, "reason": reason,
+                        "extractors": ",".join(sorted(extractors))})
+    if overwrite:
+        _delete_quietly(textc, out_name)
+
+
+def mark_written(textc, out_name: str, overwrite=False):
+    """Posle upisa .txt za izmenjen (ili ponovo planiran) blob: stari skip marker vise ne vazi."""
+    if overwrite:
+        _delete_quietly(textc, skip_marker_for(out_name))
+
+
+def plan_text_work(raw, textc, extractors=()):
+    """Jedan listing raw i text kontejnera -> lista (raw_name, out_name, etag, overwrite).
+
+    Posao postoji za raw blob ako njegov .txt (ili skip marker) ne postoji, ili ako je
+    napravljen iz drugog etag-a istog raw bloba (metadata source_etag). Stari .txt bez
+    source_etag se smatraju azurnim. "unsupported" marker se planira ponovo ako ga je
+    napisala skripta koja nije imala neki od `extractors` ove skripte (npr. .doc).
+    Listing ide stranicu po stranicu (Azure: do 5000 blobova po pozivu), bez exists()
+    poziva po blobu.
+    """
+    t0 = time.time()
+    existing = {}
+    n_text = 0
+    for b in textc.list(metadata=True):
+        n_text += 1
+        md = b.metadata or {}
+        name = b.name
+        retry = False
+        if name.startswith(SKIP_PREFIX):
+            name = os.path.splitext(name[len(SKIP_PREFIX):])[0] + ".txt"
+            if name in existing:
+                continue
+            if (md.get("reason") or "").startswith("unsupported"):
+                retry = not set(extractors) <= set((md.get("extractors") or "").split(","))
+        existing[name] = (md.get("source_blob"), md.get("source_etag"), retry)
+
+    work, planned = [], set()
+    n_raw = n_new = n_changed = n_retry = n_skip = 0
+    for b in raw.list():
+        n_raw += 1
+        out_name = text_name_for(b.name)
+        if out_name in planned:
+            # vise raw fajlova sa istim imenom (npr. .pdf i .doc) -> prvi pobedjuje
+            n_skip += 1
+            continue
+        prev = existing.get(out_name)
+        etag = (b.etag or "").strip('"')
+        if prev is None:
+            work.append((b.name, out_name, etag, False))
+            n_new += 1
+        elif prev[0] == b.name and prev[1] and prev[1] != etag:
+            work.append((b.name, out_name, etag, True))
+            n_changed += 1
+        elif prev[0] == b.name and prev[2]:
+            work.append((b.name, out_name, etag, True))
+            n_retry += 1
+        else:
+            n_skip += 1
+            continue
+        planned.add(out_name)
+
+    print(f"PLAN: raw={n_raw} text={n_text} todo={len(work)} (new {n_new}, changed {n_changed}, "
+          f"retry unsupported {n_retry}), "
+          f"up-to-date {n_skip} [{time.time()-t0:.1f}s]", flush=True)
+    return work
@@ -0,0 +1,244 @@
+import numpy as np
+
+
+class BM25Engine:
+    """Inverted-index BM25 (Okapi) sa top-k pretragom.
+
+    Skorovi su identicni rank_bm25.BM25Okapi.get_scores(), ali se racunaju
+    samo za dokumente koji sadrze bar jedan termin upita.
+    """
+
+    def __init__(self, vocab, idf, post_offsets, post_docs, post_tfs, doc_len, avgdl, k1=1.5, b=0.75, norm=None):
+        self.vocab = vocab                  # term -> term id
+        self.idf = idf                      # float64[V]
+        self.post_offsets = post_offsets    # int64[V+1], CSR granice postinga
+        self.post_docs = post_docs          # int32, sortirani doc id-jevi po terminu
+        self.post_tfs = post_tfs            # int32, term frequency
+        self.doc_len = doc_len
+        self.n_docs = len(doc_len)
+        self.avgdl = avgdl
+        self.k1 = k1
+        self.b = b
+        # isti redosled operacija kao u rank_bm25 -> bit-identicni skorovi
+        self.norm = norm if norm is not None else k1 * (1 - b + b * np.asarray(doc_len) / avgdl)
+
+    @classmethod
+    def from_rank_bm25(cls, bm25):
+        terms = {}
+        docs_per_term = []
+        tfs_per_term = []
+        for d, freqs in enumerate(bm25.doc_freqs):
+            for term, tf in freqs.items():
+                tid = terms.get(term)
+                if tid is None:
+                    tid = terms[term] = len(docs_per_term)
+                    docs_per_term.append([])
+                    tfs_per_term.append([])
+                docs_per_term[tid].append(d)
+                tfs_per_term[tid].append(tf)
+
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(p) for p in docs_per_term])
+        post_docs = np.fromiter((d for p in docs_per_term for d in p), dtype=np.int32, count=int(offsets[-1]))
+        post_tfs = np.fromiter((t for p in tfs_per_term for t in p), dtype=np.int32, count=int(offsets[-1]))
+        idf = np.array([bm25.idf.get(t) or 0.0 for t in terms], dtype=np.float64)
+        doc_len = np.asarray(bm25.doc_len, dtype=np.int32)
+        return cls(terms, idf, offsets, post_docs, post_tfs, doc_len, bm25.avgdl, k1=bm25.k1, b=bm25.b)
+
+    def term_id(self, term: str):
+        return self.vocab.get(term)
+
+    def postings(self, tid: int):
+        lo, hi = self.post_offsets[tid], self.post_offsets[tid + 1]
+        return self.post_docs[lo:hi], self.post_tfs[lo:hi]
+
+    @staticmethod
+    def _restrict(docs, tfs, allowed):
+        """Postinzi ograniceni na dozvoljene dokumente (bool maska ili sortirani id-jevi)."""
+        if allowed.dtype == bool:
+            keep = allowed[docs]
+            return docs[keep], tfs[keep]
+        if not len(docs) or not len(allowed):
+            return docs[:0], tfs[:0]
+        if len(allowed) < len(docs):
+            pos = np.minimum(np.searchsorted(docs, allowed), len(docs) - 1)
+            pos = pos[docs[pos] == allowed]
+            return docs[pos], tfs[pos]
+        pos = np.minimum(np.searchsorted(allowed, docs), len(allowed) - 1)
+        keep = allowed[pos] == docs
+        return docs[keep], tfs[keep]
+
+    def _contrib(self, tid, docs, tfs):
+        return self.idf[tid] * (tfs * (self.k1 + 1) / (tfs + self.norm[docs]))
+
+    def _candidates(self, qterms, k, allowed):
+        """Skup kandidata (term-at-a-time, MaxScore "continue" strategija).
+
+        Termini se obradjuju po opadajucoj gornjoj granici doprinosa; cim
+        zbir preostalih granica padne ispod k-tog parcijalnog skora, novi
+        dokumenti vise ne mogu uci u top-k pa se samo azuriraju postojeci.
+        """
+        ub = {tid: cnt * self.idf[tid] * (self.k1 + 1) for tid, cnt in qterms.items()}
+        order = sorted(qterms, key=lambda tid: ub[tid], reverse=True)
+        remaining = sum(ub.values())
+
+        cand = np.empty(0, dtype=np.int32)
+        partial = np.empty(0, dtype=np.float64)
+        closed = False
+        for tid in order:
+            docs, tfs = self.postings(tid)
+            if allowed is not None:
+                docs, tfs = self._restrict(docs, tfs, allowed)
+            remaining -= ub[tid]
+            if not len(docs):
+                continue
+            if closed:
+                pos = np.minimum(np.searchsorted(docs, cand), len(docs) - 1)
+                hit = docs[pos] == cand
+                partial[hit] += qterms[tid] * self._contrib(tid, cand[hit], tfs[pos[hit]])
+            else:
+                ids = np.concatenate((cand, docs))
+                w = np.concatenate((partial, qterms[tid] * self._contrib(tid, docs, tfs)))
+                cand, inv = np.unique(ids, return_inverse=True)
+                partial = np.bincount(inv, weights=w)
+                cand = cand.astype(np.int32, copy=False)
+                if len(cand) >= k and remaining < np.partition(partial, -k)[-k]:
+                    closed = True
+        return cand
+
+    def score_docs(self, qtok, docs):
+        """Tacni BM25 skorovi za zadate (sortirane) dokumente, redom tokena upita."""
+        docs = np.asarray(docs, dtype=np.int32)
+        score = np.zeros(len(docs))
+        if not len(docs):
+            return score
+        for t in qtok:
+            tid = self.term_id(t)
+            if tid is None:
+                continue
+            pdocs, ptfs = self.postings(tid)
+            if not len(pdocs):
+                continue
+            pos = np.minimum(np.searchsorted(pdocs, docs), len(pdocs) - 1)
+            hit = pdocs[pos] == docs
+            score += np.where(hit, self._contrib(tid, docs, ptfs[pos]), 0.0)
+        return score
+
+    def search(self, qtok, k=10, allowed=None):
+        """Top-k (doc_idx, score), sortirano po skoru pa po doc_idx (kao stabilan sort).
+
+        `allowed` (filteri) je opciona bool maska duzine n_docs ili sortiran
+        niz dozvoljenih doc id-jeva; bodovanje se tada radi samo nad tim skupom.
+        Ako ima manje od k pogodaka, dopunjava se dokumentima sa skorom 0
+        u redosledu indeksa, isto kao sortiranje svih N skorova.
+        """
+        qterms = {}
+        for t in qtok:
+            tid = self.term_id(t)
+            if tid is not None:
+                qterms[tid] = qterms.get(tid, 0) + 1
+
+        if any(self.idf[tid] < 0 for tid in qterms):
+            # negativan idf (mali korpusi): dokumenti bez termina imaju veci skor, skoruj sve
+            cand = np.arange(self.n_docs, dtype=np.int32) if allowed is None else self._allowed_ids(allowed)
+        elif qterms:
+            cand = self._candidates(qterms, k, allowed)
+        else:
+            cand = np.empty(0, dtype=np.int32)
+        return self._top_k(cand, self.score_docs(qtok, cand), k, allowed)
+
+    def search_in(self, qtok, docs, k=10):
+        """Top-k samo medju zadatim (sortiranim) dokumentima, npr. onima koji zadovoljavaju
+        frazu; bez dopune dokumentima van skupa."""
+        docs = np.asarray(docs, dtype=np.int32)
+        return self._top_k(docs, self.score_docs(qtok, docs), k, docs)
+
+    def search_batch(self, queries, k=10, allowed=None):
+        """Vise upita odjednom; vraca listu rezultata kao search() za svaki upit.
+
+        Postinzi i BM25 doprinosi svakog termina racunaju se jednom za ceo batch,
+        a skorovi svih upita se akumuliraju jednim bincount-om nad kljucem
+        (upit, dokument). `k` i `allowed` mogu biti skalari ili liste po upitu.
+        """
+        nq = len(queries)
+        ks = list(k) if isinstance(k, (list, tuple)) else [k] * nq
+        alloweds = list(allowed) if isinstance(allowed, (list, tuple)) else [allowed] * nq
+        results = [None] * nq
+
+        # doprinosi po terminu, jednom za ceo batch
+        contrib = {}
+        term_ids = {}
+        keys, weights = [], []
+        for qi, qtok in enumerate(queries):
+            for t in qtok:
+                if t not in term_ids:
+                    term_ids[t] = self.term_id(t)
+            tids = [term_ids[t] for t in qtok]
+            tids = [tid for tid in tids if tid is not None]
+            if not tids or any(self.idf[tid] < 0 for tid in tids):
+                results[qi] = self.search(qtok, k=ks[qi], allowed=alloweds[qi])
+                continue
+            for tid in tids:  # redom tokena upita (sa duplikatima), kao rank_bm25
+                c = contrib.get(tid)
+                if c is None:
+                    docs, tfs = self.postings(tid)
+                    c = contrib[tid] = (np.asarray(docs, dtype=np.int64), self._contrib(tid, docs, tfs))
+                docs, w = c
+                if alloweds[qi] is not None:
+                    pos = self._restrict(docs, np.arange(len(docs)), alloweds[qi])[1]
+                    docs, w = docs[pos], w[pos]
+                keys.append(docs + qi * self.n_docs)
+                weights.append(w)
+
+        if keys:
+            # kljucevi su niz sortiranih blokova -> stabilan (tim)sort je skoro linearan,
+            # a bincount sabira doprinose redom tokena (bit-identicno sa search())
+            keys = np.concatenate(keys)
+            perm = np.argsort(keys, kind="stable")
+            sk = keys[perm]
+            first = np.empty(len(sk), dtype=bool)
+            first[:1] = True
+            np.not_equal(sk[1:], sk[:-1], out=first[1:])
+            inv = np.empty(len(sk), dtype=np.int64)
+            inv[perm] = np.cumsum(first) - 1
+            uniq = sk[first]
+            scores = np.bincount(inv, weights=np.concatenate(weights))
+            bounds = np.searchsorted(uniq, np.arange(nq + 1, dtype=np.int64) * self.n_docs)
+        for qi in range(nq):
+            if results[qi] is not None:
+                continue
+            lo, hi = bounds[qi], bounds[qi + 1]
+            cand = (uniq[lo:hi] - qi * self.n_docs).astype(np.int32)
+            results[qi] = self._top_k(cand, scores[lo:hi], ks[qi], alloweds[qi])
+        return results
+
+    def _top_k(self, cand, score, k, allowed):
+        if len(cand) > k:
+            thr = np.partition(score, -k)[-k]
+            sel = score >= thr
+            cand, score = cand[sel], score[sel]
+        order = np.lexsort((cand, -score))[:k]
+        out = [(int(cand[i]), float(score[i])) for i in order]
+
+        if len(out) < k:
+            if allowed is None:
+                mask = np.ones(self.n_docs, dtype=bool)
+                mask[cand] = False
+                rest = np.flatnonzero(mask)
+            else:
+                rest = np.setdiff1d(self._allowed_ids(allowed), cand, assume_unique=True)
+            out += [(int(i), 0.0) for i in rest[: k - len(out)]]
+        return out
+
+    @staticmethod
+    def _allowed_ids(allowed):
+        return np.flatnonzero(allowed).astype(np.int32) if allowed.dtype == bool else np.asarray(allowed, dtype=np.int32)
+
+
+def okapi_idf(df, n_docs, epsilon=0.25):
+    """idf kao u rank_bm25.BM25Okapi: negativne vrednosti -> epsilon * prosecan idf."""
+    df = np.asarray(df, dtype=np.float64)
+    idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+    if len(idf):
+        idf[idf < 0] = epsilon * idf.mean()
+    return idf
@@ -0,0 +1,393 @@
+import os, re, json, time, hashlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from storage import BlobNotFound, get_container
+from corpus_format import (CORPUS_FORMAT, CORPUS_PARQUET, ParquetExport, blob_name_for, check_format,
+                           open_corpus_lines, open_corpus_writer, parquet_name)
+from decision_classifier import DecisionClassifier
+
+# Jedan prolaz kroz text kontejner -> vise JSONL izlaza odjednom. Svaki .txt blob se
+# preuzima jednom (CORPUS_IO_WORKERS paralelno, redosled kao u listingu) i prosledjuje
+# izabranim izlazima; izlazi se strimuju u storage (open_writer: staged blocks na Azure-u),
+# pa memorija ne zavisi od velicine korpusa.
+#   CORPUS_OUTPUTS=full,anon,minimal,gross python3 build_corpus.py
+# Format izlaza (jsonl | zst | gz + .idx indeks) i Parquet izvoz: corpus_format.py
+TEXT_CONTAINER = os.environ.get("TEXT_CONTAINER","text")
+CORPUS_CONTAINER = os.environ.get("CORPUS_CONTAINER","corpus")
+CORPUS_OUTPUTS = os.environ.get("CORPUS_OUTPUTS", "full,anon,minimal,gross")
+CORPUS_IO_WORKERS = int(os.environ.get("CORPUS_IO_WORKERS", "8"))
+# najvise ovoliko preuzetih/u toku blobova ceka na obradu
+CORPUS_PREFETCH = int(os.environ.get("CORPUS_PREFETCH", str(4 * CORPUS_IO_WORKERS)))
+PROGRESS_EVERY = int(os.environ.get("PROGRESS_EVERY", "5000"))
+# inkrementalno: <izlaz>.manifest.jsonl pored izlaza pamti (blob, etag, verzija) po dokumentu;
+# nepromenjeni blobovi se ne preuzimaju, njihovi zapisi se kopiraju iz prethodnog izlaza
+CORPUS_INCREMENTAL = os.environ.get("CORPUS_INCREMENTAL", "1") == "1"
+# near-duplikati (near_dedup.py): alias blobovi se preskacu, kanonski zapis dobija "aliases"
+DEDUP_BLOB_NAME = os.environ.get("DEDUP_BLOB_NAME", "near_duplicates.jsonl")
+CORPUS_DEDUP = os.environ.get("CORPUS_DEDUP", "1") == "1"
+
+BLOB_NAMES = {
+    "full": os.environ.get("CORPUS_BLOB_NAME", "corpus.jsonl"),
+    "anon": os.environ.get("ANON_BLOB_NAME", "corpus_anon.jsonl"),
+    "minimal": os.environ.get("MINIMAL_BLOB_NAME", "corpus_minimal.jsonl"),
+    "gross": os.environ.get("GOLD_BLOB_NAME", "gross_negligence_gold_candidates.jsonl"),
+}
+
+FNAME_RE = re.compile(r"^(?P<court>.+?)-(?P<upisnik>[a-z]+\d*)-(?P<broj>\d{3,5})-(?P<godina>\d{4})\.txt$", re.IGNORECASE)
+
+def normalize_court_slug(slug: str) -> str:
+    return slug.strip().replace("_", "-")
+
+def humanize_slug(slug: str) -> str:
+    parts = slug.split("-")
+    out = []
+    for w in parts:
+        if w in {"u", "na", "i"}:
+            out.append(w)
+        else:
+            out.append(w.capitalize())
+    return " ".join(out)
+
+def sha256(s: str) -> str:
+    return hashlib.sha256(s.encode("utf-8", errors="ignore")).hexdigest()
+
+def len_doc_id(name: str, txt: str) -> str:
+    # full/anon korpus: id iz imena i duzine teksta
+    return sha256(name + "|" + str(len(txt)))
+
+def text_doc_id(name: str, txt: str) -> str:
+    # gold kandidati: id iz imena i hash-a teksta
+    return sha256(name + "|" + sha256(txt))
+
+CLASSIFIER = DecisionClassifier()
+
+def pick_decision_paragraph(txt: str):
+    return CLASSIFIER.classify(txt)
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def manifest_name(blob_name: str) -> str:
+    return blob_name + ".manifest.jsonl"
+
+
+class CorpusOutput:
+    """Jedan JSONL izlaz: filter po imenu bloba + pravljenje zapisa."""
+    kind = ""
+    # menja se kad se promeni format zapisa -> sledeci build sve pravi iznova
+    version = "1"
+    # kolone <izlaz>.meta.parquet (CORPUS_PARQUET=1): polja zapisa bez teksta, tipovi iz corpus_format.PARQUET_TYPES
+    parquet_fields = {}
+
+    def __init__(self, blob_name: str):
+        self.blob_name = blob_name
+        self.n = 0
+        self.skipped_name = 0
+        self.reused = self.processed = 0
+        self.prev = {}          # blob -> red iz prethodnog manifesta
+        self.old = None         # reader prethodnog izlaza
+        self.old_pos = 0        # sledeca linija u prethodnom izlazu
+        self.last_planned = -1
+
+    def load_previous(self, corpusc):
+        """Manifest vazi samo ako je kompletan (zavrsni red) i odgovara velicini izlaza."""
+        try:
+            rows, trailer = {}, None
+            with corpusc.open_reader(manifest_name(self.blob_name)) as f:
+                for ln in f:
+                    rec = json.loads(ln)
+                    if "_output" in rec:
+                        trailer = rec
+                    else:
+                        rows[rec["blob"]] = rec
+            if trailer is None or corpusc.info(self.blob_name).size != trailer["bytes"]:
+                return
+            self.old = open_corpus_lines(corpusc, self.blob_name)
+        except (BlobNotFound, ValueError, KeyError):
+            return
+        self.prev = rows
+
+    def plan(self, name: str, etag: str, aliases=None):
+        """-> prethodni red manifesta ako se zapis moze preuzeti bez obrade, inace None."""
+        prev = self.prev.get(name)
+        if prev is None or prev["etag"] != etag or prev["version"] != self.version or prev.get("aliases") != aliases:
+            return None
+        line = prev["line"]
+        if line is not None:
+            # prethodni izlaz se cita samo unapred (isti redosled listinga)
+            if line <= self.last_planned:
+                return None
+            self.last_planned = line
+        return prev
+
+    def old_line(self, line: int) -> bytes:
+        while self.old_pos < line:
+            self.old.readline()
+            self.old_pos += 1
+        self.old_pos += 1
+        return self.old.readline()
+
+    def close_previous(self):
+        if self.old is not None:
+            self.old.close()
+            self.old = None
+
+    def accepts(self, name: str) -> bool:
+        return name.lower().endswith(".txt")
+
+    def record(self, name: str, txt: str) -> dict:
+        raise NotImplementedError
+
+    def summary(self, nbytes: int) -> str:
+        return (f"Wrote {self.n} docs to {CORPUS_CONTAINER}/{self.blob_name} ({nbytes} bytes; "
+                f"processed {self.processed}, reused {self.reused})")
+
+
+class FullOutput(CorpusOutput):
+    kind = "full"
+    parquet_fields = {"doc_id": "string", "source_text_blob": "string", "char_len": "int", "ingested_at": "string"}
+
+    def record(self, name, txt):
+        return {
+            "doc_id": len_doc_id(name, txt),
+            "source_text_blob": name,
+            "char_len": len(txt),
+            "ingested_at": now_iso(),
+            "text": txt,
+        }
+
+
+class AnonOutput(FullOutput):
+    kind = "anon"
+
+    def accepts(self, name):
+        return name.endswith(".anon.txt")
+
+
+class MinimalOutput(CorpusOutput):
+    kind = "minimal"
+    parquet_fields = {"filename": "string"}
+
+    def record(self, name, txt):
+        return {
+            "filename": name,   # ključno polje za kasnije učenje
+            "text": txt
+        }
+
+
+class GrossOutput(CorpusOutput):
+    kind = "gross"
+    version = "1+" + DecisionClassifier.VERSION
+    parquet_fields = {
+        "doc_id": "string", "file_name": "string", "court": "string", "court_slug": "string",
+        "upisnik": "string", "broj": "int", "godina": "int",
+        "gross_negligence": "int", "not_gross_negligence": "int",
+        "decision_paragraph": "string", "paragraph_index": "int", "paragraph_count": "int",
+        "matched_spans": "json", "auto_rule": "string", "confidence": "float", "abstain": "bool",
+        "verification_status": "string", "label_source": "string", "verified_label": "int",
+        "text_hash": "string", "ingested_at": "string", "char_len": "int",
+    }
+
+    def accepts(self, name):
+        if not name.endswith(".txt"):
+            return False
+        if not FNAME_RE.match(name):
+            self.skipped_name += 1
+            return False
+        return True
+
+    def record(self, name, txt):
+        m = FNAME_RE.match(name)
+        court_slug = normalize_court_slug(m.group("court"))
+        para, pidx, pcount, rule, label, conf, abstain, spans = pick_decision_paragraph(txt)
+        return {
+            "doc_id": text_doc_id(name, txt),
+            "file_name": name,
+            "court": humanize_slug(court_slug),
+            "court_slug": court_slug,
+            "upisnik": m.group("upisnik").lower(),
+            "broj": int(m.group("broj")),
+            "godina": int(m.group("godina")),
+
+            "gross_negligence": 1 if label == 1 else 0,
+            "not_gross_negligence": 1 if label == 0 else 0,
+
+            "decision_paragraph": para,
+            "paragraph_index": pidx,
+            "paragraph_count": pcount,
+            "matched_spans": spans,
+            "auto_rule": rule,
+
+            "confidence": conf,
+            "abstain": bool(abstain),
+
+            "verification_status": "auto",
+            "label_source": "auto_rule",
+            "verified_label": None,
+
+            "text_hash": sha256(txt),
+            "ingested_at": now_iso(),
+            "char_len": len(txt),
+        }
+
+    def summary(self, nbytes):
+        return super().summary(nbytes) + f". Skipped (bad filename): {self.skipped_name}"
+
+
+OUTPUTS = {o.kind: o for o in (FullOutput, AnonOutput, MinimalOutput, GrossOutput)}
+
+
+def load_aliases(corpusc, blob_name: str = DEDUP_BLOB_NAME):
+    """near_dedup.py izlaz -> ({alias: (etag, kanonski)}, {kanonski: [aliasi]}); bez bloba prazno."""
+    alias_of, aliases = {}, {}
+    try:
+        with corpusc.open_reader(blob_name) as f:
+            for ln in f:
+                rec = json.loads(ln)
+                if "_dedup" in rec:
+                    continue
+                alias_of[rec["blob"]] = (rec["etag"], rec["canonical"])
+                aliases.setdefault(rec["canonical"], []).append(rec["blob"])
+    except BlobNotFound:
+        pass
+    return alias_of, aliases
+
+
+def build(targets: dict, textc=None, corpusc=None, incremental: bool = CORPUS_INCREMENTAL,
+          fmt: str = CORPUS_FORMAT, parquet: bool = CORPUS_PARQUET, dedup: bool = CORPUS_DEDUP):
+    """targets = {kind: blob_name}; jedan listing i jedno preuzimanje po blobu za sve izlaze.
+    Inkrementalno se preuzimaju samo novi/izmenjeni blobovi (ili svi za izlaz cija se verzija promenila).
+    dedup: alias blobovi iz near_dedup.py se preskacu (ako im se etag nije promenio i kanonski postoji)."""
+    unknown = set(targets) - set(OUTPUTS)
+    if unknown:
+        raise SystemExit(f"Unknown corpus outputs: {', '.join(sorted(unknown))} (choose from {', '.join(OUTPUTS)})")
+    if len(set(targets.values())) < len(targets):
+        raise SystemExit(f"Corpus outputs must write to different blobs: {targets}")
+    check_format(fmt)
+    textc = textc or get_container(TEXT_CONTAINER)
+    corpusc = corpusc or get_container(CORPUS_CONTAINER)
+
+    outputs = [OUTPUTS[k](blob_name_for(blob, fmt)) for k, blob in targets.items()]
+    if incremental:
+        for o in outputs:
+            o.load_previous(corpusc)
+    writers = {o.kind: open_corpus_writer(corpusc, o.blob_name, fmt) for o in outputs}
+    # "aliases" (near_dedup.py) moze dobiti zapis svakog izlaza
+    exports = {o.kind: ParquetExport(corpusc, parquet_name(o.blob_name), {**o.parquet_fields, "aliases": "list<string>"})
+               for o in outputs} if parquet else {}
+    manifests = {o.kind: corpusc.open_writer(manifest_name(o.blob_name)) for o in outputs}
+    alias_of, aliases = load_aliases(corpusc) if dedup else ({}, {})
+    present = {}
+    t0 = time.time()
+    n_listed = n_read = n_alias = 0
+    seen = {o.kind: 0 for o in outputs}
+    aliased = {o.kind: 0 for o in outputs}   # bili u prethodnom izlazu, sada near-dup alias
+
+    def is_alias(b):
+        dup = alias_of.get(b.name)
+        if dup is None or dup[0] != b.etag:
+            return False
+        if dup[1] not in present:
+            present[dup[1]] = textc.exists(dup[1])
+        return present[dup[1]]
+
+    def fetch(name):
+        return textc.get(name).decode("utf-8", errors="ignore").strip()
+
+    def emit(o, row, line):
+        if line is not None:
+            # kljuc za .idx: doc_id, a za minimal (bez doc_id) ime bloba
+            writers[o.kind].add(line, row["doc_id"] or row["blob"])
+            if exports:
+                exports[o.kind].add(line)
+            row["line"] = o.n
+            o.n += 1
+        else:
+            row["line"] = None
+        manifests[o.kind].write((json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    def consume(name, etag, plan, fut):
+        txt = fut.result() if fut is not None else None
+        for o, prev in plan:
+            if prev is not None:
+                o.reused += 1
+                line = o.old_line(prev["line"]) if prev["line"] is not None else None
+                emit(o, dict(prev), line)
+                continue
+            o.processed += 1
+            row = {"blob": name, "etag": etag, "version": o.version, "doc_id": None, "text_hash": None}
+            if name in aliases:
+                row["aliases"] = aliases[name]
+            if len(txt) < 50:
+                emit(o, row, None)
+                continue
+            rec = o.record(name, txt)
+            if name in aliases:
+                rec["aliases"] = aliases[name]
+            row["doc_id"] = rec.get("doc_id")
+            row["text_hash"] = sha256(txt)
+            emit(o, row, (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    try:
+        with ThreadPoolExecutor(CORPUS_IO_WORKERS, thread_name_prefix="get") as pool:
+            window = deque()
+            for b in textc.list():
+                wanted = [o for o in outputs if o.accepts(b.name)]
+                if not wanted:
+                    continue
+                if alias_of and is_alias(b):
+                    n_alias += 1
+                    for o in wanted:
+                        if b.name in o.prev:
+                            aliased[o.kind] += 1
+                    continue
+                n_listed += 1
+                plan = []
+                for o in wanted:
+                    if b.name in o.prev:
+                        seen[o.kind] += 1
+                    plan.append((o, o.plan(b.name, b.etag, aliases.get(b.name))))
+                fut = None
+                if any(prev is None for _, prev in plan):
+                    fut = pool.submit(fetch, b.name)
+                    n_read += 1
+                window.append((b.name, b.etag, plan, fut))
+                if len(window) >= CORPUS_PREFETCH:
+                    consume(*window.popleft())
+                if PROGRESS_EVERY and n_listed % PROGRESS_EVERY == 0:
+                    print(f"PROGRESS: {n_listed} blobs, {n_read} downloaded [{time.time()-t0:.0f}s]", flush=True)
+            while window:
+                consume(*window.popleft())
+    except BaseException:
+        for w in (*writers.values(), *manifests.values(), *exports.values()):
+            w.abort()
+        for o in outputs:
+            o.close_previous()
+        raise
+    for o in outputs:
+        o.close_previous()
+        writers[o.kind].close()
+        # zavrsni red: manifest bez njega (ili sa drugom velicinom izlaza) se ne koristi
+        trailer = {"_output": o.blob_name, "bytes": writers[o.kind].bytes, "docs": o.n, "version": o.version}
+        manifests[o.kind].write((json.dumps(trailer) + "\n").encode("utf-8"))
+        manifests[o.kind].close()
+        if exports:
+            exports[o.kind].close()
+
+    for o in outputs:
+        removed = len(o.prev) - seen[o.kind] - aliased[o.kind]
+        print(o.summary(writers[o.kind].bytes) + (f", removed {removed}" if removed else "")
+              + (f", {aliased[o.kind]} now near-duplicate aliases" if aliased[o.kind] else ""))
+    print(f"Listed {n_listed} text blobs, downloaded {n_read} for {len(outputs)} outputs in {time.time()-t0:.1f}s"
+          + (f"; skipped {n_alias} near-duplicate aliases ({DEDUP_BLOB_NAME})" if alias_of else ""))
+    return outputs
+
+
+def main():
+    kinds = [k.strip() for k in CORPUS_OUTPUTS.split(",") if k.strip()]
+    build({k: BLOB_NAMES.get(k, "") for k in kinds})
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+import os, json, time, shutil, resource
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from index_store import StringColumn, write_segment, merge_segments, publish_segments, index_segments, delta, encode_varints
+from tokenizer import Tokenizer
+from dense_index import DENSE_INDEX, EMBED_MODEL, DenseIndex, build_dense
+
+# Streaming build BM25 indeksa iz gross_negligence_gold_candidates.jsonl.
+# Dokumenti se baferuju do SEGMENT_DOCS i upisuju kao nepromenljivi segmenti;
+# segmenti istog nivoa se spajaju u pozadini (MERGE_FACTOR), a skup segmenata
+# se objavljuje kakav jeste (index_store.publish_segments, atomska zamena symlinka).
+# Ponovno pokretanje indeksira samo nove/izmenjene dokumente (po file_name + doc_id);
+# dokumenti kojih vise nema u JSONL-u se brisu, a prepisuju se samo segmenti
+# u kojima su bili. Promena tokenizera (TOKEN_STEM, verzija) znaci izgradnju od nule.
+# DENSE_INDEX=1: i vektori za hybrid pretragu (dense_index.py), pre objave indeksa;
+# vektori dokumenata koji su vec bili u indeksu se ne racunaju ponovo.
+
+GOLD_JSONL = os.environ.get("GOLD_JSONL", "gross_negligence_gold_candidates.jsonl")
+INDEX_PATH = os.environ.get("BM25_INDEX", "bm25_index")
+SEGMENTS_DIR = os.environ.get("BM25_SEGMENTS", INDEX_PATH.rstrip("/") + "_segments")
+SEGMENT_DOCS = int(os.environ.get("SEGMENT_DOCS", "20000"))
+SEGMENT_POSTINGS = int(os.environ.get("SEGMENT_POSTINGS", "5000000"))
+MERGE_FACTOR = int(os.environ.get("MERGE_FACTOR", "8"))
+TOKENIZER = Tokenizer()
+
+META_FIELDS = (
+    "file_name", "court", "court_slug", "upisnik", "broj", "godina",
+    "auto_rule", "confidence", "abstain", "gross_negligence", "not_gross_negligence",
+)
+
+def load_manifest():
+    p = os.path.join(SEGMENTS_DIR, "segments.json")
+    fresh = {"segments": [], "deleted": [], "next_seq": 0, "next_id": 0, "tokenizer": TOKENIZER.config()}
+    if not os.path.exists(p):
+        return fresh
+    with open(p, encoding="utf-8") as f:
+        man = json.load(f)
+    if man.get("tokenizer") != TOKENIZER.config():
+        # segmenti su tokenizovani drugacije -> ne mogu se mesati sa novim
+        print(f"Tokenizer changed ({man.get('tokenizer')} -> {TOKENIZER.config()}), rebuilding from scratch")
+        for seg in man["segments"]:
+            shutil.rmtree(seg_path(seg), ignore_errors=True)
+        fresh["next_id"] = man["next_id"]
+        return fresh
+    return man
+
+def save_manifest(man):
+    p = os.path.join(SEGMENTS_DIR, "segments.json")
+    with open(p + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(man, f)
+    os.replace(p + ".tmp", p)
+
+def seg_path(seg):
+    return os.path.join(SEGMENTS_DIR, seg["name"])
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(os.path.realpath(path)) for f in files)
+
+def known_docs(man):
+    """file_name -> (seq, doc_id) za sve zive dokumente u segmentima."""
+    deleted = set(man["deleted"])
+    known = {}
+    for seg in man["segments"]:
+        names = StringColumn(os.path.join(seg_path(seg), "file_name"))
+        ids = StringColumn(os.path.join(seg_path(seg), "doc_id"))
+        for i in range(len(names)):
+            seq = seg["seq_start"] + i
+            if seq not in deleted:
+                known[names[i]] = (seq, ids[i])
+    return known
+
+def compact(man, deleted):
+    """Prepisuje samo segmente sa obrisanim dokumentima; seq brojevi se zatim
+    prenumerisu redom (obrisani vise ne postoje pa se ne mogu pomeriti)."""
+    dl = np.asarray(sorted(deleted), dtype=np.int64)
+    segs, gone = [], []
+    for seg in man["segments"]:
+        lo, hi = np.searchsorted(dl, [seg["seq_start"], seg["seq_start"] + seg["n_docs"]])
+        if lo == hi:
+            segs.append(seg)
+            continue
+        gone.append(seg)
+        drop = set((dl[lo:hi] - seg["seq_start"]).tolist())
+        if len(drop) == seg["n_docs"]:
+            continue
+        new = {"name": f"seg_{man['next_id']:06d}", "level": seg["level"], "n_docs": seg["n_docs"] - len(drop)}
+        man["next_id"] += 1
+        merge_segments(seg_path(new), [seg_path(seg)], [drop])
+        segs.append(new)
+    seq = 0
+    for seg in segs:
+        seg["seq_start"] = seq
+        seq += seg["n_docs"]
+    man.update(segments=segs, deleted=[], next_seq=seq)
+    save_manifest(man)
+    deleted.clear()
+    for seg in gone:
+        shutil.rmtree(seg_path(seg), ignore_errors=True)
+
+class SegmentBuffer:
+    def __init__(self):
+        self.postings = {}
+        self.n_postings = 0
+        self.doc_len, self.doc_ids, self.texts, self.metas, self.file_names, self.tokoffs = [], [], [], [], [], []
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, rec, text):
+        d = len(self.doc_len)
+        spans = TOKENIZER.spans(text)
+        where = {}
+        for i, (w, _) in enumerate(spans):
+            where.setdefault(w, []).append(i)
+        for w, poss in where.items():
+            p = self.postings.get(w)
+            if p is None:
+                p = self.postings[w] = ([], [], [])
+            p[0].append(d); p[1].append(len(poss)); p[2].append(encode_varints(delta(poss)))
+        self.n_postings += len(where)
+        self.doc_len.append(len(spans))
+        self.tokoffs.append(encode_varints(delta([s for _, s in spans])))
+        self.doc_ids.append(rec.get("doc_id"))
+        self.texts.append(text)
+        self.metas.append(json.dumps({k: rec.get(k) for k in META_FIELDS}, ensure_ascii=False))
+        self.file_names.append(rec.get("file_name"))
+
+    def full(self):
+        return len(self) >= SEGMENT_DOCS or self.n_postings >= SEGMENT_POSTINGS
+
+def main():
+    os.makedirs(SEGMENTS_DIR, exist_ok=True)
+    man = load_manifest()
+    known = known_docs(man)
+    deleted = set(man["deleted"])
+
+    pool = ProcessPoolExecutor(max_workers=1)
+    pending = {}  # future -> (lista imena segmenata, novi segment)
+
+    def apply_merges(wait=False):
+        for fut in list(pending):
+            if not (wait or fut.done()):
+                continue
+            fut.result()
+            names, new = pending.pop(fut)
+            idx = [i for i, s in enumerate(man["segments"]) if s["name"] in names]
+            man["segments"][idx[0]:idx[-1] + 1] = [new]
+            save_manifest(man)
+            for n in names:
+                shutil.rmtree(os.path.join(SEGMENTS_DIR, n), ignore_errors=True)
+
+    def maybe_merge():
+        apply_merges()
+        busy = {n for names, _ in pending.values() for n in names}
+        segs = man["segments"]
+        i = 0
+        while i < len(segs):
+            j = i
+            while j < len(segs) and segs[j]["level"] == segs[i]["level"] and segs[j]["name"] not in busy:
+                j += 1
+            if j - i >= MERGE_FACTOR:
+                group = segs[i:i + MERGE_FACTOR]
+                new = {"name": f"seg_{man['next_id']:06d}", "level": group[0]["level"] + 1,
+                       "seq_start": group[0]["seq_start"], "n_docs": sum(s["n_docs"] for s in group)}
+                man["next_id"] += 1
+                fut = pool.submit(merge_segments, seg_path(new), [seg_path(s) for s in group])
+                pending[fut] = ([s["name"] for s in group], new)
+                busy.update(s["name"] for s in group)
+                i += MERGE_FACTOR
+            else:
+                i = max(j, i + 1)
+
+    def flush(buf):
+        if not len(buf):
+            return
+        seg = {"name": f"seg_{man['next_id']:06d}", "level": 0, "seq_start": man["next_seq"], "n_docs": len(buf)}
+        man["next_id"] += 1
+        write_segment(seg_path(seg), buf.postings, buf.doc_len, buf.doc_ids, buf.texts, buf.metas, buf.file_names, buf.tokoffs)
+        man["segments"].append(seg)
+        man["next_seq"] += len(buf)
+        man["deleted"] = sorted(deleted)
+        save_manifest(man)
+        maybe_merge()
+
+    t0 = time.time()
+    n_read = n_added = n_replaced = n_bytes = 0
+    seen = set()
+    buf = SegmentBuffer()
+    with open(GOLD_JSONL, "rb") as f:
+        for line in f:
+            n_bytes += len(line)
+            if not line.strip():
+                continue
+            rec = json.loads(line)
+            n_read += 1
+            text = (rec.get("decision_paragraph") or "").strip()
+            if not text:
+                continue
+            name = rec.get("file_name")
+            seen.add(name)
+            prev = known.get(name)
+            if prev is not None:
+                if prev[1] == (rec.get("doc_id") or ""):
+                    continue
+                deleted.add(prev[0])
+                n_replaced += 1
+            known[name] = (man["next_seq"] + len(buf), rec.get("doc_id") or "")
+            buf.add(rec, text)
+            n_added += 1
+            if buf.full():
+                flush(buf)
+                buf = SegmentBuffer()
+    # dokumenti kojih vise nema (izbaceni near-dup alias, prazan pasus, obrisan fajl)
+    n_removed = 0
+    for name, (seq, _) in known.items():
+        if name not in seen:
+            deleted.add(seq)
+            n_removed += 1
+    flush(buf)
+    apply_merges(wait=True)
+    pool.shutdown()
+    t_build = time.time() - t0
+
+    if deleted:
+        compact(man, deleted)
+
+    # vektori samo za segmente koji ih nemaju (novi/spojeni); kodovi se preuzimaju iz objavljenog indeksa
+    published = index_segments(INDEX_PATH)
+    n_dense = 0
+    if DENSE_INDEX:
+        reuse = published or ([INDEX_PATH] if os.path.isdir(INDEX_PATH) else [])
+        for seg in man["segments"]:
+            p = seg_path(seg)
+            if not (DenseIndex.exists(p) and DenseIndex(p).model == EMBED_MODEL):
+                n_dense += build_dense(p, EMBED_MODEL, reuse=reuse)
+    names = [s["name"] for s in man["segments"]]
+    if (names or os.path.isdir(INDEX_PATH)) and ([os.path.basename(p) for p in published] != names or n_dense):
+        publish_segments([seg_path(s) for s in man["segments"]], INDEX_PATH, tokenizer=TOKENIZER)
+
+    dt = time.time() - t0
+    peak_mb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+    total = sum(s["n_docs"] for s in man["segments"])
+    print(f"Read {n_read} records, indexed {n_added} new ({n_replaced} replaced, {n_removed} removed), "
+          f"index has {total} docs in {len(man['segments'])} segments -> {INDEX_PATH}")
+    print(f"Build: {t_build:.1f}s ({n_read/max(t_build,1e-9):.0f} docs/s, {n_bytes/1e6/max(t_build,1e-9):.1f} MB/s), "
+          f"total {dt:.1f}s, peak RSS {peak_mb:.0f} MB")
+    if os.path.isdir(INDEX_PATH):
+        n_terms = len(StringColumn(os.path.join(INDEX_PATH, "terms")))
+        size = dir_size(INDEX_PATH)
+        print(f"Vocabulary: {n_terms} terms, index size {size/1e6:.1f} MB, tokenizer {TOKENIZER.config()}")
+
+if __name__ == "__main__":
+    main()
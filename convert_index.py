@@ -0,0 +1,10 @@
+import sys, time
+from index_store import convert_pickle
+
+# bm25_index.pkl -> mmap direktorijum indeksa (vidi index_store.py)
+src = sys.argv[1] if len(sys.argv) > 1 else "bm25_index.pkl"
+dst = sys.argv[2] if len(sys.argv) > 2 else "bm25_index"
+
+t0 = time.time()
+n, v = convert_pickle(src, dst)
+print(f"Converted {src} -> {dst}: {n} docs, {v} terms in {time.time()-t0:.1f}s")
@@ -0,0 +1,255 @@
+import io, os, json, gzip, tempfile
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Korpus kao niz nezavisno kompresovanih okvira (zstd frame / gzip member) + sidecar indeks
+# <blob>.idx (kljuc \t offset \t duzina okvira \t redni broj u okviru). Ceo fajl je i dalje
+# validan .jsonl.zst / .jsonl.gz (zstd -d / zcat), a jedan zapis se cita jednim ranged read-om.
+# CORPUS_FORMAT: jsonl (podrazumevano, bez kompresije) | zst | gz
+CORPUS_FORMAT = os.environ.get("CORPUS_FORMAT", "jsonl")
+# okvir se zatvara posle ovoliko zapisa ili bajtova (nekompresovano), sta pre dodje
+CORPUS_FRAME_DOCS = int(os.environ.get("CORPUS_FRAME_DOCS", "16"))
+CORPUS_FRAME_BYTES = int(os.environ.get("CORPUS_FRAME_BYTES", str(256 << 10)))
+CORPUS_ZSTD_LEVEL = int(os.environ.get("CORPUS_ZSTD_LEVEL", "10"))
+CORPUS_GZIP_LEVEL = int(os.environ.get("CORPUS_GZIP_LEVEL", "6"))
+# kolonski izvoz metapodataka (sva polja osim teksta) u <izlaz>.meta.parquet; treba pyarrow
+CORPUS_PARQUET = os.environ.get("CORPUS_PARQUET", "0") == "1"
+PARQUET_ROW_GROUP = int(os.environ.get("PARQUET_ROW_GROUP", "50000"))
+
+SUFFIX = {"jsonl": "", "zst": ".zst", "gz": ".gz"}
+
+
+def check_format(fmt: str):
+    if fmt not in SUFFIX:
+        raise SystemExit(f"Unknown CORPUS_FORMAT: {fmt!r} (jsonl | zst | gz)")
+    if fmt == "zst" and zstandard is None:
+        raise SystemExit("CORPUS_FORMAT=zst needs the zstandard package (or use CORPUS_FORMAT=gz).")
+
+
+def blob_name_for(base: str, fmt: str) -> str:
+    return base + SUFFIX[fmt]
+
+
+def index_name(blob_name: str) -> str:
+    return blob_name + ".idx"
+
+
+def parquet_name(blob_name: str) -> str:
+    for s in SUFFIX.values():
+        if s and blob_name.endswith(s):
+            blob_name = blob_name[:-len(s)]
+    if blob_name.endswith(".jsonl"):
+        blob_name = blob_name[:-len(".jsonl")]
+    return blob_name + ".meta.parquet"
+
+
+def compress(fmt: str, data: bytes) -> bytes:
+    if fmt == "zst":
+        return zstandard.ZstdCompressor(level=CORPUS_ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, compresslevel=CORPUS_GZIP_LEVEL, mtime=0)
+
+
+def decompress(fmt: str, data: bytes) -> bytes:
+    if fmt == "zst":
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def decompress_all(fmt: str, data: bytes) -> bytes:
+    """Vise uzastopnih okvira odjednom (gzip.decompress vec cita sve member-e)."""
+    if fmt == "zst":
+        return zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data), read_across_frames=True).read()
+    return gzip.decompress(data)
+
+
+class PlainWriter:
+    """Obican JSONL (bez indeksa); isti interfejs kao FramedWriter."""
+
+    def __init__(self, container, name: str):
+        self.w = container.open_writer(name)
+
+    @property
+    def bytes(self):
+        return self.w.bytes
+
+    def add(self, line: bytes, key: str | None = None):
+        self.w.write(line)
+
+    def close(self):
+        self.w.close()
+
+    def abort(self):
+        self.w.abort()
+
+
+class FramedWriter:
+    """Linije se skupljaju u okvire; svaki okvir se kompresuje posebno i upisuje u izlaz,
+    a za svaki kljuc u okviru ide red u <blob>.idx."""
+
+    def __init__(self, container, name: str, fmt: str):
+        self.fmt = fmt
+        self.w = container.open_writer(name)
+        self.idx = container.open_writer(index_name(name))
+        self.lines, self.keys, self.pending = [], [], 0
+
+    @property
+    def bytes(self):
+        return self.w.bytes
+
+    def add(self, line: bytes, key: str | None = None):
+        self.lines.append(line)
+        self.keys.append(key)
+        self.pending += len(line)
+        if len(self.lines) >= CORPUS_FRAME_DOCS or self.pending >= CORPUS_FRAME_BYTES:
+            self.flush()
+
+    def flush(self):
+        if not self.lines:
+            return
+        frame = compress(self.fmt, b"".join(self.lines))
+        offset = self.w.bytes
+        self.w.write(frame)
+        rows = [f"{k}\t{offset}\t{len(frame)}\t{i}\n" for i, k in enumerate(self.keys) if k is not None]
+        self.idx.write("".join(rows).encode("utf-8"))
+        self.lines, self.keys, self.pending = [], [], 0
+
+    def close(self):
+        self.flush()
+        self.w.close()
+        self.idx.close()
+
+    def abort(self):
+        self.w.abort()
+        self.idx.abort()
+
+
+def open_corpus_writer(container, name: str, fmt: str = CORPUS_FORMAT):
+    check_format(fmt)
+    if fmt == "jsonl":
+        return PlainWriter(container, name)
+    return FramedWriter(container, name, fmt)
+
+
+def format_of(name: str) -> str:
+    for fmt, s in SUFFIX.items():
+        if s and name.endswith(s):
+            return fmt
+    return "jsonl"
+
+
+def open_corpus_lines(container, name: str):
+    """Sekvencijalno citanje izlaza po linijama (readline), bez obzira na format."""
+    return wrap_lines(container.open_reader(name), format_of(name))
+
+
+def wrap_lines(raw, fmt: str):
+    if fmt == "gz":
+        return gzip.GzipFile(fileobj=raw, mode="rb")
+    if fmt == "zst":
+        check_format(fmt)
+        return io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True, closefd=True))
+    return raw
+
+
+class FramedCorpus:
+    """Point lookup u kompresovanom korpusu: indeks se ucita jednom (dict), a zapis se
+    cita jednim get_range na okvir (poslednji procitan okvir se kesira)."""
+
+    def __init__(self, container, name: str):
+        self.container, self.name = container, name
+        self.fmt = format_of(name)
+        check_format(self.fmt)
+        self.index = {}
+        for ln in container.get(index_name(name)).decode("utf-8").splitlines():
+            key, off, length, i = ln.rsplit("\t", 3)
+            self.index[key] = (int(off), int(length), int(i))
+        self.frame_key, self.frame_lines = None, None
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def get(self, key: str) -> dict | None:
+        loc = self.index.get(key)
+        if loc is None:
+            return None
+        off, length, i = loc
+        if self.frame_key != (off, length):
+            data = decompress(self.fmt, self.container.get_range(self.name, off, length))
+            self.frame_key, self.frame_lines = (off, length), data.splitlines()
+        return json.loads(self.frame_lines[i])
+
+
+# tipovi kolona u ParquetExport semi (pyarrow se uvozi tek uz CORPUS_PARQUET=1)
+PARQUET_TYPES = ("string", "int", "float", "bool", "json", "list<string>")
+
+
+def _arrow_type(t: str):
+    return {"string": pa.string(), "int": pa.int64(), "float": pa.float64(), "bool": pa.bool_(),
+            "json": pa.string(), "list<string>": pa.list_(pa.string())}[t]
+
+
+class ParquetExport:
+    """Kolonski izvoz metapodataka (bez teksta), u row group-ovima. Sema je zadata unapred
+    (`fields`: ime kolone -> tip iz PARQUET_TYPES, redom), pa je ista za ceo fajl bez obzira
+    na to sta je u prvoj grupi; "json" polja (ugnjezdena) idu kao JSON string, kljucevi van
+    seme se ne izvoze. Pise se u lokalni temp fajl i na close() ide u storage jednim put-om."""
+
+    def __init__(self, container, name: str, fields: dict):
+        if pq is None:
+            raise SystemExit("CORPUS_PARQUET=1 needs the pyarrow package.")
+        self.container, self.name = container, name
+        self.fields = dict(fields)
+        self.schema = pa.schema([pa.field(k, _arrow_type(t)) for k, t in self.fields.items()])
+        self.tmp = tempfile.NamedTemporaryFile(suffix=".parquet", delete=False)
+        self.tmp.close()
+        self.cols = {k: [] for k in self.fields}
+        self.pw = None
+        self.n = 0
+        self.pending = 0
+
+    def add(self, line: bytes):
+        rec = json.loads(line)
+        for k, t in self.fields.items():
+            v = rec.get(k)
+            if t == "json" and v is not None:
+                v = json.dumps(v, ensure_ascii=False)
+            self.cols[k].append(v)
+        self.pending += 1
+        if self.pending >= PARQUET_ROW_GROUP:
+            self.flush()
+
+    def flush(self):
+        if self.pw is None:
+            self.pw = pq.ParquetWriter(self.tmp.name, self.schema, compression="zstd")
+        if not self.pending:
+            return
+        self.pw.write_table(pa.Table.from_pydict(self.cols, schema=self.schema))
+        self.n += self.pending
+        self.cols = {k: [] for k in self.fields}
+        self.pending = 0
+
+    def close(self):
+        try:
+            self.flush()
+            self.pw.close()
+            with open(self.tmp.name, "rb") as f:
+                self.container.put(self.name, f, overwrite=True, length=os.path.getsize(self.tmp.name))
+        finally:
+            os.unlink(self.tmp.name)
+
+    def abort(self):
+        if self.pw is not None:
+            self.pw.close()
+        os.unlink(self.tmp.name)
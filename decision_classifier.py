@@ -0,0 +1,71 @@
+import re
+
+# srpska latinica bez dijakritika (isto kao ranija .replace() verzija, jedan prolaz)
+DIACRITICS = str.maketrans("žŽčČćĆšŠđĐ", "zZcCcCsSdD")
+
+def strip_diacritics(t: str) -> str:
+    return t.translate(DIACRITICS)
+
+def split_paragraphs(txt: str):
+    return [p.strip() for p in re.split(r"\n\s*\n+", txt) if p.strip()]
+
+
+class DecisionClassifier:
+    """Pronalazi pasus o (ne)postojanju grube nepaznje u jednom prolazu kroz pasuse.
+
+    Regexi se kompajliraju jednom; pasusi bez "nepa"/"непа" se preskacu pre
+    normalizacije. Pravila, labele i spanovi su isti kao u ranijem
+    pick_decision_paragraph: prvi pasus sa "gruba nepaznja" (oba pisma) pobedjuje,
+    a ako ga nema, prvi pasus sa sinonimom daje SYNONYM_ONLY.
+    """
+
+    # povecati pri svakoj promeni pravila/izlaza: build_corpus tada ponovo klasifikuje sve
+    VERSION = "1"
+
+    # Latin + Cyrillic "gruba ne(p)aznja/nepažnja/nepaznja"
+    GROSS_LAT = re.compile(r"\bgrub[a-z]*\s+nepaznj[a-z]*\b", re.IGNORECASE)
+    GROSS_CYR = re.compile(r"\bгруб[а-я]*\s+непажњ[а-я]*\b", re.IGNORECASE)
+
+    # Sinonimi (kandidat, ali abstain)
+    SYN_LAT = re.compile(r"\b(krajnj[a-z]*|tesk[a-z]*|ocigledn[a-z]*|izrazit[a-z]*)\s+nepaznj[a-z]*\b", re.IGNORECASE)
+    SYN_CYR = re.compile(r"\b(крајњ[а-я]*|тешк[а-я]*|очигледн[а-я]*|изразит[а-я]*)\s+непажњ[а-я]*\b", re.IGNORECASE)
+
+    # Negacija (latin + cyr)
+    NEG_LAT = re.compile(r"\b(nije|nisu|ne\s+moze|ne\s+moze\s+se\s+smatrati|ne\s+predstavlja|ne\s+ukazuje|ne\s+postoji)\b", re.IGNORECASE)
+    NEG_CYR = re.compile(r"\b(није|нису|не\s+може|не\s+може\s+се\s+сматрати|не\s+представља|не\s+указује|не\s+постоји)\b", re.IGNORECASE)
+
+    # svaki pogodak (gross i sinonim) sadrzi "nepaznj"/"непажњ"
+    PREFILTER = ("nepa", "непа")
+
+    def spans(self, text: str, regex: re.Pattern, span_type: str):
+        return [{"start": m.start(), "end": m.end(), "type": span_type} for m in regex.finditer(text)]
+
+    def classify(self, txt: str):
+        """-> (paragraph, index, count, rule, label, confidence, abstain, spans)"""
+        paras = split_paragraphs(txt)
+        pcount = len(paras)
+        synonym = None
+
+        for idx, p in enumerate(paras):
+            pn_cyr = p.lower()
+            if self.PREFILTER[0] not in pn_cyr and self.PREFILTER[1] not in pn_cyr:
+                continue
+            pn_lat = strip_diacritics(p).lower()
+
+            # 1) eksplicitno "gruba nepažnja" (oba pisma)
+            spans = self.spans(pn_lat, self.GROSS_LAT, "GROSS_LAT") + self.spans(pn_cyr, self.GROSS_CYR, "GROSS_CYR")
+            if spans:
+                if self.NEG_LAT.search(pn_lat) or self.NEG_CYR.search(pn_cyr):
+                    return p, idx, pcount, "GROSS_TERM_NEGATED", 0, 0.95, False, spans
+                return p, idx, pcount, "GROSS_TERM", 1, 0.90, False, spans
+
+            # 2) sinonimi -> abstain (samo ako nijedan pasus nema eksplicitan termin)
+            if synonym is None:
+                spans = self.spans(pn_lat, self.SYN_LAT, "SYN_LAT") + self.spans(pn_cyr, self.SYN_CYR, "SYN_CYR")
+                if spans:
+                    synonym = (p, idx, spans)
+
+        if synonym is not None:
+            p, idx, spans = synonym
+            return p, idx, pcount, "SYNONYM_ONLY", None, 0.60, True, spans
+        return "", None, pcount, "NO_MATCH", None, 0.0, True, []
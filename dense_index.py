@@ -0,0 +1,324 @@
+import os, json, zlib
+from functools import lru_cache
+import numpy as np
+from index_store import StringColumn, index_segments
+from tokenizer import Tokenizer
+
+# Opciona gusta (vektorska) pretraga nad decision_paragraph tekstovima, uz BM25 (mode=hybrid).
+# Vektori su normalizovani, int8 kvantizovani (skala po vektoru) i grupisani u IVF liste
+# (sfericni k-means); sve se otvara preko mmap-a kao ostatak indeksa. Upit gleda samo
+# DENSE_NPROBE najblizih lista; uz uske filtere racuna se tacno nad dozvoljenim dokumentima.
+# Fajlovi u direktorijumu indeksa (build_index.py sa DENSE_INDEX=1):
+#   dense.json                       model, dim, nlist, n
+#   dense.centroids.npy              float32[nlist, dim]
+#   dense.off.npy                    int64[nlist+1], granice lista
+#   dense.ids.npy                    int32[N], doc id za svaki red (redovi su sortirani po listi)
+#   dense.vec.npy, dense.scale.npy   int8[N, dim] i float32[N]
+# EMBED_MODEL: sentence-transformers model (CPU), ili hash:<dim> -- n-grami karaktera bez
+# spoljnih paketa, za testove i procenu memorije (ne razume parafraze kao pravi model).
+EMBED_MODEL = os.environ.get("EMBED_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+DENSE_INDEX = os.environ.get("DENSE_INDEX", "0") == "1"
+EMBED_BATCH = int(os.environ.get("EMBED_BATCH", "64"))
+DENSE_NLIST = int(os.environ.get("DENSE_NLIST", "0"))        # 0 = ~4*sqrt(N)
+DENSE_NPROBE = int(os.environ.get("DENSE_NPROBE", "16"))
+DENSE_TRAIN = int(os.environ.get("DENSE_TRAIN", "100000"))   # uzorak za k-means
+# ispod ovoliko dozvoljenih dokumenata (filteri, fraze) pretraga je tacna, bez IVF-a
+DENSE_EXACT_MAX = int(os.environ.get("DENSE_EXACT_MAX", "20000"))
+# hybrid: RRF nad prvih HYBRID_DEPTH pogodaka BM25 i guste pretrage
+HYBRID_DEPTH = int(os.environ.get("HYBRID_DEPTH", "100"))
+RRF_K = int(os.environ.get("RRF_K", "60"))
+KMEANS_ITERS = 15
+CHUNK = 65536
+
+
+class HashEmbedder:
+    """Potpisani feature hashing trigrama karaktera nad tokenima (cirilica = latinica)."""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.tok = Tokenizer(fold=True, stem=False)
+
+    def encode(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, t in enumerate(texts):
+            for tok in self.tok.tokens(t):
+                w = f" {tok} ".encode("utf-8")
+                for j in range(len(w) - 2):
+                    h = zlib.crc32(w[j:j + 3])
+                    out[i, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        return normalize(out)
+
+
+class STEmbedder:
+    def __init__(self, name: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise ImportError(f"EMBED_MODEL={name} needs the sentence-transformers package (or EMBED_MODEL=hash:256)")
+        self.model = SentenceTransformer(name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts):
+        v = self.model.encode(list(texts), batch_size=EMBED_BATCH, normalize_embeddings=True, convert_to_numpy=True)
+        return np.asarray(v, dtype=np.float32)
+
+
+@lru_cache(maxsize=4)
+def get_embedder(model: str = EMBED_MODEL):
+    if model.startswith("hash:"):
+        return HashEmbedder(int(model[len("hash:"):]))
+    return STEmbedder(model)
+
+
+def normalize(x):
+    n = np.linalg.norm(x, axis=1, keepdims=True)
+    return x / np.where(n > 0, n, 1.0)
+
+
+def quantize(x):
+    """float32[n, d] -> (int8 kodovi, float32 skala po redu); x ~= kodovi * skala."""
+    scale = np.abs(x).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    return np.round(x / scale[:, None]).astype(np.int8), scale.astype(np.float32)
+
+
+def dequantize(codes, scale):
+    return codes.astype(np.float32) * np.asarray(scale, dtype=np.float32)[:, None]
+
+
+def kmeans(x, k: int, iters: int = KMEANS_ITERS, seed: int = 0):
+    """Sfericni k-means (kosinus) nad normalizovanim redovima."""
+    rng = np.random.default_rng(seed)
+    c = x[rng.choice(len(x), k, replace=False)].copy()
+    for _ in range(iters):
+        a = assign(x, c)
+        sums = np.zeros_like(c)
+        np.add.at(sums, a, x)
+        counts = np.bincount(a, minlength=k)
+        empty = counts == 0
+        sums[empty] = x[rng.choice(len(x), int(empty.sum()))]
+        c = normalize(sums)
+    return c
+
+
+def assign(x, c):
+    return np.concatenate([np.argmax(x[i:i + CHUNK] @ c.T, axis=1) for i in range(0, len(x), CHUNK)]) if len(x) else np.empty(0, dtype=np.int64)
+
+
+def build_dense(path: str, model: str = EMBED_MODEL, reuse=None, log=print):
+    """Vektori za sve dokumente u `path` (indeks ili segment; objavljen skup segmenata -> po
+    segmentu); iz `reuse` direktorijuma (jedan ili lista, isti model) preuzimaju se kodovi
+    dokumenata sa istim doc_id, pa se ugradjuju samo novi."""
+    segments = index_segments(path)
+    if segments:
+        return sum(build_dense(p, model, reuse, log) for p in segments)
+    texts = StringColumn(os.path.join(path, "text"))
+    doc_ids = StringColumn(os.path.join(path, "doc_id"))
+    n = len(texts)
+    emb = get_embedder(model)
+    prev = {}
+    for r in [reuse] if isinstance(reuse, str) else reuse or []:
+        old = DenseIndex(r) if DenseIndex.exists(r) else None
+        if old is None or old.model != model or old.dim != emb.dim:
+            continue
+        old_ids = StringColumn(os.path.join(r, "doc_id"))
+        for row, d in enumerate(np.asarray(old.ids).tolist()):
+            key = old_ids[d]
+            if key:
+                prev[key] = (old, row)
+
+    def tmp(name):
+        return os.path.join(path, f"dense.{name}.tmp.npy")
+
+    codes = np.lib.format.open_memmap(tmp("vec"), mode="w+", dtype=np.int8, shape=(n, emb.dim))
+    scale = np.empty(n, dtype=np.float32)
+    n_reused = 0
+    step = EMBED_BATCH * 16
+    for lo in range(0, n, step):
+        hi = min(n, lo + step)
+        todo = []
+        for i in range(lo, hi):
+            hit = prev.get(doc_ids[i]) if prev else None
+            if hit is None:
+                todo.append(i)
+            else:
+                old, row = hit
+                codes[i], scale[i] = old.vec[row], old.scale[row]
+                n_reused += 1
+        if todo:
+            c, s = quantize(emb.encode([texts[i] for i in todo]))
+            codes[todo], scale[todo] = c, s
+
+    rng = np.random.default_rng(0)
+    sample = np.sort(rng.choice(n, min(n, DENSE_TRAIN), replace=False)) if n else np.empty(0, dtype=np.int64)
+    nlist = max(1, min(len(sample), DENSE_NLIST or int(4 * np.sqrt(n))))
+    centroids = kmeans(normalize(dequantize(codes[sample], scale[sample])), nlist) if n else np.zeros((1, emb.dim), np.float32)
+    lists = np.concatenate([assign(normalize(dequantize(codes[i:i + CHUNK], scale[i:i + CHUNK])), centroids)
+                            for i in range(0, n, CHUNK)]) if n else np.empty(0, dtype=np.int64)
+    order = np.argsort(lists, kind="stable")
+
+    # novi fajlovi pa os.replace: objavljeni indeks deli inode-e sa segmentom (hard link)
+    vec = np.lib.format.open_memmap(tmp("vec_sorted"), mode="w+", dtype=np.int8, shape=(n, emb.dim))
+    for i in range(0, n, CHUNK):
+        vec[i:i + CHUNK] = codes[order[i:i + CHUNK]]
+    vec.flush()
+    del vec, codes
+    os.unlink(tmp("vec"))
+    os.replace(tmp("vec_sorted"), os.path.join(path, "dense.vec.npy"))
+    off = np.zeros(len(centroids) + 1, dtype=np.int64)
+    off[1:] = np.cumsum(np.bincount(lists, minlength=len(centroids)))
+    for name, a in (("scale", scale[order]), ("ids", order.astype(np.int32)), ("off", off),
+                    ("centroids", centroids.astype(np.float32))):
+        np.save(tmp(name), a)
+        os.replace(tmp(name), os.path.join(path, f"dense.{name}.npy"))
+    # dense.json poslednji: indeks bez njega se ne koristi
+    with open(os.path.join(path, "dense.json.tmp"), "w", encoding="utf-8") as f:
+        json.dump({"model": model, "dim": emb.dim, "nlist": len(centroids), "n": n}, f)
+    os.replace(os.path.join(path, "dense.json.tmp"), os.path.join(path, "dense.json"))
+    log(f"Dense: {n} docs ({n - n_reused} embedded, {n_reused} reused), dim {emb.dim}, nlist {len(centroids)}, model {model}")
+    return n
+
+
+class DenseIndex:
+    def __init__(self, path: str):
+        with open(os.path.join(path, "dense.json"), encoding="utf-8") as f:
+            info = json.load(f)
+        self.model, self.dim, self.n = info["model"], info["dim"], info["n"]
+
+        def arr(name):
+            return np.load(os.path.join(path, f"dense.{name}.npy"), mmap_mode="r")
+        self.vec, self.scale, self.ids, self.off = arr("vec"), arr("scale"), arr("ids"), arr("off")
+        self.centroids = np.asarray(arr("centroids"))
+        self._rows = None
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "dense.json"))
+
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.vec, self.scale, self.ids, self.off, self.centroids))
+
+    @property
+    def rows(self):
+        """doc id -> red (inverzna permutacija), za tacnu pretragu nad filtriranim skupom."""
+        if self._rows is None:
+            rows = np.empty(self.n, dtype=np.int64)
+            rows[np.asarray(self.ids)] = np.arange(self.n)
+            self._rows = rows
+        return self._rows
+
+    def embed_query(self, text: str):
+        return _embed_query(self.model, text)
+
+    def _score(self, rows, q):
+        return (np.asarray(self.vec[rows], dtype=np.float32) @ q) * np.asarray(self.scale[rows])
+
+    def search(self, q, k=10, allowed=None, nprobe=DENSE_NPROBE):
+        """Top-k (doc, kosinusna slicnost). `allowed`: bool maska ili sortirani doc id-jevi."""
+        if allowed is not None:
+            ids = np.flatnonzero(allowed) if allowed.dtype == bool else np.asarray(allowed)
+            if len(ids) <= DENSE_EXACT_MAX:
+                rows = np.sort(self.rows[ids])
+                return self._top_k(rows, self._score(rows, q), k)
+        probe = np.argsort(-(self.centroids @ q))[:nprobe]
+        rows = np.concatenate([np.arange(self.off[c], self.off[c + 1]) for c in probe])
+        if allowed is not None:
+            d = np.asarray(self.ids[rows])
+            keep = allowed[d] if allowed.dtype == bool else np.isin(d, allowed, assume_unique=True)
+            rows = rows[keep]
+        return self._top_k(rows, self._score(rows, q), k)
+
+    def search_exact(self, q, k=10):
+        scores = np.concatenate([self._score(np.arange(i, min(self.n, i + CHUNK)), q) for i in range(0, self.n, CHUNK)]) if self.n else np.empty(0)
+        return self._top_k(np.arange(self.n), scores, k)
+
+    def _top_k(self, rows, scores, k):
+        if len(rows) > k:
+            sel = np.argpartition(-scores, k - 1)[:k]
+            rows, scores = rows[sel], scores[sel]
+        docs = np.asarray(self.ids[rows])
+        order = np.lexsort((docs, -scores))
+        return [(int(docs[i]), float(scores[i])) for i in order]
+
+
+class SegmentedDense:
+    """Vektori objavljenog skupa segmenata: pretraga po segmentu, doc id = pocetak segmenta + lokalni."""
+
+    def __init__(self, parts):
+        self.parts = parts
+        self.model, self.dim = parts[0].model, parts[0].dim
+        self.bases = np.cumsum([0] + [p.n for p in parts]).tolist()
+        self.n = self.bases[-1]
+
+    def nbytes(self) -> int:
+        return sum(p.nbytes() for p in self.parts)
+
+    def embed_query(self, text: str):
+        return _embed_query(self.model, text)
+
+    def search(self, q, k=10, allowed=None, nprobe=DENSE_NPROBE):
+        hits = []
+        for p, lo, hi in zip(self.parts, self.bases[:-1], self.bases[1:]):
+            sub = None
+            if allowed is not None:
+                if allowed.dtype == bool:
+                    sub = allowed[lo:hi]
+                else:
+                    a = np.asarray(allowed)
+                    sub = a[np.searchsorted(a, lo):np.searchsorted(a, hi)] - lo
+                    if not len(sub):
+                        continue
+            hits += [(d + lo, sc) for d, sc in p.search(q, k, sub, nprobe)]
+        return self._merge(hits, k)
+
+    def search_exact(self, q, k=10):
+        return self._merge([(d + lo, sc) for p, lo in zip(self.parts, self.bases) for d, sc in p.search_exact(q, k)], k)
+
+    @staticmethod
+    def _merge(hits, k):
+        return sorted(hits, key=lambda h: (-h[1], h[0]))[:k]
+
+
+def open_dense(path: str):
+    """DenseIndex indeksa ili SegmentedDense skupa segmenata; None ako vektori ne postoje
+    (za neki segment) ili segmenti nemaju isti model."""
+    segments = index_segments(path)
+    if not segments:
+        return DenseIndex(path) if DenseIndex.exists(path) else None
+    if not all(DenseIndex.exists(p) for p in segments):
+        return None
+    parts = [DenseIndex(p) for p in segments]
+    if len({(p.model, p.dim) for p in parts}) != 1:
+        return None
+    return SegmentedDense(parts)
+
+
+@lru_cache(maxsize=4096)
+def _embed_query(model: str, text: str):
+    return get_embedder(model).encode([text])[0]
+
+
+def reciprocal_rank_fusion(rankings, k=10, rrf_k=RRF_K):
+    """[[(doc, skor)], ...] -> top-k (doc, sum 1/(rrf_k + rang)), vezani skorovi po doc id."""
+    fused = {}
+    for ranking in rankings:
+        for rank, (doc, _) in enumerate(ranking, 1):
+            fused[doc] = fused.get(doc, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda x: (-x[1], x[0]))[:k]
+
+
+def hybrid_search(index, dense, pq, k=10, allowed=None, mode="hybrid"):
+    """mode=dense: samo vektori; mode=hybrid: RRF(BM25, vektori). Fraze/NEAR ogranicavaju
+    i gusti deo na dokumente koji ih zadovoljavaju."""
+    from phrase_query import match_docs, phrase_search
+    dense_allowed = match_docs(index, pq, allowed) if pq.constrained else allowed
+    q = dense.embed_query(pq.text)
+    if mode == "dense":
+        return dense.search(q, k, dense_allowed)
+    depth = max(k, HYBRID_DEPTH)
+    if pq.constrained:
+        lexical = phrase_search(index, pq, k=depth, allowed=allowed)
+    else:
+        # dopuna nulama iz search() nisu pogoci
+        lexical = [h for h in index.engine.search(pq.terms, k=depth, allowed=allowed) if h[1] != 0.0]
+    return reciprocal_rank_fusion([lexical, dense.search(q, depth, dense_allowed)], k)
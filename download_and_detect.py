@@ -1,22 +1,27 @@
-import os, io, time, hashlib, zipfile
-import requests
-from azure.storage.blob import BlobServiceClient
+import os, asyncio, zipfile
+from async_fetch import FetchState, HostLimiter, fetch_all
+from storage import BlobExists, get_container
 
-AZ_CONN = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
 RAW_CONTAINER = os.environ.get("RAW_CONTAINER", "raw")
-RATE_SECONDS = float(os.environ.get("RATE_SECONDS", "2"))
+URLS_FILE = os.environ.get("URLS_FILE", "urls.txt")
+# JSONL sa vec sacuvanim URL-ovima; restart ih preskace bez ponovnog preuzimanja
+FETCH_STATE = os.environ.get("FETCH_STATE", "download_state.jsonl")
+# stari nacin zadavanja brzine (sekundi izmedju zahteva) i dalje vazi, sada po hostu
+RATE_SECONDS = os.environ.get("RATE_SECONDS")
 
-def sha256_bytes(b: bytes) -> str:
-    return hashlib.sha256(b).hexdigest()
-
-def detect_format(data: bytes, content_type: str | None) -> str:
+def detect_format(head: bytes, body, content_type: str | None) -> str:
+    """head = prvih nekoliko bajtova, body = seekable fajl sa celim telom."""
     ct = (content_type or "").lower()
 
-    if data.startswith(b"%PDF"):
+    if head.startswith(b"%PDF"):
         return "pdf"
-    if data.startswith(b"PK\x03\x04"):
-        z = zipfile.ZipFile(io.BytesIO(data))
-        names = set(z.namelist())
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            names = set(zipfile.ZipFile(body).namelist())
+        except zipfile.BadZipFile:
+            names = set()
+        finally:
+            body.seek(0)
         if "content.xml" in names:
             return "odf"   # ODP/ODT/...
         if "word/document.xml" in names:
@@ -31,43 +36,41 @@ def detect_format(data: bytes, content_type: str | None) -> str:
         return "docx"
     return "bin"
 
-def download(url: str) -> tuple[bytes, str | None]:
-    r = requests.get(
-        url,
-        timeout=60,
-        headers={"User-Agent":"corpus-agent/1.0"},
-        allow_redirects=True,
-    )
-    r.raise_for_status()
-    return r.content, r.headers.get("Content-Type")
-
-def main():
-    if not AZ_CONN:
-        raise SystemExit("Set AZURE_STORAGE_CONNECTION_STRING env var first.")
-
-    bsc = BlobServiceClient.from_connection_string(AZ_CONN)
-    container = bsc.get_container_client(RAW_CONTAINER)
-
-    with open("urls.txt", "r", encoding="utf-8") as f:
-        urls = [ln.strip() for ln in f if ln.strip() and not ln.strip().startswith("#")]
+def read_urls(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [ln.strip() for ln in f if ln.strip() and not ln.strip().startswith("#")]
 
-    for u in urls:
+def make_store(container):
+    async def store(res):
+        fmt = detect_format(res.head, res.body, res.content_type)
+        name = f"{res.sha256}.{fmt}"
+        ct = res.content_type or ""
         try:
-            data, ct = download(u)
-            fmt = detect_format(data, ct)
-            h = sha256_bytes(data)
-            name = f"{h}.{fmt}"
+            # upload iz spool fajla u threadu; vec postojeci blob (isti sadrzaj) nije greska
+            await asyncio.to_thread(
+                container.put, name, res.body, overwrite=False, length=res.size,
+                metadata={"source_url": res.url, "content_type": ct[:200]},
+            )
+            print("UPLOADED:", name, "type:", fmt, "ct:", ct, flush=True)
+        except BlobExists:
+            print("SKIP (cached):", name, flush=True)
+        return {"blob": name, "format": fmt, "bytes": res.size}
+    return store
+
+def main():
+    container = get_container(RAW_CONTAINER)
 
-            bc = container.get_blob_client(name)
-            if bc.exists():
-                print("SKIP (cached):", name)
-            else:
-                bc.upload_blob(data, overwrite=False, metadata={"source_url": u, "content_type": (ct or "")[:200]})
-                print("UPLOADED:", name, "type:", fmt, "ct:", ct)
-            time.sleep(RATE_SECONDS)
-        except Exception as e:
-            print("ERROR:", u, e)
-            time.sleep(RATE_SECONDS * 2)
+    urls = read_urls(URLS_FILE)
+    state = FetchState(FETCH_STATE)
+    limiter = HostLimiter()
+    if RATE_SECONDS:
+        limiter = HostLimiter(rate=1.0 / float(RATE_SECONDS) if float(RATE_SECONDS) > 0 else 0)
+    try:
+        counts = asyncio.run(fetch_all(urls, make_store(container), state=state, limiter=limiter))
+    finally:
+        state.close()
+    print("Done. URLs:", len(urls), "| stored:", counts["ok"], "| already done:", counts["skipped"],
+          "| failed:", counts["failed"], flush=True)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,265 @@
+import os, sys, json, time, argparse
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from corpus_format import format_of, index_name, decompress_all, open_corpus_lines, wrap_lines
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    loads = json.loads
+
+# Statistika gold kandidata (ukupno, abstain, auto_rule, histogram confidence, po sudu/godini)
+# bez ucitavanja celog fajla: fajl se deli na opsege bajtova (STATS_CHUNK_BYTES) koje obradjuju
+# worker procesi, a rezultati se sabiraju. Memorija = broj workera x velicina opsega.
+#   python3 gold_stats.py gross_negligence_gold_candidates.jsonl
+#   python3 gold_stats.py --blob gross_negligence_gold_candidates.jsonl     (CORPUS_CONTAINER)
+# .zst/.gz sa .idx indeksom se dele po okvirima; bez indeksa se citaju sekvencijalno.
+STATS_CHUNK_BYTES = int(os.environ.get("STATS_CHUNK_BYTES", str(32 << 20)))
+STATS_WORKERS = int(os.environ.get("STATS_WORKERS", str(os.cpu_count() or 1)))
+CORPUS_CONTAINER = os.environ.get("CORPUS_CONTAINER", "corpus")
+HIST_BINS = 10
+# linija preko granice opsega se docitava u koracima ove velicine
+TAIL_STEP = 1 << 20
+
+
+class LocalSource:
+    def __init__(self, path: str):
+        self.path = path
+
+    def size(self) -> int:
+        return os.path.getsize(self.path)
+
+    def read(self, offset: int, length: int) -> bytes:
+        with open(self.path, "rb") as f:
+            return os.pread(f.fileno(), length, offset)
+
+    def exists(self, name: str) -> bool:
+        return os.path.exists(name)
+
+    def open_lines(self):
+        return wrap_lines(open(self.path, "rb"), format_of(self.path))
+
+    def sidecar(self, name: str) -> bytes:
+        with open(name, "rb") as f:
+            return f.read()
+
+
+class BlobSource:
+    """Blob u storage-u (storage.py); klijent se pravi posebno u svakom worker procesu."""
+
+    def __init__(self, container: str, name: str):
+        self.container, self.path = container, name
+        self._c = None
+
+    def __getstate__(self):
+        return {"container": self.container, "path": self.path, "_c": None}
+
+    @property
+    def c(self):
+        if self._c is None:
+            from storage import get_container
+            self._c = get_container(self.container)
+        return self._c
+
+    def size(self) -> int:
+        return self.c.info(self.path).size
+
+    def read(self, offset: int, length: int) -> bytes:
+        return self.c.get_range(self.path, offset, length)
+
+    def exists(self, name: str) -> bool:
+        return self.c.exists(name)
+
+    def open_lines(self):
+        return open_corpus_lines(self.c, self.path)
+
+    def sidecar(self, name: str) -> bytes:
+        return self.c.get(name)
+
+
+class Stats:
+    """Sabirljivi brojaci; velicina zavisi samo od broja sudova/godina/pravila."""
+
+    def __init__(self):
+        self.total = 0
+        self.abstain = 0
+        self.gross = 0
+        self.not_gross = 0
+        self.bad_lines = 0
+        self.rules = Counter()
+        self.hist = [0] * HIST_BINS
+        self.conf_sum = 0.0
+        self.courts = {}   # court -> [n, abstain, gross, not_gross]
+        self.years = {}
+
+    def add(self, r: dict):
+        self.total += 1
+        ab = 1 if r.get("abstain") else 0
+        g = 1 if r.get("gross_negligence") == 1 else 0
+        ng = 1 if r.get("not_gross_negligence") == 1 else 0
+        self.abstain += ab
+        self.gross += g
+        self.not_gross += ng
+        self.rules[r.get("auto_rule", "")] += 1
+        conf = r.get("confidence")
+        if isinstance(conf, (int, float)):
+            self.conf_sum += conf
+            self.hist[min(HIST_BINS - 1, max(0, int(conf * HIST_BINS)))] += 1
+        for table, key in ((self.courts, r.get("court", "")), (self.years, r.get("godina"))):
+            row = table.get(key)
+            if row is None:
+                row = table[key] = [0, 0, 0, 0]
+            row[0] += 1
+            row[1] += ab
+            row[2] += g
+            row[3] += ng
+
+    def add_lines(self, lines):
+        for ln in lines:
+            if not ln.strip():
+                continue
+            try:
+                self.add(loads(ln))
+            except ValueError:
+                self.bad_lines += 1
+
+    def merge(self, o: "Stats"):
+        self.total += o.total
+        self.abstain += o.abstain
+        self.gross += o.gross
+        self.not_gross += o.not_gross
+        self.bad_lines += o.bad_lines
+        self.rules.update(o.rules)
+        self.hist = [a + b for a, b in zip(self.hist, o.hist)]
+        self.conf_sum += o.conf_sum
+        for mine, theirs in ((self.courts, o.courts), (self.years, o.years)):
+            for k, row in theirs.items():
+                cur = mine.get(k)
+                mine[k] = row if cur is None else [a + b for a, b in zip(cur, row)]
+        return self
+
+    def as_dict(self) -> dict:
+        def table(t):
+            return [{"key": k, "n": v[0], "abstain": v[1], "gross": v[2], "not_gross": v[3]}
+                    for k, v in sorted(t.items(), key=lambda kv: -kv[1][0])]
+        n = max(self.total, 1)
+        return {
+            "total": self.total, "abstain": self.abstain, "abstain_rate": round(self.abstain / n, 4),
+            "gross_negligence": self.gross, "not_gross_negligence": self.not_gross,
+            "bad_lines": self.bad_lines, "rules": dict(self.rules.most_common()),
+            "confidence_mean": round(self.conf_sum / n, 4), "confidence_hist": self.hist,
+            "by_court": table(self.courts), "by_year": table(self.years),
+        }
+
+
+def range_stats(src, start: int, end: int) -> Stats:
+    """Linije koje pocinju u [start, end); prva delimicna linija pripada prethodnom opsegu."""
+    st = Stats()
+    data = src.read(start, end - start)
+    if start > 0 and src.read(start - 1, 1) != b"\n":
+        nl = data.find(b"\n")
+        data = data[nl + 1:] if nl >= 0 else b""
+        if nl < 0:
+            return st
+    if data and not data.endswith(b"\n"):
+        # docitaj kraj poslednje linije iz sledeceg opsega
+        pos, total = end, src.size()
+        while pos < total:
+            more = src.read(pos, TAIL_STEP)
+            nl = more.find(b"\n")
+            if nl >= 0:
+                data += more[:nl + 1]
+                break
+            data += more
+            pos += len(more)
+    st.add_lines(data.split(b"\n"))
+    return st
+
+
+def frames_stats(src, fmt: str, start: int, end: int) -> Stats:
+    st = Stats()
+    st.add_lines(decompress_all(fmt, src.read(start, end - start)).split(b"\n"))
+    return st
+
+
+def plan_tasks(src):
+    """-> lista (fn, args) za worker-e."""
+    fmt = format_of(src.path)
+    size = src.size()
+    if fmt == "jsonl":
+        return [(range_stats, (src, a, min(a + STATS_CHUNK_BYTES, size))) for a in range(0, size, STATS_CHUNK_BYTES)]
+    idx = index_name(src.path)
+    if not src.exists(idx):
+        return []
+    offsets = sorted({int(ln.split(b"\t")[-3]) for ln in src.sidecar(idx).splitlines() if ln})
+    tasks, a = [], 0
+    for off in offsets[1:] + [size]:
+        # opseg se zatvara na granici okvira cim predje STATS_CHUNK_BYTES
+        if off - a >= STATS_CHUNK_BYTES or off == size:
+            tasks.append((frames_stats, (src, fmt, a, off)))
+            a = off
+    return tasks
+
+
+def run_task(task):
+    fn, args = task
+    return fn(*args)
+
+
+def collect(src, workers: int = STATS_WORKERS) -> Stats:
+    total = Stats()
+    tasks = plan_tasks(src)
+    if not tasks and src.size() > 0:
+        # kompresovan fajl bez indeksa: jedan sekvencijalan prolaz
+        with src.open_lines() as f:
+            total.add_lines(f)
+        return total
+    if workers <= 1 or len(tasks) <= 1:
+        for t in tasks:
+            total.merge(run_task(t))
+        return total
+    with ProcessPoolExecutor(workers) as pool:
+        for st in pool.map(run_task, tasks):
+            total.merge(st)
+    return total
+
+
+def report(d: dict, top: int):
+    print("TOTAL:", d["total"])
+    print("ABSTAIN:", d["abstain"], f"({d['abstain_rate']:.1%})")
+    print("LABELS: gross", d["gross_negligence"], "| not_gross", d["not_gross_negligence"])
+    if d["bad_lines"]:
+        print("BAD LINES:", d["bad_lines"])
+    print("TOP RULES:", list(d["rules"].items())[:top])
+    print("CONFIDENCE: mean", d["confidence_mean"])
+    peak = max(d["confidence_hist"]) or 1
+    for i, c in enumerate(d["confidence_hist"]):
+        print(f"  {i / HIST_BINS:.1f}-{(i + 1) / HIST_BINS:.1f} {c:>9} " + "#" * round(40 * c / peak))
+    for title, rows in (("BY COURT", d["by_court"]), ("BY YEAR", sorted(d["by_year"], key=lambda r: str(r["key"])))):
+        print(f"{title}:")
+        for r in rows[:top] if title == "BY COURT" else rows:
+            print(f"  {str(r['key']):<50} n={r['n']:<8} abstain={r['abstain']:<8} gross={r['gross']:<8} not_gross={r['not_gross']}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Stats for gold-candidate JSONL (streaming, parallel).")
+    ap.add_argument("path", nargs="?", default=os.environ.get("GOLD_JSONL", "gross_negligence_gold_candidates.jsonl"))
+    ap.add_argument("--blob", action="store_true", help=f"read the blob from storage (container {CORPUS_CONTAINER})")
+    ap.add_argument("--workers", type=int, default=STATS_WORKERS)
+    ap.add_argument("--top", type=int, default=20)
+    ap.add_argument("--json", action="store_true", help="print JSON instead of the text report")
+    args = ap.parse_args(argv)
+
+    src = BlobSource(CORPUS_CONTAINER, args.path) if args.blob else LocalSource(args.path)
+    t0 = time.time()
+    d = collect(src, args.workers).as_dict()
+    if args.json:
+        json.dump(d, sys.stdout, ensure_ascii=False)
+        print()
+    else:
+        report(d, args.top)
+        print(f"[{time.time() - t0:.1f}s]", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,897 @@
+import os, json, mmap, pickle, shutil
+import numpy as np
+from bm25_engine import BM25Engine
+from tokenizer import Tokenizer, LEGACY
+
+# Format direktorijuma indeksa (sve se otvara preko mmap):
+#   meta.json                  N, avgdl, k1, b, verzija formata, tokenizer (vidi tokenizer.py)
+#   terms.bin + terms.off.npy  sortirani termini (utf-8) i njihovi offseti
+#   idf.npy, post_offsets.npy, post_docs.npy, post_tfs.npy   CSR postinzi
+#   doc_len.npy, norm.npy      duzine dokumenata i BM25 normalizacija
+#   doc_id.*, text.*, meta.*   string kolone (bin + off.npy), meta je JSON
+#   court.*, upisnik.*, godina.*  kolone za filtere (vidi MetaIndex)
+#   pos.bin + pos_off.npy, tokoff.*  pozicije termina i char offseti tokena (PositionStore)
+FORMAT_VERSION = 1
+# Objavljen skup segmenata (build_index.py), vidi publish_segments():
+#   meta.json                  verzija 2, lista segmenata [{name, n_docs}], N, avgdl, k1, b, tokenizer
+#   terms.*, idf.npy           zajednicki recnik (unija termina segmenata), idf nad zbirnim df
+#   doc_len.npy, norm.npy, court.*, upisnik.*, godina.*, ...   za sve dokumente, redom segmenata
+#   <segment>/                 fajlovi segmenta (hard linkovi) + gmap.npy: lokalni termin -> globalni id
+# Doc id = pocetak segmenta + lokalni id, isto kao kad bi se segmenti spojili redom.
+SEGMENTED_FORMAT = 2
+# koliko objavljenih verzija ostaje u <indeks>.versions (tekuca + prethodna koju api.py mozda jos cita)
+KEEP_VERSIONS = int(os.getenv("INDEX_KEEP_VERSIONS", "2"))
+
+
+class StringColumn:
+    """Niz stringova u jednom mmap fajlu + offseti (int64[N+1])."""
+
+    def __init__(self, base: str):
+        self.off = np.load(base + ".off.npy", mmap_mode="r")
+        self.buf = b""
+        if int(self.off[-1]):
+            with open(base + ".bin", "rb") as f:
+                self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.off) - 1
+
+    def raw(self, i: int) -> bytes:
+        lo, hi = self.off[i:i + 2].tolist()
+        return self.buf[lo:hi]
+
+    def __getitem__(self, i: int) -> str:
+        return self.raw(i).decode("utf-8")
+
+
+def write_string_column(base: str, values):
+    offsets = [0]
+    with open(base + ".bin", "wb") as f:
+        for v in values:
+            b = v if isinstance(v, bytes) else (v or "").encode("utf-8")
+            f.write(b)
+            offsets.append(offsets[-1] + len(b))
+    np.save(base + ".off.npy", np.asarray(offsets, dtype=np.int64))
+
+
+class TermLexicon:
+    """Sortirani recnik termina; lookup je binarna pretraga nad mmap bajtovima."""
+
+    def __init__(self, col: StringColumn):
+        self.col = col
+
+    def __len__(self):
+        return len(self.col)
+
+    def get(self, term: str, default=None):
+        key = term.encode("utf-8")
+        lo, hi = 0, len(self.col)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.col.raw(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self.col) and self.col.raw(lo) == key:
+            return lo
+        return default
+
+
+class DocStore:
+    """Lenji pristup dokumentima u obliku koji je koristio pickle ({doc_id, text, meta})."""
+
+    def __init__(self, path: str):
+        self.doc_ids = StringColumn(os.path.join(path, "doc_id"))
+        self.texts = StringColumn(os.path.join(path, "text"))
+        self.metas = StringColumn(os.path.join(path, "meta"))
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    def __getitem__(self, i: int) -> dict:
+        return {"doc_id": self.doc_id(i), "text": self.text(i), "meta": self.meta(i)}
+
+    # pojedinacna polja, da se ne dekodira tekst kad nije trazen
+    def doc_id(self, i: int):
+        return self.doc_ids[i] or None
+
+    def text(self, i: int) -> str:
+        return self.texts[i]
+
+    def meta(self, i: int) -> dict:
+        return json.loads(self.metas[i] or "{}")
+
+
+class ListDocs(list):
+    """Dokumenti iz bm25_index.pkl sa istim pristupom poljima kao DocStore."""
+
+    def doc_id(self, i: int):
+        return self[i].get("doc_id")
+
+    def text(self, i: int) -> str:
+        return self[i].get("text") or ""
+
+    def meta(self, i: int) -> dict:
+        return self[i].get("meta", {}) or {}
+
+
+FILTER_FIELDS = ("court", "upisnik")
+# polja samo za facete (kodovi bez doc lista); vrednosti se ne svode na mala slova
+FACET_FIELDS = ("auto_rule", "abstain")
+
+
+def facet_value(v) -> str:
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    return "" if v is None else str(v)
+
+
+def build_meta_columns(metas):
+    """Kompaktne kolone za filtere i facete: internovani kodovi, int16 godine.
+
+    Za svaku vrednost court/upisnik (case-insensitive) cuva se sortiran niz doc id-jeva
+    (CSR po kodu), a za godinu redosled dokumenata sortiranih po godini (range upiti).
+    auto_rule/abstain imaju samo kolonu kodova. Uz recnike idu i labele za prikaz
+    (prvi originalni oblik vrednosti).
+    """
+    vocabs = {f: {"": 0} for f in FILTER_FIELDS + FACET_FIELDS}
+    labels = {f: [""] for f in vocabs}
+    codes = {f: [] for f in vocabs}
+    years = []
+    for m in metas:
+        for f in FILTER_FIELDS + FACET_FIELDS:
+            raw = facet_value(m.get(f))
+            v = raw.lower() if f in FILTER_FIELDS else raw
+            c = vocabs[f].get(v)
+            if c is None:
+                c = vocabs[f][v] = len(vocabs[f])
+                labels[f].append(raw)
+            codes[f].append(c)
+        try:
+            years.append(int(m.get("godina") or 0))
+        except (TypeError, ValueError):
+            years.append(0)
+    return _meta_columns(codes, years, vocabs, labels)
+
+
+def combine_meta_columns(paths):
+    """Kolone za filtere vise segmenata (svaki sa svojim filters.json) -> kolone za ceo skup,
+    redom segmenata; kodovi se preslikavaju u zajednicki recnik, bez citanja meta JSON-a."""
+    vocabs = {f: {"": 0} for f in FILTER_FIELDS + FACET_FIELDS}
+    labels = {f: [""] for f in vocabs}
+    codes = {f: [] for f in vocabs}
+    years = []
+    for p in paths:
+        with open(os.path.join(p, "filters.json"), encoding="utf-8") as f:
+            seg_vocabs = json.load(f)
+        seg_labels = seg_vocabs.get("_labels") or seg_vocabs
+        for f in vocabs:
+            remap = np.empty(len(seg_vocabs[f]), dtype=np.int32)
+            for i, (v, raw) in enumerate(zip(seg_vocabs[f], seg_labels[f])):
+                c = vocabs[f].get(v)
+                if c is None:
+                    c = vocabs[f][v] = len(vocabs[f])
+                    labels[f].append(raw)
+                remap[i] = c
+            codes[f].append(remap[np.load(os.path.join(p, f + ".npy"))])
+        years.append(np.load(os.path.join(p, "godina.npy")))
+    codes = {f: np.concatenate(c) if c else np.empty(0, dtype=np.int32) for f, c in codes.items()}
+    return _meta_columns(codes, np.concatenate(years) if years else np.empty(0, dtype=np.int16), vocabs, labels)
+
+
+def _meta_columns(codes, years, vocabs, labels):
+    cols = {}
+    for f in FILTER_FIELDS:
+        c = np.asarray(codes[f], dtype=np.int32)
+        off = np.zeros(len(vocabs[f]) + 1, dtype=np.int64)
+        off[1:] = np.cumsum(np.bincount(c, minlength=len(vocabs[f])))
+        cols[f] = c
+        cols[f + ".docs"] = np.argsort(c, kind="stable").astype(np.int32)
+        cols[f + ".off"] = off
+    for f in FACET_FIELDS:
+        cols[f] = np.asarray(codes[f], dtype=np.int32)
+    y = np.asarray(years, dtype=np.int16)
+    order = np.argsort(y, kind="stable").astype(np.int32)
+    cols["godina"] = y
+    cols["godina.order"] = order
+    cols["godina.sorted"] = y[order]
+    vocabs = {f: list(vocabs[f]) for f in vocabs}
+    vocabs["_labels"] = labels
+    return cols, vocabs
+
+
+def write_meta_columns(path: str, metas=None, built=None):
+    """`built` je vec izracunat par (kolone, recnici), npr. iz combine_meta_columns."""
+    cols, vocabs = built or build_meta_columns(metas)
+    for name, a in cols.items():
+        np.save(os.path.join(path, name + ".npy"), a)
+    with open(os.path.join(path, "filters.json"), "w", encoding="utf-8") as f:
+        json.dump(vocabs, f, ensure_ascii=False)
+
+
+class MetaIndex:
+    """Filteri (court, upisnik, godina_from/to) -> sortiran niz dozvoljenih doc id-jeva;
+    faceti (broj dokumenata po vrednosti) nad skupom pogodaka."""
+
+    def __init__(self, cols: dict, vocabs: dict):
+        vocabs = dict(vocabs)
+        # stari indeksi nemaju labele ni auto_rule/abstain kolone
+        self.labels = vocabs.pop("_labels", None) or {f: v for f, v in vocabs.items()}
+        self.cols = cols
+        self.codes = {f: {v: i for i, v in enumerate(vocabs[f])} for f in vocabs}
+        self.vocabs = vocabs
+
+    @classmethod
+    def from_metas(cls, metas):
+        cols, vocabs = build_meta_columns(metas)
+        return cls(cols, vocabs)
+
+    @classmethod
+    def open(cls, path: str):
+        with open(os.path.join(path, "filters.json"), encoding="utf-8") as f:
+            vocabs = json.load(f)
+        names = [x for f in FILTER_FIELDS for x in (f, f + ".docs", f + ".off")] + ["godina", "godina.order", "godina.sorted"]
+        names += [f for f in FACET_FIELDS if os.path.exists(os.path.join(path, f + ".npy"))]
+        return cls({n: np.load(os.path.join(path, n + ".npy"), mmap_mode="r") for n in names}, vocabs)
+
+    def facet_fields(self):
+        return [f for f in FILTER_FIELDS + ("godina",) + FACET_FIELDS if f in self.cols]
+
+    def facets(self, mask, fields=None, limit: int = 0) -> dict:
+        """`mask` (bool, duzine n_docs) -> {polje: [{"value", "count"}]} po opadajucem broju.
+
+        Jedan gather kolone kodova + bincount po polju, O(broj pogodaka); vrednost koje
+        nema (prazan string / godina 0) je None. limit=0 -> sve vrednosti.
+        """
+        out = {}
+        for f in fields or self.facet_fields():
+            codes = np.asarray(self.cols[f])[mask]
+            if f == "godina":
+                counts = np.bincount(codes.astype(np.int64), minlength=1) if len(codes) else np.zeros(1, dtype=np.int64)
+                label = lambda c: int(c) or None
+            else:
+                counts = np.bincount(codes, minlength=len(self.vocabs[f]))
+                names = self.labels.get(f) or self.vocabs[f]
+                label = lambda c, names=names: names[c] or None
+            nz = np.flatnonzero(counts)
+            order = nz[np.lexsort((nz, -counts[nz]))]
+            if limit:
+                order = order[:limit]
+            out[f] = [{"value": label(c), "count": int(counts[c])} for c in order]
+        return out
+
+    def value_docs(self, field: str, value: str):
+        c = self.codes[field].get((value or "").lower())
+        if c is None:
+            return np.empty(0, dtype=np.int32)
+        off = self.cols[field + ".off"]
+        return self.cols[field + ".docs"][off[c]:off[c + 1]]
+
+    def year_docs(self, godina_from=None, godina_to=None):
+        ys, order = self.cols["godina.sorted"], self.cols["godina.order"]
+        # dokumenti bez godine prolaze filter (kao ranije u api.py)
+        n0 = int(np.searchsorted(ys, 1))
+        lo = max(n0, int(np.searchsorted(ys, godina_from, "left"))) if godina_from else n0
+        hi = int(np.searchsorted(ys, godina_to, "right")) if godina_to else len(ys)
+        return np.sort(np.concatenate((order[:n0], order[lo:max(lo, hi)])))
+
+    def filter(self, court=None, upisnik=None, godina_from=None, godina_to=None):
+        """None ako nema filtera, inace sortirani int32 doc id-jevi koji prolaze sve filtere."""
+        sets = []
+        if court:
+            sets.append(self.value_docs("court", court))
+        if upisnik:
+            sets.append(self.value_docs("upisnik", upisnik))
+        if godina_from or godina_to:
+            sets.append(self.year_docs(godina_from, godina_to))
+        if not sets:
+            return None
+        sets.sort(key=len)
+        out = np.asarray(sets[0])
+        for other in sets[1:]:
+            if not len(out):
+                break
+            out = np.intersect1d(out, other, assume_unique=True)
+        return out.astype(np.int32, copy=False)
+
+
+class PositionStore:
+    """Pozicije termina (redni broj tokena) po postingu i char offseti tokena po dokumentu.
+
+    Oba toka su delta + varint kodirana: pos.bin sa pos_off.npy (int64[P+1], po
+    postingu u CSR redosledu) i tokoff.* (bajt kolona, po dokumentu).
+    """
+
+    def __init__(self, path: str):
+        self.pos_off = np.load(os.path.join(path, "pos_off.npy"), mmap_mode="r")
+        self.buf = b""
+        if int(self.pos_off[-1]):
+            with open(os.path.join(path, "pos.bin"), "rb") as f:
+                self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.tokoff = StringColumn(os.path.join(path, "tokoff"))
+
+    @staticmethod
+    def exists(path: str) -> bool:
+        return os.path.exists(os.path.join(path, "pos_off.npy"))
+
+    def positions(self, posting: int):
+        lo, hi = self.pos_off[posting:posting + 2].tolist()
+        return undelta(decode_varints(self.buf[lo:hi]))
+
+    def term_positions(self, engine, tid: int, docs):
+        """gather() za termin `tid` u (sortiranim) dokumentima `docs` iz njegove doc liste."""
+        pdocs, _ = engine.postings(tid)
+        return self.gather(int(engine.post_offsets[tid]) + np.searchsorted(pdocs, docs))
+
+    def token_starts(self, doc: int):
+        return undelta(decode_varints(self.tokoff.raw(doc)))
+
+    def gather(self, postings):
+        """Pozicije za vise postinga odjednom (numpy, bez petlje po dokumentu).
+
+        -> (owner, pos): owner[i] je redni broj postinga u `postings`, pos[i] pozicija;
+        unutar jednog postinga pozicije su rastuce.
+        """
+        postings = np.asarray(postings, dtype=np.int64)
+        lo = np.asarray(self.pos_off[postings], dtype=np.int64)
+        lens = np.asarray(self.pos_off[postings + 1], dtype=np.int64) - lo
+        total = int(lens.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        ends_at = np.cumsum(lens)
+        b = np.frombuffer(self.buf, dtype=np.uint8)[np.arange(total) + np.repeat(lo - (ends_at - lens), lens)]
+        last = (b & 0x80) == 0
+        first = np.flatnonzero(np.r_[True, last[:-1]])
+        vid = np.cumsum(last) - last
+        vals = np.add.reduceat((b & 0x7F).astype(np.int64) << (7 * (np.arange(total) - first[vid])), first)
+        done = np.r_[0, np.cumsum(last)]
+        counts = done[ends_at] - done[ends_at - lens]
+        cs = np.cumsum(vals)
+        seg = np.cumsum(counts) - counts
+        return np.repeat(np.arange(len(postings)), counts), cs - np.repeat(np.r_[0, cs][seg], counts)
+
+
+class SearchIndex:
+    """Sve sto api.py koristi: BM25 engine, dokumenti, filteri, (opciono) pozicije i tokenizer upita."""
+
+    def __init__(self, engine, docs, filters, positions=None, tokenizer=LEGACY):
+        self.engine = engine
+        self.docs = docs
+        self.filters = filters
+        self.positions = positions
+        self.tokenizer = tokenizer
+
+
+def open_index(path: str) -> SearchIndex:
+    """Otvara indeks direktorijum nad mmap nizovima."""
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        info = json.load(f)
+    if info.get("format") == SEGMENTED_FORMAT:
+        return open_segmented(path, info)
+    if info.get("format") != FORMAT_VERSION:
+        raise ValueError(f"Unsupported index format: {info.get('format')}")
+
+    def arr(name):
+        return np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+
+    engine = BM25Engine(
+        TermLexicon(StringColumn(os.path.join(path, "terms"))),
+        arr("idf"), arr("post_offsets"), arr("post_docs"), arr("post_tfs"), arr("doc_len"),
+        info["avgdl"], k1=info["k1"], b=info["b"], norm=arr("norm"),
+    )
+    positions = PositionStore(path) if PositionStore.exists(path) else None
+    return SearchIndex(engine, DocStore(path), MetaIndex.open(path), positions, Tokenizer.from_config(info.get("tokenizer")))
+
+
+def convert_pickle(pkl_path: str, out_path: str):
+    """bm25_index.pkl -> indeks direktorijum; postinzi i idf se preuzimaju iz pickle-a
+    (isti skorovi), a pozicije se racunaju iz teksta dokumenata."""
+    IDX = pickle.load(open(pkl_path, "rb"))
+    bm25, docs = IDX["bm25"], IDX["docs"]
+
+    postings = {}
+    tokoffs = []
+    for d, freqs in enumerate(bm25.doc_freqs):
+        spans = token_spans(docs[d].get("text") or "")
+        where = {}
+        for i, (tok, _) in enumerate(spans):
+            where.setdefault(tok, []).append(i)
+        tokoffs.append(encode_varints(delta([s for _, s in spans])))
+        for term, tf in freqs.items():
+            p = postings.get(term)
+            if p is None:
+                p = postings[term] = ([], [], [])
+            p[0].append(d); p[1].append(tf); p[2].append(encode_varints(delta(where.get(term, []))))
+
+    seg = out_path.rstrip("/") + ".seg"
+    metas = [d.get("meta", {}) or {} for d in docs]
+    write_segment(
+        seg, postings, bm25.doc_len, [d.get("doc_id") for d in docs], [d.get("text") for d in docs],
+        [json.dumps(m, ensure_ascii=False) for m in metas], [m.get("file_name") for m in metas], tokoffs,
+    )
+    publish_segment(seg, out_path, k1=bm25.k1, b=bm25.b, idf_map=bm25.idf, avgdl=bm25.avgdl)
+    shutil.rmtree(seg, ignore_errors=True)
+    return len(docs), len(postings)
+
+
+def load_index(path: str) -> SearchIndex:
+    """Direktorijum -> mmap indeks; `.pkl` -> stari pickle format (u memoriji, bez pozicija)."""
+    if path.endswith(".pkl"):
+        IDX = pickle.load(open(path, "rb"))
+        docs = ListDocs(IDX["docs"])
+        return SearchIndex(BM25Engine.from_rank_bm25(IDX["bm25"]), docs, MetaIndex.from_metas(d.get("meta", {}) or {} for d in docs))
+    return open_index(path)
+
+
+# --- tokeni, pozicije, varint ---
+
+def token_spans(text: str):
+    """[(token, char_start)] starim tokenizerom (LEGACY) -- za pickle indekse i convert_pickle."""
+    return LEGACY.spans(text)
+
+def delta(values):
+    out, prev = [], 0
+    for v in values:
+        out.append(v - prev)
+        prev = v
+    return out
+
+def undelta(values):
+    out, acc = [], 0
+    for v in values:
+        acc += v
+        out.append(acc)
+    return out
+
+def encode_varints(values) -> bytes:
+    out = bytearray()
+    for v in values:
+        while v >= 0x80:
+            out.append((v & 0x7F) | 0x80)
+            v >>= 7
+        out.append(v)
+    return bytes(out)
+
+def decode_varints(buf) -> list:
+    out, v, shift = [], 0, 0
+    for byte in buf:
+        v |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            out.append(v)
+            v, shift = 0, 0
+    return out
+
+
+# --- segmenti (build_index.py) ---
+# Segment ima isti raspored kao indeks, ali umesto idf/norm cuva df.npy i
+# file_name kolonu; doc id-jevi su lokalni (0..n-1). Indeks = jedan spojen
+# segment + idf.npy, norm.npy, kolone za filtere i meta.json (publish_segment),
+# ili skup segmenata sa zajednickim recnikom (publish_segments).
+
+def write_segment(path: str, postings: dict, doc_len, doc_ids, texts, metas, file_names, tokoffs):
+    """`postings`: term -> (doc id-jevi, tf-ovi, varint pozicije po postingu)."""
+    tmp = path.rstrip("/") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    terms = sorted(postings, key=lambda t: t.encode("utf-8"))
+    off = np.zeros(len(terms) + 1, dtype=np.int64)
+    off[1:] = np.cumsum([len(postings[t][0]) for t in terms])
+    np.save(os.path.join(tmp, "post_offsets.npy"), off)
+    np.save(os.path.join(tmp, "post_docs.npy"), np.fromiter((d for t in terms for d in postings[t][0]), dtype=np.int32, count=int(off[-1])))
+    np.save(os.path.join(tmp, "post_tfs.npy"), np.fromiter((f for t in terms for f in postings[t][1]), dtype=np.int32, count=int(off[-1])))
+    np.save(os.path.join(tmp, "df.npy"), np.diff(off).astype(np.int32))
+    np.save(os.path.join(tmp, "doc_len.npy"), np.asarray(doc_len, dtype=np.int32))
+    pos_off = [0]
+    with open(os.path.join(tmp, "pos.bin"), "wb") as f:
+        for t in terms:
+            for pb in postings[t][2]:
+                f.write(pb)
+                pos_off.append(pos_off[-1] + len(pb))
+    np.save(os.path.join(tmp, "pos_off.npy"), np.asarray(pos_off, dtype=np.int64))
+    write_string_column(os.path.join(tmp, "terms"), terms)
+    write_string_column(os.path.join(tmp, "doc_id"), doc_ids)
+    write_string_column(os.path.join(tmp, "text"), texts)
+    write_string_column(os.path.join(tmp, "meta"), metas)
+    write_string_column(os.path.join(tmp, "file_name"), file_names)
+    write_string_column(os.path.join(tmp, "tokoff"), tokoffs)
+    shutil.rmtree(path, ignore_errors=True)
+    os.rename(tmp, path)
+
+
+def _gather_ranges(buf, starts, ends):
+    """Spaja bajt opsege [starts[i], ends[i]) iz buf-a; susedni opsezi se kopiraju kao jedan blok."""
+    starts = np.asarray(starts, dtype=np.int64)
+    ends = np.asarray(ends, dtype=np.int64)
+    lens = ends - starts
+    if not len(starts):
+        return b"", lens
+    brk = np.flatnonzero(starts[1:] != ends[:-1]) + 1
+    run_lo = np.concatenate(([0], brk))
+    run_hi = np.concatenate((brk, [len(starts)])) - 1
+    data = b"".join(buf[a:b] for a, b in zip(starts[run_lo].tolist(), ends[run_hi].tolist()))
+    return data, lens
+
+
+def _concat_columns(out_base: str, bases, keeps):
+    offsets = [np.zeros(1, dtype=np.int64)]
+    pos = 0
+    with open(out_base + ".bin", "wb") as out:
+        for base, keep in zip(bases, keeps):
+            col = StringColumn(base)
+            off = np.asarray(col.off)
+            if keep is None:
+                with open(base + ".bin", "rb") as f:
+                    shutil.copyfileobj(f, out, 1 << 20)
+                offsets.append(off[1:] + pos)
+                pos += int(off[-1])
+            else:
+                idx = np.flatnonzero(keep)
+                data, lens = _gather_ranges(col.buf, off[idx], off[idx + 1])
+                out.write(data)
+                offsets.append(pos + np.cumsum(lens))
+                pos += len(data)
+    np.save(out_base + ".off.npy", np.concatenate(offsets).astype(np.int64))
+
+
+def merge_segments(out_path: str, seg_paths, drop=None):
+    """Spaja segmente redom (k-way merge sortiranih recnika) u novi segment.
+
+    `drop` je opciona lista (po segmentu) skupova lokalnih doc id-jeva koji
+    se izbacuju; preostali dokumenti se prenumerisu.
+    """
+    import heapq
+
+    tmp = out_path.rstrip("/") + ".tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    drop = drop or [None] * len(seg_paths)
+
+    segs, keeps, remaps, bases = [], [], [], []
+    base = 0
+    for p, dr in zip(seg_paths, drop):
+        s = {name: np.load(os.path.join(p, name + ".npy"), mmap_mode="r") for name in ("post_offsets", "post_docs", "post_tfs", "doc_len", "pos_off")}
+        s["terms"] = StringColumn(os.path.join(p, "terms"))
+        s["pos"] = b""
+        if int(s["pos_off"][-1]):
+            with open(os.path.join(p, "pos.bin"), "rb") as f:
+                s["pos"] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        n = len(s["doc_len"])
+        keep = None
+        remap = None
+        if dr:
+            keep = np.ones(n, dtype=bool)
+            keep[list(dr)] = False
+            remap = np.cumsum(keep, dtype=np.int64) - 1
+        segs.append(s); keeps.append(keep); remaps.append(remap); bases.append(base)
+        base += n if keep is None else int(keep.sum())
+
+    def term_iter(si):
+        col = segs[si]["terms"]
+        for ti in range(len(col)):
+            yield col.raw(ti), si, ti
+
+    total = sum(len(s["post_docs"]) for s in segs)
+    post_docs = np.lib.format.open_memmap(os.path.join(tmp, "post_docs.npy"), mode="w+", dtype=np.int32, shape=(total,))
+    post_tfs = np.lib.format.open_memmap(os.path.join(tmp, "post_tfs.npy"), mode="w+", dtype=np.int32, shape=(total,))
+    pos_off = np.lib.format.open_memmap(os.path.join(tmp, "pos_off.npy"), mode="w+", dtype=np.int64, shape=(total + 1,))
+    pos_off[0] = 0
+    offsets, terms = [0], []
+    pos = 0
+    pbytes = 0
+    cur = None
+    with open(os.path.join(tmp, "pos.bin"), "wb") as pos_out:
+        for key, si, ti in heapq.merge(*(term_iter(i) for i in range(len(segs)))):
+            if key != cur:
+                if cur is not None and offsets[-1] != pos:
+                    terms.append(cur.decode("utf-8")); offsets.append(pos)
+                cur = key
+            s = segs[si]
+            lo, hi = int(s["post_offsets"][ti]), int(s["post_offsets"][ti + 1])
+            d, f = s["post_docs"][lo:hi], s["post_tfs"][lo:hi]
+            po = np.asarray(s["pos_off"][lo:hi + 1])
+            if keeps[si] is not None:
+                k = keeps[si][d]
+                d, f = remaps[si][d[k]], f[k]
+                data, lens = _gather_ranges(s["pos"], po[:-1][k], po[1:][k])
+            else:
+                data, lens = s["pos"][po[0]:po[-1]], np.diff(po)
+            post_docs[pos:pos + len(d)] = d + bases[si]
+            post_tfs[pos:pos + len(d)] = f
+            pos_off[pos + 1:pos + 1 + len(d)] = pbytes + np.cumsum(lens)
+            pos_out.write(data)
+            pbytes += len(data)
+            pos += len(d)
+    if cur is not None and offsets[-1] != pos:
+        terms.append(cur.decode("utf-8")); offsets.append(pos)
+    for a in (post_docs, post_tfs, pos_off):
+        a.flush()
+    del post_docs, post_tfs, pos_off
+    if pos != total:
+        # izbaceni dokumenti -> skrati nizove
+        for name, n in (("post_docs", pos), ("post_tfs", pos), ("pos_off", pos + 1)):
+            a = np.load(os.path.join(tmp, name + ".npy"), mmap_mode="r")[:n].copy()
+            np.save(os.path.join(tmp, name + ".npy"), a)
+
+    off = np.asarray(offsets, dtype=np.int64)
+    np.save(os.path.join(tmp, "post_offsets.npy"), off)
+    np.save(os.path.join(tmp, "df.npy"), np.diff(off).astype(np.int32))
+    np.save(os.path.join(tmp, "doc_len.npy"), np.concatenate(
+        [np.asarray(s["doc_len"]) if k is None else np.asarray(s["doc_len"])[k] for s, k in zip(segs, keeps)] or [np.empty(0, dtype=np.int32)]
+    ).astype(np.int32))
+    write_string_column(os.path.join(tmp, "terms"), terms)
+    for col in ("doc_id", "text", "meta", "file_name", "tokoff"):
+        _concat_columns(os.path.join(tmp, col), [os.path.join(p, col) for p in seg_paths], keeps)
+    del segs
+    shutil.rmtree(out_path, ignore_errors=True)
+    os.rename(tmp, out_path)
+
+
+def publish_segment(seg_path: str, index_path: str, k1=1.5, b=0.75, epsilon=0.25, idf_map=None, avgdl=None,
+                    tokenizer=LEGACY):
+    """Segment -> indeks za api.py: hard linkovi fajlova + idf/norm/filteri/meta.json, atomska zamena
+    (nova verzija pa swap_index).
+
+    `idf_map`/`avgdl` (convert_pickle) preuzimaju vrednosti iz postojeceg BM25 objekta;
+    `tokenizer` je onaj kojim su termini segmenta napravljeni (upisuje se u meta.json).
+    """
+    from bm25_engine import okapi_idf
+
+    tmp = new_version_dir(index_path)
+    _link_files(seg_path, tmp)
+
+    df = np.load(os.path.join(seg_path, "df.npy"))
+    doc_len = np.load(os.path.join(seg_path, "doc_len.npy"))
+    n = len(doc_len)
+    if avgdl is None:
+        avgdl = float(doc_len.sum()) / n if n else 0.0
+    if idf_map is not None:
+        terms = StringColumn(os.path.join(seg_path, "terms"))
+        idf = np.array([idf_map.get(terms[i]) or 0.0 for i in range(len(terms))], dtype=np.float64)
+    else:
+        idf = okapi_idf(df, n, epsilon)
+    np.save(os.path.join(tmp, "idf.npy"), idf)
+    np.save(os.path.join(tmp, "norm.npy"), k1 * (1 - b + b * doc_len / avgdl) if n else np.empty(0))
+    metas = StringColumn(os.path.join(seg_path, "meta"))
+    write_meta_columns(tmp, (json.loads(metas[i] or "{}") for i in range(len(metas))))
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        info = {"format": FORMAT_VERSION, "n_docs": n, "avgdl": avgdl, "k1": k1, "b": b}
+        if tokenizer.config() is not None:
+            info["tokenizer"] = tokenizer.config()
+        json.dump(info, f)
+
+    swap_index(tmp, index_path)
+
+
+def publish_segments(seg_paths, index_path: str, k1=1.5, b=0.75, epsilon=0.25, tokenizer=LEGACY):
+    """Skup segmenata -> indeks za api.py bez prepisivanja segmenata (SEGMENTED_FORMAT).
+
+    Fajlovi segmenata se samo hard linkuju; nove su samo zajednicke male datoteke
+    (recnik, idf, doc_len/norm, kolone za filtere) i gmap.npy po segmentu. Kolone za
+    filtere segmenta racunaju se jednom i ostaju u segmentu za sledece objave.
+    """
+    import heapq
+    from bm25_engine import okapi_idf
+
+    ver = new_version_dir(index_path)
+    os.makedirs(ver)
+    names, cols, dfs, lens = [], [], [], []
+    for sp in seg_paths:
+        if not os.path.exists(os.path.join(sp, "filters.json")):
+            metas = StringColumn(os.path.join(sp, "meta"))
+            write_meta_columns(sp, (json.loads(metas[i] or "{}") for i in range(len(metas))))
+        name = os.path.basename(sp.rstrip("/"))
+        _link_files(sp, os.path.join(ver, name))
+        names.append(name)
+        cols.append(StringColumn(os.path.join(sp, "terms")))
+        dfs.append(np.load(os.path.join(sp, "df.npy")))
+        lens.append(np.load(os.path.join(sp, "doc_len.npy")))
+
+    def term_iter(si):
+        col = cols[si]
+        for ti in range(len(col)):
+            yield col.raw(ti), si, ti
+
+    gmaps = [np.empty(len(c), dtype=np.int32) for c in cols]
+    terms = []
+    for key, si, ti in heapq.merge(*(term_iter(i) for i in range(len(cols)))):
+        if not terms or terms[-1] != key:
+            terms.append(key)
+        gmaps[si][ti] = len(terms) - 1
+    df = np.zeros(len(terms), dtype=np.int64)
+    for name, gmap, d in zip(names, gmaps, dfs):
+        np.save(os.path.join(ver, name, "gmap.npy"), gmap)
+        np.add.at(df, gmap, d)
+
+    doc_len = np.concatenate(lens).astype(np.int32) if lens else np.empty(0, dtype=np.int32)
+    n = len(doc_len)
+    avgdl = float(doc_len.sum()) / n if n else 0.0
+    write_string_column(os.path.join(ver, "terms"), terms)
+    np.save(os.path.join(ver, "idf.npy"), okapi_idf(df, n, epsilon))
+    np.save(os.path.join(ver, "doc_len.npy"), doc_len)
+    np.save(os.path.join(ver, "norm.npy"), k1 * (1 - b + b * doc_len / avgdl) if n else np.empty(0))
+    write_meta_columns(ver, built=combine_meta_columns(seg_paths))
+    with open(os.path.join(ver, "meta.json"), "w", encoding="utf-8") as f:
+        info = {"format": SEGMENTED_FORMAT, "segments": [{"name": nm, "n_docs": len(l)} for nm, l in zip(names, lens)],
+                "n_docs": n, "avgdl": avgdl, "k1": k1, "b": b}
+        if tokenizer.config() is not None:
+            info["tokenizer"] = tokenizer.config()
+        json.dump(info, f)
+    swap_index(ver, index_path)
+    return ver
+
+
+def _link_files(src: str, dst: str):
+    os.makedirs(dst, exist_ok=True)
+    for name in os.listdir(src):
+        if not os.path.isfile(os.path.join(src, name)):
+            continue
+        try:
+            os.link(os.path.join(src, name), os.path.join(dst, name))
+        except OSError:
+            shutil.copy2(os.path.join(src, name), os.path.join(dst, name))
+
+
+# --- objavljivanje: <indeks> je symlink na <indeks>.versions/NNNNNN ---
+
+def new_version_dir(index_path: str) -> str:
+    """Putanja za sledecu verziju indeksa (jos ne postoji, api.py je ne vidi do swap_index)."""
+    vdir = index_path.rstrip("/") + ".versions"
+    os.makedirs(vdir, exist_ok=True)
+    last = max((int(n) for n in os.listdir(vdir) if n.isdigit()), default=0)
+    return os.path.join(vdir, f"{last + 1:06d}")
+
+
+def swap_index(version_dir: str, index_path: str, keep: int = KEEP_VERSIONS):
+    """Atomska objava: symlink `index_path` se zamenjuje jednim os.replace(), pa citaoci
+    uvek vide ili staru ili novu verziju (nikad trenutak bez indeksa)."""
+    index_path = index_path.rstrip("/")
+    vdir = index_path + ".versions"
+    if os.path.isdir(index_path) and not os.path.islink(index_path):
+        # stari raspored (pravi direktorijum): jednom se premesta medju verzije
+        legacy = os.path.join(vdir, f"{0:06d}")
+        shutil.rmtree(legacy, ignore_errors=True)
+        os.rename(index_path, legacy)
+    link = index_path + ".link.tmp"
+    if os.path.lexists(link):
+        os.unlink(link)
+    os.symlink(os.path.relpath(os.path.abspath(version_dir), os.path.dirname(os.path.abspath(index_path))), link)
+    os.replace(link, index_path)
+    current = os.path.basename(version_dir.rstrip("/"))
+    old = sorted(n for n in os.listdir(vdir) if n.isdigit() and n != current)
+    for name in old[:max(len(old) - (keep - 1), 0)]:
+        shutil.rmtree(os.path.join(vdir, name), ignore_errors=True)
+
+
+def index_segments(path: str):
+    """Direktorijumi segmenata objavljenog skupa (SEGMENTED_FORMAT), inace []."""
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return [os.path.join(path, s["name"]) for s in info.get("segments", [])]
+
+
+# --- citanje objavljenog skupa segmenata ---
+
+class IndexSegment:
+    """Jedan segment objavljenog skupa: lokalni CSR postinzi + gmap (sortiran, lokalni -> globalni termin)."""
+
+    def __init__(self, path: str, base: int):
+        def arr(name):
+            return np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+
+        self.path = path
+        self.base = base
+        self.gmap = arr("gmap")
+        self.post_offsets, self.post_docs, self.post_tfs = arr("post_offsets"), arr("post_docs"), arr("post_tfs")
+        self.n_docs = len(arr("doc_len"))
+        self.positions = PositionStore(path) if PositionStore.exists(path) else None
+
+    def local(self, gtid: int):
+        i = int(np.searchsorted(self.gmap, gtid))
+        return i if i < len(self.gmap) and int(self.gmap[i]) == gtid else None
+
+    def postings(self, lt: int):
+        lo, hi = int(self.post_offsets[lt]), int(self.post_offsets[lt + 1])
+        return self.post_docs[lo:hi], self.post_tfs[lo:hi]
+
+
+class SegmentedEngine(BM25Engine):
+    """BM25Engine nad vise segmenata: postinzi termina se spajaju iz segmenata (rastuci doc id-jevi),
+    idf/norm su zajednicki pa su skorovi isti kao nad spojenim indeksom."""
+
+    def __init__(self, vocab, idf, segments, doc_len, avgdl, k1=1.5, b=0.75, norm=None):
+        super().__init__(vocab, idf, None, None, None, doc_len, avgdl, k1=k1, b=b, norm=norm)
+        self.segments = segments
+
+    def postings(self, tid: int):
+        docs, tfs = [], []
+        for seg in self.segments:
+            lt = seg.local(tid)
+            if lt is None:
+                continue
+            d, f = seg.postings(lt)
+            docs.append(d + np.int32(seg.base) if seg.base else d)
+            tfs.append(f)
+        if len(docs) == 1:
+            return docs[0], tfs[0]
+        if not docs:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+        return np.concatenate(docs), np.concatenate(tfs)
+
+
+class _SegmentRouter:
+    def __init__(self, segments):
+        self.segments = segments
+        self.bases = np.asarray([s.base for s in segments] + [segments[-1].base + segments[-1].n_docs if segments else 0], dtype=np.int64)
+
+    def _at(self, i: int):
+        si = int(np.searchsorted(self.bases, i, side="right")) - 1
+        return self.segments[si], i - int(self.bases[si])
+
+
+class SegmentedPositions(_SegmentRouter):
+    """PositionStore interfejs nad segmentima (globalni doc id-jevi)."""
+
+    def token_starts(self, doc: int):
+        seg, local = self._at(doc)
+        return seg.positions.token_starts(local)
+
+    def term_positions(self, engine, tid: int, docs):
+        docs = np.asarray(docs, dtype=np.int64)
+        cuts = np.searchsorted(docs, self.bases)
+        owners, poss = [], []
+        for seg, lo, hi in zip(self.segments, cuts[:-1].tolist(), cuts[1:].tolist()):
+            if lo == hi:
+                continue
+            lt = seg.local(tid)
+            pdocs, _ = seg.postings(lt)
+            o, p = seg.positions.gather(int(seg.post_offsets[lt]) + np.searchsorted(pdocs, docs[lo:hi] - seg.base))
+            owners.append(o + lo)
+            poss.append(p)
+        if not owners:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(owners), np.concatenate(poss)
+
+
+class SegmentedDocs(_SegmentRouter, DocStore):
+    """DocStore nad segmentima (globalni doc id-jevi)."""
+
+    def __init__(self, segments):
+        super().__init__(segments)
+        self.stores = {s.path: DocStore(s.path) for s in segments}
+
+    def __len__(self):
+        return int(self.bases[-1])
+
+    def doc_id(self, i: int):
+        seg, local = self._at(i)
+        return self.stores[seg.path].doc_id(local)
+
+    def text(self, i: int) -> str:
+        seg, local = self._at(i)
+        return self.stores[seg.path].text(local)
+
+    def meta(self, i: int) -> dict:
+        seg, local = self._at(i)
+        return self.stores[seg.path].meta(local)
+
+
+def open_segmented(path: str, info: dict) -> SearchIndex:
+    def arr(name):
+        return np.load(os.path.join(path, name + ".npy"), mmap_mode="r")
+
+    segments, base = [], 0
+    for s in info["segments"]:
+        segments.append(IndexSegment(os.path.join(path, s["name"]), base))
+        base += s["n_docs"]
+    engine = SegmentedEngine(
+        TermLexicon(StringColumn(os.path.join(path, "terms"))), arr("idf"), segments, arr("doc_len"),
+        info["avgdl"], k1=info["k1"], b=info["b"], norm=arr("norm"),
+    )
+    positions = SegmentedPositions(segments) if segments and all(s.positions for s in segments) else None
+    return SearchIndex(engine, SegmentedDocs(segments), MetaIndex.open(path), positions, Tokenizer.from_config(info.get("tokenizer")))
@@ -0,0 +1,338 @@
+import os, json, time, zlib, resource
+from array import array
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+from storage import get_container
+from tokenizer import Tokenizer
+from build_corpus import FNAME_RE, TEXT_CONTAINER, CORPUS_CONTAINER, DEDUP_BLOB_NAME
+
+# Near-duplikati izmedju ekstrakcije (text kontejner) i build_corpus.py: ista presuda stigne kao
+# PDF i DOC, ili ponovo objavljena sa sitnim izmenama, pa bi se inace obradila i indeksirala vise puta.
+#   python3 near_dedup.py       (pa build_corpus.py)
+# 1) MinHash potpis (DEDUP_PERM brojeva) nad shingle-ovima od DEDUP_SHINGLE reci; reci idu kroz
+#    tokenizer.py (ista presuda u latinici i cirilici daje isti potpis). Potpisi su na disku
+#    (DEDUP_STATE/sigs.bin), a nepromenjeni blobovi (isti etag) se ne preuzimaju ponovo.
+# 2) LSH: potpis se deli na DEDUP_BANDS traka; dokumenti sa istim hash-om trake su kandidati,
+#    kandidat se proverava procenjenim Jaccard-om (>= DEDUP_THRESHOLD) sa prvim dokumentom
+#    kante, pa je posao linearan po kanti (ne kvadratan). Traka po traka: u RAM-u je samo
+#    niz hash-eva jedne trake (~40 B po dokumentu), potpisi se citaju preko mmap-a.
+# 3) Klasteri (union-find) -> jedan kanonski dokument po klasteru (ime po FNAME_RE, pa najduzi
+#    tekst, pa prvi po imenu); ostali su aliasi u DEDUP_BLOB_NAME (CORPUS_CONTAINER):
+#    {"blob", "etag", "canonical", "similarity"} po aliasu + zavrsni red sa statistikom.
+#    build_corpus.py preskace alias blobove, a kanonski zapis dobija polje "aliases".
+# .anon.txt i ostali .txt se porede samo medju sobom (anonimizovana kopija nije duplikat).
+DEDUP_STATE = os.environ.get("DEDUP_STATE", "near_dedup_state")
+DEDUP_SHINGLE = int(os.environ.get("DEDUP_SHINGLE", "5"))
+DEDUP_PERM = int(os.environ.get("DEDUP_PERM", "128"))
+DEDUP_BANDS = int(os.environ.get("DEDUP_BANDS", "16"))
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", "0.8"))
+DEDUP_SEED = int(os.environ.get("DEDUP_SEED", "1"))
+DEDUP_IO_WORKERS = int(os.environ.get("DEDUP_IO_WORKERS", "8"))
+DEDUP_WORKERS = int(os.environ.get("DEDUP_WORKERS", str(os.cpu_count() or 1)))
+PROGRESS_EVERY = int(os.environ.get("PROGRESS_EVERY", "5000"))
+MIN_CHARS = 50          # kao build_corpus.py: kraci tekstovi ne ulaze u korpus
+SHINGLE_CHUNK = 4096    # shingle-ova po koraku MinHash-a (matrica chunk x DEDUP_PERM)
+ROW_CHUNK = 65536       # redova potpisa po koraku pri racunanju traka/slicnosti
+ANON_SALT = np.uint64(0x9E3779B97F4A7C15)
+TOKENIZER = Tokenizer(stem=False)
+
+
+class MinHasher:
+    """MinHash nad shingle-ovima reci: h_i(s) = (a_i * s + b_i) >> 32 (multiply-shift), min po dokumentu."""
+
+    def __init__(self, perm: int = DEDUP_PERM, shingle: int = DEDUP_SHINGLE, seed: int = DEDUP_SEED):
+        rng = np.random.default_rng(seed)
+        self.perm, self.shingle, self.seed = perm, shingle, seed
+        self.a = rng.integers(0, 2**64 - 1, perm, dtype=np.uint64, endpoint=True) | np.uint64(1)
+        self.b = rng.integers(0, 2**64 - 1, perm, dtype=np.uint64, endpoint=True)
+
+    def config(self) -> dict:
+        return {"perm": self.perm, "shingle": self.shingle, "seed": self.seed, "tokenizer": TOKENIZER.config()}
+
+    def shingles(self, text: str) -> np.ndarray:
+        toks = TOKENIZER.tokens(text)
+        if not toks:
+            return np.empty(0, dtype=np.uint64)
+        h = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in toks), dtype=np.uint64, count=len(toks))
+        k = min(self.shingle, len(h))
+        m = len(h) - k + 1
+        sh = h[:m].copy()
+        for j in range(1, k):
+            sh = sh * np.uint64(0x100000001B3) + h[j:j + m]
+        return np.unique(sh)
+
+    def signature(self, text: str):
+        """-> uint32[perm] ili None za tekst bez reci."""
+        sh = self.shingles(text)
+        if not len(sh):
+            return None
+        sig = np.full(self.perm, 0xFFFFFFFF, dtype=np.uint64)
+        for i in range(0, len(sh), SHINGLE_CHUNK):
+            x = sh[i:i + SHINGLE_CHUNK, None]
+            np.minimum(sig, ((x * self.a + self.b) >> np.uint64(32)).min(axis=0), out=sig)
+        return sig.astype(np.uint32)
+
+
+_HASHER = None
+
+def _init_worker(perm, shingle, seed):
+    global _HASHER
+    _HASHER = MinHasher(perm, shingle, seed)
+
+def _signature(text):
+    return _HASHER.signature(text)
+
+
+def similarity(sigs, a, b) -> np.ndarray:
+    """Procenjeni Jaccard = udeo istih MinHash vrednosti, za parove redova (a[i], b[i])."""
+    out = np.empty(len(a), dtype=np.float32)
+    for i in range(0, len(a), ROW_CHUNK):
+        out[i:i + ROW_CHUNK] = (sigs[a[i:i + ROW_CHUNK]] == sigs[b[i:i + ROW_CHUNK]]).mean(axis=1)
+    return out
+
+
+def _roots(parent, x):
+    r = parent[x]
+    while True:
+        nr = parent[r]
+        if np.array_equal(nr, r):
+            return r
+        r = nr
+
+
+def _find(parent, x):
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+
+def lsh_clusters(sigs, anon, bands: int, threshold: float, work_dir: str, log=print):
+    """-> (koren klastera po redu, statistika). Kandidati iz iste kante jedne trake se proveravaju
+    sa prvim clanom kante; spojeni parovi idu u union-find (koren = najmanji red)."""
+    n, perm = sigs.shape
+    rows = perm // bands
+    parent = np.arange(n, dtype=np.int64)
+    mult = np.random.default_rng(0).integers(0, 2**64 - 1, rows, dtype=np.uint64, endpoint=True) | np.uint64(1)
+    path = os.path.join(work_dir, "bands.tmp.npy")
+    band_hash = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint64, shape=(bands, n))
+    try:
+        # jedan prolaz kroz potpise -> hash svake trake, cuva se po traci (bands x n)
+        for i in range(0, n, ROW_CHUNK):
+            blk = sigs[i:i + ROW_CHUNK].astype(np.uint64).reshape(-1, bands, rows)
+            h = (blk * mult).sum(axis=2, dtype=np.uint64)
+            h ^= anon[i:i + ROW_CHUNK, None].astype(np.uint64) * ANON_SALT
+            band_hash[:, i:i + len(blk)] = h.T
+        band_hash.flush()
+        n_candidates = n_merged = 0
+        for b in range(bands):
+            h = np.asarray(band_hash[b])
+            order = np.argsort(h, kind="stable")
+            hs = h[order]
+            start = np.ones(n, dtype=bool)
+            start[1:] = hs[1:] != hs[:-1]
+            head = order[np.maximum.accumulate(np.where(start, np.arange(n), 0))]
+            a, c = head[~start], order[~start]
+            del h, hs, order, start, head
+            if not len(a):
+                continue
+            # parovi koji su vec u istom klasteru se ne proveravaju ponovo
+            keep = _roots(parent, a) != _roots(parent, c)
+            a, c = a[keep], c[keep]
+            n_candidates += len(a)
+            ok = similarity(sigs, a, c) >= threshold
+            for x, y in zip(a[ok].tolist(), c[ok].tolist()):
+                rx, ry = _find(parent, x), _find(parent, y)
+                if rx != ry:
+                    parent[max(rx, ry)] = min(rx, ry)
+                    n_merged += 1
+            log(f"LSH band {b + 1}/{bands}: {len(a)} candidate pairs, {int(ok.sum())} similar, {n_merged} merged")
+    finally:
+        del band_hash
+        os.unlink(path)
+    return _roots(parent, np.arange(n)), {"candidate_pairs": n_candidates, "merged_pairs": n_merged}
+
+
+class SigStore:
+    """DEDUP_STATE: blobs.jsonl (blob, etag, chars, row; redosled listinga) + sigs.bin (row x perm uint32)."""
+
+    def __init__(self, state_dir: str, hasher: MinHasher):
+        self.dir = state_dir
+        self.perm = hasher.perm
+        self.config = hasher.config()
+
+    def _p(self, name):
+        return os.path.join(self.dir, name)
+
+    def previous(self):
+        """-> (iterator redova, mmap potpisa) prethodnog stanja ili (None, None)."""
+        try:
+            with open(self._p("state.json"), encoding="utf-8") as f:
+                st = json.load(f)
+            if st["config"] != self.config:
+                print(f"MinHash config changed ({st['config']} -> {self.config}), signing everything")
+                return None, None
+            f = open(self._p("blobs.jsonl"), "rb")
+        except (FileNotFoundError, ValueError, KeyError):
+            return None, None
+        sigs = np.memmap(self._p("sigs.bin"), dtype=np.uint32, mode="r").reshape(-1, self.perm) if st["docs"] else None
+        return (json.loads(ln) for ln in f), sigs
+
+    def open_new(self):
+        os.makedirs(self.dir, exist_ok=True)
+        return open(self._p("blobs.jsonl.tmp"), "wb"), open(self._p("sigs.bin.tmp"), "wb")
+
+    def commit(self, n_docs: int):
+        os.replace(self._p("sigs.bin.tmp"), self._p("sigs.bin"))
+        os.replace(self._p("blobs.jsonl.tmp"), self._p("blobs.jsonl"))
+        with open(self._p("state.json.tmp"), "w", encoding="utf-8") as f:
+            json.dump({"config": self.config, "docs": n_docs}, f)
+        os.replace(self._p("state.json.tmp"), self._p("state.json"))
+
+    def signatures(self, n_docs: int):
+        if not n_docs:
+            return np.empty((0, self.perm), dtype=np.uint32)
+        return np.memmap(self._p("sigs.bin"), dtype=np.uint32, mode="r").reshape(n_docs, self.perm)
+
+    def rows(self):
+        with open(self._p("blobs.jsonl"), "rb") as f:
+            for ln in f:
+                yield json.loads(ln)
+
+
+def sign_corpus(textc, store: SigStore, hasher: MinHasher, log=print):
+    """Prolaz 1: potpis za svaki .txt blob, u redosledu listinga. Prethodno stanje se cita
+    uporedo sa listingom (oba sortirana po imenu), pa memorija ne zavisi od broja blobova."""
+    old_rows, old_sigs = store.previous()
+    cur = next(old_rows, None) if old_rows else None
+    rows_out, sigs_out = store.open_new()
+    chars, anon, named = array("i"), bytearray(), bytearray()
+    stats = {"blobs": 0, "short": 0, "downloaded": 0, "reused": 0}
+    t0 = time.time()
+    cpu = ProcessPoolExecutor(DEDUP_WORKERS, initializer=_init_worker,
+                              initargs=(hasher.perm, hasher.shingle, hasher.seed)) if DEDUP_WORKERS > 1 else None
+
+    def work(name):
+        txt = textc.get(name).decode("utf-8", errors="ignore").strip()
+        if len(txt) < MIN_CHARS:
+            return len(txt), None
+        return len(txt), cpu.submit(_signature, txt).result() if cpu else hasher.signature(txt)
+
+    def consume(name, etag, fut, prev):
+        if fut is None:
+            stats["reused"] += 1
+            n, sig = prev["chars"], old_sigs[prev["row"]] if prev["row"] is not None else None
+        else:
+            n, sig = fut.result()
+        row = None
+        if sig is None:
+            stats["short"] += 1
+        else:
+            row = len(chars)
+            sigs_out.write(np.ascontiguousarray(sig, dtype=np.uint32).tobytes())
+            chars.append(n)
+            anon.append(name.endswith(".anon.txt"))
+            named.append(bool(FNAME_RE.match(name)))
+        rows_out.write((json.dumps({"blob": name, "etag": etag, "chars": n, "row": row}, ensure_ascii=False) + "\n").encode("utf-8"))
+
+    try:
+        with ThreadPoolExecutor(DEDUP_IO_WORKERS, thread_name_prefix="get") as pool:
+            window = deque()
+            for b in textc.list():
+                if not b.name.lower().endswith(".txt"):
+                    continue
+                stats["blobs"] += 1
+                while cur is not None and cur["blob"] < b.name:
+                    cur = next(old_rows, None)
+                prev = cur if cur is not None and cur["blob"] == b.name and cur["etag"] == b.etag else None
+                fut = None
+                if prev is None:
+                    fut = pool.submit(work, b.name)
+                    stats["downloaded"] += 1
+                window.append((b.name, b.etag, fut, prev))
+                if len(window) >= 4 * DEDUP_IO_WORKERS:
+                    consume(*window.popleft())
+                if PROGRESS_EVERY and stats["blobs"] % PROGRESS_EVERY == 0:
+                    log(f"PROGRESS: {stats['blobs']} blobs, {stats['downloaded']} downloaded [{time.time()-t0:.0f}s]")
+            while window:
+                consume(*window.popleft())
+    finally:
+        if cpu:
+            cpu.shutdown()
+        rows_out.close()
+        sigs_out.close()
+    store.commit(len(chars))
+    stats["sign_seconds"] = round(time.time() - t0, 3)
+    return (np.frombuffer(chars, dtype=np.int32), np.frombuffer(bytes(anon), dtype=np.bool_),
+            np.frombuffer(bytes(named), dtype=np.bool_), stats)
+
+
+def canonicals(root, chars, named):
+    """-> (aliasi, kanonski red za svaki alias, broj klastera sa bar dva dokumenta)."""
+    n = len(root)
+    size = np.bincount(root, minlength=n)
+    idx = np.flatnonzero(size[root] > 1)
+    if not len(idx):
+        return idx, idx, 0
+    # prednost: ime po FNAME_RE (gross izlaz), pa najduzi tekst, pa prvi po imenu
+    order = idx[np.lexsort((idx, -chars[idx], ~named[idx], root[idx]))]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = root[order[1:]] != root[order[:-1]]
+    canon = np.full(n, -1, dtype=np.int64)
+    canon[root[order[first]]] = order[first]
+    of = canon[root[idx]]
+    alias = of != idx
+    return idx[alias], of[alias], int(first.sum())
+
+
+def run(textc=None, corpusc=None, state_dir: str = DEDUP_STATE, blob_name: str = DEDUP_BLOB_NAME,
+        bands: int = DEDUP_BANDS, threshold: float = DEDUP_THRESHOLD, hasher: MinHasher | None = None, log=print):
+    hasher = hasher or MinHasher()
+    if hasher.perm % bands:
+        raise SystemExit(f"DEDUP_PERM ({hasher.perm}) must be divisible by DEDUP_BANDS ({bands})")
+    textc = textc or get_container(TEXT_CONTAINER)
+    corpusc = corpusc or get_container(CORPUS_CONTAINER)
+    store = SigStore(state_dir, hasher)
+    t0 = time.time()
+    chars, anon, named, stats = sign_corpus(textc, store, hasher, log)
+    n = len(chars)
+    sigs = store.signatures(n)
+    t1 = time.time()
+    root, lsh = lsh_clusters(sigs, anon, bands, threshold, state_dir, log)
+    aliases, canon, n_clusters = canonicals(root, chars, named)
+    sim = similarity(sigs, aliases, canon)
+    stats.update(lsh, lsh_seconds=round(time.time() - t1, 3), docs=n, clusters=n_clusters,
+                 duplicates=len(aliases), duplicate_rate=round(len(aliases) / max(n, 1), 4))
+
+    # imena samo za redove koji se upisuju (aliasi i njihovi kanonski dokumenti)
+    need = set(aliases.tolist()) | set(canon.tolist())
+    names = {r["row"]: (r["blob"], r["etag"]) for r in store.rows() if r["row"] in need}
+    w = corpusc.open_writer(blob_name)
+    try:
+        for a, c, s in zip(aliases.tolist(), canon.tolist(), sim.tolist()):
+            rec = {"blob": names[a][0], "etag": names[a][1], "canonical": names[c][0], "similarity": round(s, 4)}
+            w.write((json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8"))
+        trailer = {"_dedup": blob_name, **{k: stats[k] for k in ("docs", "clusters", "duplicates", "duplicate_rate")},
+                   "threshold": threshold, "bands": bands, **hasher.config()}
+        w.write((json.dumps(trailer) + "\n").encode("utf-8"))
+    except BaseException:
+        w.abort()
+        raise
+    w.close()
+    stats["seconds"] = round(time.time() - t0, 3)
+    return stats
+
+
+def main():
+    st = run()
+    peak_mb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                  resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+    print(f"Listed {st['blobs']} text blobs ({st['downloaded']} downloaded, {st['reused']} reused, {st['short']} short), "
+          f"signed {st['docs']} in {st['sign_seconds']:.1f}s, LSH {st['lsh_seconds']:.1f}s "
+          f"({st['candidate_pairs']} candidate pairs)")
+    print(f"Near-duplicates: {st['duplicates']} of {st['docs']} docs ({100*st['duplicate_rate']:.2f}%) in "
+          f"{st['clusters']} clusters -> {CORPUS_CONTAINER}/{DEDUP_BLOB_NAME}; total {st['seconds']:.1f}s, peak RSS {peak_mb:.0f} MB")
+
+if __name__ == "__main__":
+    main()
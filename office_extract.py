@@ -0,0 +1,152 @@
+import os, io, zipfile, tempfile, threading, subprocess
+from lxml import etree
+
+# ODT/DOCX/DOC -> tekst bez ucitavanja celog dokumenta u stablo (iterparse + ciscenje)
+
+TEXT_NS = "urn:oasis:names:tc:opendocument:xmlns:text:1.0"
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+def _t(tag): return f"{{{TEXT_NS}}}{tag}"
+def _w(tag): return f"{{{W_NS}}}{tag}"
+
+ODF_PARA = (_t("p"), _t("h"))
+ODF_SPACE, ODF_TAB, ODF_BREAK = _t("s"), _t("tab"), _t("line-break")
+# fusnote i ugnjezdeni pasusi se odvajaju razmakom od okolnog teksta
+ODF_APART = ODF_PARA + (_t("note"),)
+
+
+def _odf_text(el, out):
+    if el.text:
+        out.append(el.text)
+    for ch in el:
+        if ch.tag == ODF_SPACE:
+            out.append(" " * int(ch.get(_t("c"), "1")))
+        elif ch.tag in (ODF_TAB, ODF_BREAK):
+            out.append(" ")
+        elif ch.tag in ODF_APART:
+            out.append(" ")
+            _odf_text(ch, out)
+            out.append(" ")
+        elif isinstance(ch.tag, str):
+            _odf_text(ch, out)
+        if ch.tail:
+            out.append(ch.tail)
+
+
+def extract_odf_text(data: bytes) -> str:
+    """Pasusi (text:p / text:h) odvojeni praznim redom, razmaci unutar pasusa sazeti."""
+    paras = []
+    with zipfile.ZipFile(io.BytesIO(data)) as z, z.open("content.xml") as f:
+        for _, el in etree.iterparse(f, events=("end",), tag=ODF_PARA, huge_tree=True):
+            # ugnjezdeni pasusi (fusnote, okviri) ulaze u tekst spoljnog
+            if any(a.tag in ODF_PARA for a in el.iterancestors()):
+                continue
+            out = []
+            _odf_text(el, out)
+            p = " ".join("".join(out).split())
+            if p:
+                paras.append(p)
+            el.clear()
+            while el.getprevious() is not None:
+                del el.getparent()[0]
+    return "\n\n".join(paras)
+
+
+W_BODY, W_P, W_R, W_HYPERLINK = _w("body"), _w("p"), _w("r"), _w("hyperlink")
+W_T, W_TAB, W_PTAB, W_BR, W_CR, W_NBH = _w("t"), _w("tab"), _w("ptab"), _w("br"), _w("cr"), _w("noBreakHyphen")
+W_TYPE = _w("type")
+
+
+def _run_text(r, out):
+    for e in r:
+        tag = e.tag
+        if tag == W_T:
+            out.append(e.text or "")
+        elif tag in (W_TAB, W_PTAB):
+            out.append("\t")
+        elif tag == W_CR or tag == W_NBH:
+            out.append("\n" if tag == W_CR else "-")
+        elif tag == W_BR:
+            if e.get(W_TYPE, "textWrapping") == "textWrapping":
+                out.append("\n")
+
+
+def extract_docx_text(data: bytes) -> str:
+    """Isto kao python-docx `[p.text for p in Document(f).paragraphs]` (pasusi direktno u
+    w:body, bez tabela), ali samo iz word/document.xml, bez celog objektnog modela."""
+    parts = []
+    with zipfile.ZipFile(io.BytesIO(data)) as z, z.open("word/document.xml") as f:
+        for _, el in etree.iterparse(f, events=("end",), tag=W_P, huge_tree=True):
+            parent = el.getparent()
+            if parent is None or parent.tag != W_BODY:
+                continue
+            out = []
+            for ch in el:
+                if ch.tag == W_R:
+                    _run_text(ch, out)
+                elif ch.tag == W_HYPERLINK:
+                    for r in ch:
+                        if r.tag == W_R:
+                            _run_text(r, out)
+            text = "".join(out)
+            if text and text.strip():
+                parts.append(text)
+            el.clear()
+            while el.getprevious() is not None:
+                del parent[0]
+    return "\n".join(parts)
+
+
+# antiword: .doc mora biti fajl sa seek-om (stdin/pipe ne radi), pa se bajtovi pisu u
+# memfd (RAM, bez diska) koji dete cita preko /proc/self/fd; svaki thread ima svoj memfd
+# koji se koristi ponovo. antiword nema serverski mod: svaki .doc je i dalje novi proces
+# (fork+exec), a broj istovremenih ogranicavaju pool-ovi pozivaoca (npr. CPU_WORKERS).
+ANTIWORD_TIMEOUT = float(os.environ.get("ANTIWORD_TIMEOUT", "60"))
+
+
+class AntiwordRunner:
+    def __init__(self):
+        self.pid = os.getpid()
+        self.local = threading.local()
+
+    def memfd(self):
+        if not hasattr(os, "memfd_create"):
+            return None
+        fd = getattr(self.local, "fd", None)
+        if fd is None:
+            fd = self.local.fd = os.memfd_create("antiword")
+        return fd
+
+    def run(self, path: str, pass_fds=()):
+        try:
+            out = subprocess.check_output(["antiword", path], stderr=subprocess.STDOUT,
+                                          pass_fds=pass_fds, timeout=ANTIWORD_TIMEOUT)
+            return out.decode("utf-8", errors="ignore").strip()
+        except subprocess.CalledProcessError as e:
+            msg = e.output.decode("utf-8", errors="ignore")
+            raise RuntimeError(f"antiword failed: {msg[:300]}")
+
+    def convert(self, data: bytes) -> str:
+        fd = self.memfd()
+        if fd is None:
+            with tempfile.NamedTemporaryFile(suffix=".doc", delete=True) as tmp:
+                tmp.write(data); tmp.flush()
+                return self.run(tmp.name)
+        os.ftruncate(fd, 0)
+        os.lseek(fd, 0, os.SEEK_SET)
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+        return self.run(f"/proc/self/fd/{fd}", pass_fds=(fd,))
+
+
+_antiword = None
+_antiword_lock = threading.Lock()
+
+def extract_doc_text(data: bytes) -> str:
+    global _antiword
+    with _antiword_lock:
+        # posle fork-a (process pool) svaki proces pravi svoj runner
+        if _antiword is None or _antiword.pid != os.getpid():
+            _antiword = AntiwordRunner()
+    return _antiword.convert(data)
@@ -0,0 +1,121 @@
+import os, io, json, time, shutil, subprocess, threading
+from pdfminer.converter import TextConverter
+from pdfminer.layout import LAParams
+from pdfminer.pdfdocument import PDFDocument
+from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+from pdfminer.pdfpage import PDFPage
+from pdfminer.pdfparser import PDFParser
+from pdfminer.pdftypes import resolve1
+
+# PDF -> tekst iz memorije (bez temp fajlova), po stranama.
+# PDF_EXTRACTOR: pdfminer (podrazumevano, isti izlaz kao ranije), pdftotext (poppler,
+# brze; pada nazad na pdfminer ako alat ne postoji / ne uspe), auto (pdftotext ako je instaliran)
+PDF_EXTRACTOR = os.environ.get("PDF_EXTRACTOR", "pdfminer")
+# budzet po dokumentu: posle ovoliko sekundi / strana ostatak se ne obradjuje
+PDF_MAX_SECONDS = float(os.environ.get("PDF_MAX_SECONDS", "120"))
+PDF_MAX_PAGES = int(os.environ.get("PDF_MAX_PAGES", "1000"))
+# dokumenti duzi od ovoga se dele po stranama na workere (ako postoji pool)
+PDF_SPLIT_PAGES = int(os.environ.get("PDF_SPLIT_PAGES", "16"))
+# JSONL sa vremenima po strani (prazno = iskljuceno), i prag za SLOW log
+PDF_TIMING_LOG = os.environ.get("PDF_TIMING_LOG", "")
+PDF_SLOW_SECONDS = float(os.environ.get("PDF_SLOW_SECONDS", "10"))
+
+PDFTOTEXT = shutil.which("pdftotext")
+
+
+def page_count(doc: PDFDocument) -> int:
+    n = resolve1(doc.catalog.get("Pages"))
+    n = resolve1(n.get("Count")) if isinstance(n, dict) else None
+    if isinstance(n, int) and n >= 0:
+        return n
+    return sum(1 for _ in PDFPage.create_pages(doc))
+
+
+def pdfminer_pages(data: bytes, first: int, last: int, deadline: float):
+    """Strane [first, last) -> (tekstovi, sekunde po strani, ukupno strana u dokumentu).
+    Izvrsava se i u worker procesima; staje kad prodje deadline (time.time())."""
+    doc = PDFDocument(PDFParser(io.BytesIO(data)))
+    total = page_count(doc)
+    out = io.StringIO()
+    rsrcmgr = PDFResourceManager(caching=True)
+    device = TextConverter(rsrcmgr, out, codec="utf-8", laparams=LAParams())
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    texts, seconds = [], []
+    for pageno, page in enumerate(PDFPage.create_pages(doc)):
+        if pageno < first:
+            continue
+        if pageno >= last or time.time() > deadline:
+            break
+        t = time.perf_counter()
+        start = out.tell()
+        interpreter.process_page(page)
+        texts.append(out.getvalue()[start:])
+        seconds.append(round(time.perf_counter() - t, 4))
+    return texts, seconds, total
+
+
+def pdftotext_text(data: bytes, timeout: float):
+    """poppler pdftotext preko stdin/stdout; None ako alat nije dostupan ili ne uspe."""
+    if not PDFTOTEXT:
+        return None
+    try:
+        r = subprocess.run([PDFTOTEXT, "-enc", "UTF-8", "-l", str(PDF_MAX_PAGES), "-", "-"],
+                           input=data, capture_output=True, timeout=timeout)
+    except (subprocess.TimeoutExpired, OSError):
+        return None
+    if r.returncode != 0:
+        return None
+    return r.stdout.decode("utf-8", errors="ignore")
+
+
+def extract_pdf(data: bytes, pool=None) -> dict:
+    """-> {"text", "pages", "page_seconds", "seconds", "extractor", "truncated"}.
+    Sa pool-om (ProcessPoolExecutor) dugi dokumenti se dele po PDF_SPLIT_PAGES strana."""
+    t0 = time.time()
+    deadline = t0 + PDF_MAX_SECONDS
+
+    if PDF_EXTRACTOR in ("pdftotext", "auto"):
+        txt = pdftotext_text(data, PDF_MAX_SECONDS)
+        if txt is not None and len(txt.strip()) >= 50:
+            return {"text": txt.strip(), "pages": txt.count("\f"), "page_seconds": [],
+                    "seconds": round(time.time() - t0, 3), "extractor": "pdftotext", "truncated": False}
+
+    first = min(PDF_SPLIT_PAGES, PDF_MAX_PAGES)
+    if pool is None:
+        texts, seconds, total = pdfminer_pages(data, 0, PDF_MAX_PAGES, deadline)
+    else:
+        texts, seconds, total = pool.submit(pdfminer_pages, data, 0, first, deadline).result()
+        last = min(total, PDF_MAX_PAGES)
+        if last > first and len(texts) == first:
+            starts = range(first, last, PDF_SPLIT_PAGES)
+            futs = [pool.submit(pdfminer_pages, data, a, min(a + PDF_SPLIT_PAGES, last), deadline) for a in starts]
+            for a, fut in zip(starts, futs):
+                t, s, _ = fut.result()
+                # na prekoracenju budzeta zadrzava se samo neprekinut pocetak dokumenta
+                if len(texts) == a:
+                    texts += t
+                    seconds += s
+    truncated = len(texts) < total
+    return {"text": "".join(texts).strip(), "pages": total, "page_seconds": seconds,
+            "seconds": round(time.time() - t0, 3), "extractor": "pdfminer", "truncated": truncated}
+
+
+def extract_pdf_text(data: bytes, pool=None) -> str:
+    return extract_pdf(data, pool)["text"]
+
+
+_timing_lock = threading.Lock()
+
+def report_pdf(name: str, res: dict, log=print):
+    """SLOW / TRUNCATED log + (opciono) red u PDF_TIMING_LOG."""
+    if res["truncated"]:
+        log("PDF TRUNCATED:", name, f"{len(res['page_seconds'])}/{res['pages']} pages in {res['seconds']}s")
+    elif res["seconds"] >= PDF_SLOW_SECONDS:
+        ps = res["page_seconds"]
+        slow = max(range(len(ps)), key=ps.__getitem__) if ps else None
+        log("PDF SLOW:", name, f"{res['pages']} pages in {res['seconds']}s",
+            f"(slowest page {slow + 1}: {ps[slow]}s)" if slow is not None else f"({res['extractor']})")
+    if PDF_TIMING_LOG:
+        rec = {"blob": name, **{k: v for k, v in res.items() if k != "text"}}
+        with _timing_lock, open(PDF_TIMING_LOG, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
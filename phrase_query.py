@@ -0,0 +1,172 @@
+import re
+import numpy as np
+
+# Fraze i blizina u upitu, nad pozicionim postinzima (bez ponovnog citanja teksta):
+#   "ne predstavlja grubu nepažnju"      termini tacno jedan za drugim
+#   nepažnja NEAR/5 vozača               najvise 5 tokena izmedju (u bilo kom redosledu)
+#   "gruba nepažnja" NEAR/10 zaposlenog  operand moze biti i fraza
+# Fraze i NEAR operandi su obavezni; ostale reci su opcione i samo uticu na BM25 skor.
+# Dokumenti se prvo seku po doc listama postinga, pa se pozicije porede vektorski:
+# kljuc pojavljivanja je (doc << 32) | pozicija, fraza je presek kljuceva pomerenih za
+# redni broj termina, a NEAR trazi najblize pojavljivanje sa obe strane (searchsorted).
+
+QUERY_RE = re.compile(r'"([^"]*)"?|\bNEAR/(\d+)\b|([^\s"]+)')
+MAX_NEAR = 1000
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+class Operand:
+    __slots__ = ("terms", "required")
+
+    def __init__(self, terms, required):
+        self.terms = tuple(terms)
+        self.required = required
+
+
+class ParsedQuery:
+    def __init__(self, operands, near, text=""):
+        self.operands = operands
+        self.near = near            # [(levi operand, desni operand, n)]
+        self.terms = [t for o in operands for t in o.terms]
+        self.text = text            # upit bez navodnika i NEAR/n (za embedding modele)
+
+    @property
+    def constrained(self) -> bool:
+        return any(o.required for o in self.operands)
+
+    def key(self):
+        """Za kes: termini + ograničenja (isti termini bez fraze su drugi upit)."""
+        return (tuple(self.terms), tuple((o.terms, o.required) for o in self.operands), tuple(self.near))
+
+
+def parse_query(q: str, tokenizer) -> ParsedQuery:
+    ops, near, pending, words = [], [], None, []
+    for m in QUERY_RE.finditer(q):
+        phrase, dist, word = m.groups()
+        if dist is not None:
+            pending = min(int(dist), MAX_NEAR) if ops else None
+            continue
+        raw = phrase if phrase is not None else word
+        toks = tokenizer.tokens(raw)
+        if not toks:
+            continue
+        words.append(raw.strip())
+        ops.append(Operand(toks, required=phrase is not None))
+        if pending is not None:
+            near.append((len(ops) - 2, len(ops) - 1, pending))
+            ops[-2].required = ops[-1].required = True
+            pending = None
+    return ParsedQuery(ops, near, " ".join(words))
+
+
+def _restrict(docs, allowed):
+    if allowed is None:
+        return docs
+    if allowed.dtype == bool:
+        return docs[allowed[docs]]
+    return np.intersect1d(docs, allowed, assume_unique=True)
+
+
+def candidate_docs(engine, terms, allowed=None):
+    """Sortirani doc id-jevi koji sadrze sve termine (od najredjeg ka najcescem)."""
+    if not terms:
+        return _restrict(np.arange(engine.n_docs, dtype=np.int32), allowed)
+    lists = []
+    for t in set(terms):
+        tid = engine.term_id(t)
+        if tid is None:
+            return EMPTY.astype(np.int32)
+        lists.append(engine.postings(tid)[0])
+    lists.sort(key=len)
+    docs = _restrict(np.asarray(lists[0]), allowed)
+    for other in lists[1:]:
+        if not len(docs):
+            break
+        docs = np.intersect1d(docs, other, assume_unique=True)
+    return docs.astype(np.int32, copy=False)
+
+
+def occurrences(index, terms, docs):
+    """Kljucevi (doc << 32 | pocetna pozicija) pojavljivanja fraze u `docs`, sortirani.
+    `docs` mora biti podskup doc lista svih termina (vidi candidate_docs)."""
+    engine = index.engine
+    keys = None
+    for i, t in enumerate(terms):
+        owner, pos = index.positions.term_positions(engine, engine.term_id(t), docs)
+        ok = pos >= i
+        k = (docs[owner[ok]].astype(np.int64) << 32) | (pos[ok] - i)
+        keys = k if keys is None else np.intersect1d(keys, k, assume_unique=True)
+        if not len(keys):
+            break
+    return keys
+
+
+def near_docs(ka, la: int, kb, lb: int, n: int):
+    """Dokumenti u kojima je neko pojavljivanje A najvise n tokena od nekog pojavljivanja B.
+    Pojavljivanja se ne smeju preklapati (`x NEAR/n x` trazi dva razlicita x)."""
+    if not len(ka) or not len(kb):
+        return EMPTY
+    doc = ka >> 32
+    # prvo B koje pocinje posle kraja A i poslednje B koje se zavrsava pre pocetka A
+    idx = np.searchsorted(kb, ka + la)
+    nxt = kb[np.minimum(idx, len(kb) - 1)]
+    ok = (idx < len(kb)) & ((nxt >> 32) == doc) & (nxt - ka <= n + la)
+    idx = np.searchsorted(kb, ka - lb, side="right") - 1
+    prv = kb[np.maximum(idx, 0)]
+    ok |= (idx >= 0) & ((prv >> 32) == doc) & (ka - prv <= n + lb)
+    return np.unique(doc[ok])
+
+
+def match_docs(index, pq: ParsedQuery, allowed=None):
+    """Sortirani doc id-jevi koji zadovoljavaju sve fraze i NEAR uslove upita."""
+    if index.positions is None:
+        raise ValueError("Phrase and NEAR queries need an index with positions (rebuild with build_index.py)")
+    required = [o for o in pq.operands if o.required]
+    docs = candidate_docs(index.engine, [t for o in required for t in o.terms], allowed)
+    occ = {}
+
+    def occ_of(i):
+        # kljucevi racunati nad ranijim (vecim) skupom su i dalje ispravni
+        if i not in occ:
+            occ[i] = occurrences(index, pq.operands[i].terms, docs)
+        return occ[i]
+
+    for i, o in enumerate(pq.operands):
+        if o.required and len(o.terms) > 1 and len(docs):
+            docs = np.intersect1d(docs, np.unique(occ_of(i) >> 32).astype(np.int32), assume_unique=True)
+    for a, b, n in pq.near:
+        if not len(docs):
+            break
+        hit = near_docs(occ_of(a), len(pq.operands[a].terms), occ_of(b), len(pq.operands[b].terms), n)
+        docs = np.intersect1d(docs, hit.astype(np.int32), assume_unique=True)
+    return docs
+
+
+def phrase_search(index, pq: ParsedQuery, k=10, allowed=None):
+    """Top-k (doc, skor): BM25 nad svim terminima upita, samo medju dokumentima koji
+    zadovoljavaju fraze/NEAR."""
+    return index.engine.search_in(pq.terms, match_docs(index, pq, allowed), k)
+
+
+def match_mask(index, pq: ParsedQuery, allowed=None):
+    """Bool maska (n_docs) celog skupa pogodaka, npr. za facete: sa frazama/NEAR kao
+    match_docs, inace dokumenti sa bar jednim terminom upita; prazan upit = svi."""
+    engine = index.engine
+    mask = np.zeros(engine.n_docs, dtype=bool)
+    if pq.constrained:
+        mask[match_docs(index, pq, allowed)] = True
+        return mask
+    if not pq.terms:
+        mask[:] = True
+    for t in set(pq.terms):
+        tid = engine.term_id(t)
+        if tid is not None:
+            mask[engine.postings(tid)[0]] = True
+    if allowed is not None:
+        if allowed.dtype == bool:
+            mask &= allowed
+        else:
+            keep = np.zeros_like(mask)
+            keep[allowed] = True
+            mask &= keep
+    return mask
@@ -1,12 +1,16 @@
 import os, io, zipfile, hashlib
-from azure.storage.blob import BlobServiceClient
-from pdfminer.high_level import extract_text as pdf_extract_text
-from lxml import etree
-from docx import Document
+from concurrent.futures import ProcessPoolExecutor
+from blob_plan import plan_text_work, mark_skipped, mark_written
+from pdf_extract import extract_pdf, report_pdf
+from office_extract import extract_odf_text, extract_docx_text
+from storage import get_container
 
-AZ_CONN = os.environ["AZURE_STORAGE_CONNECTION_STRING"]
 RAW_CONTAINER = os.environ.get("RAW_CONTAINER", "raw")
 TEXT_CONTAINER = os.environ.get("TEXT_CONTAINER", "text")
+# procesi za paralelnu ekstrakciju dugih PDF-ova po stranama (1 = sve u ovom procesu)
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(os.cpu_count() or 1)))
+# formati koje ova skripta ekstrahuje (.doc samo process_raw_to_text_key.py); upisuje se u skip markere
+EXTRACTORS = ("pdf", "odf", "docx")
 
 def sha256_bytes(b: bytes) -> str:
     return hashlib.sha256(b).hexdigest()
@@ -24,79 +28,55 @@ def detect_format(data: bytes) -> str:
         return "zip"
     return "bin"
 
-def extract_odf_text(data: bytes) -> str:
-    z = zipfile.ZipFile(io.BytesIO(data))
-    xml = z.read("content.xml")
-    root = etree.fromstring(xml)
-    # узми све текст чворове
-    text = " ".join(root.xpath("//text()"))
-    # мало чишћења
-    text = " ".join(text.split())
-    return text
-
-def extract_docx_text(data: bytes) -> str:
-    with io.BytesIO(data) as f:
-        doc = Document(f)
-        parts = [p.text for p in doc.paragraphs if p.text and p.text.strip()]
-    return "\n".join(parts)
-
-def extract_pdf_text(data: bytes) -> str:
-    # pdfminer ради са путањом или file-like; најлакше је temp фајл
-    import tempfile
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=True) as tmp:
-        tmp.write(data)
-        tmp.flush()
-        txt = pdf_extract_text(tmp.name) or ""
-    return txt.strip()
-
 def main():
-    bsc = BlobServiceClient.from_connection_string(AZ_CONN)
-    raw = bsc.get_container_client(RAW_CONTAINER)
-    textc = bsc.get_container_client(TEXT_CONTAINER)
+    raw = get_container(RAW_CONTAINER)
+    textc = get_container(TEXT_CONTAINER)
 
-    blobs = list(raw.list_blobs())
-    if not blobs:
-        print("No blobs found in container:", RAW_CONTAINER)
+    work = plan_text_work(raw, textc, EXTRACTORS)
+    if not work:
+        print("Nothing to do in container:", RAW_CONTAINER)
         return
 
-    for b in blobs:
-        name = b.name
-        bc = raw.get_blob_client(name)
-        data = bc.download_blob().readall()
+    pool = ProcessPoolExecutor(PDF_WORKERS) if PDF_WORKERS > 1 else None
 
-        fmt = detect_format(data)
-        base = os.path.splitext(os.path.basename(name))[0]
-        out_name = f"{base}.txt"
+    for name, out_name, etag, overwrite in work:
+        data = raw.get(name)
 
-        out_bc = textc.get_blob_client(out_name)
-        if out_bc.exists():
-            print("SKIP text exists:", out_name)
-            continue
+        fmt = detect_format(data)
 
         try:
             if fmt == "pdf":
-                txt = extract_pdf_text(data)
+                res = extract_pdf(data, pool)
+                report_pdf(name, res)
+                txt = res["text"]
             elif fmt == "odf":
                 txt = extract_odf_text(data)
             elif fmt == "docx":
                 txt = extract_docx_text(data)
             else:
                 print("SKIP unsupported:", name, "type:", fmt)
+                mark_skipped(textc, name, out_name, etag, f"unsupported:{fmt}", EXTRACTORS, overwrite)
                 continue
 
             if not txt or len(txt.strip()) < 50:
                 print("WARN empty/short text:", name, "type:", fmt)
+                mark_skipped(textc, name, out_name, etag, f"short:{fmt}", EXTRACTORS, overwrite)
                 continue
 
-            out_bc.upload_blob(
+            textc.put(
+                out_name,
                 txt.encode("utf-8"),
-                overwrite=False,
-                metadata={"source_blob": name, "file_type": fmt}
+                overwrite=overwrite,
+                metadata={"source_blob": name, "file_type": fmt, "source_etag": etag}
             )
+            mark_written(textc, out_name, overwrite)
             print("WROTE:", out_name, "from:", name, "type:", fmt, "chars:", len(txt))
 
         except Exception as e:
             print("ERROR processing:", name, "type:", fmt, "err:", e)
 
+    if pool is not None:
+        pool.shutdown()
+
 if __name__ == "__main__":
     main()
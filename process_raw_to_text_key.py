@@ -1,47 +1,29 @@
 import os, io, zipfile
-import tempfile
-import subprocess
-import re
-from azure.storage.blob import BlobServiceClient
-from azure.core.pipeline.transport import RequestsTransport
-from pdfminer.high_level import extract_text as pdf_extract_text
-from lxml import etree
-from docx import Document
-
-def anonymize_sr(text: str) -> str:
-    """Basic Serbian PII scrubber (best-effort). NOT perfect; safety net."""
-    if not text:
-        return text
-    t = text.replace("\u00a0", " ")
-
-    import re as _re
-
-    t = _re.sub(r'(?i)\b[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}\b', '[EMAIL]', t)
-    t = _re.sub(r'(?i)\bhttps?://\S+\b', '[URL]', t)
-    t = _re.sub(r'(?i)\bwww\.\S+\b', '[URL]', t)
-
-    t = _re.sub(r'\b\d{13}\b', '[JMBG]', t)
-    t = _re.sub(r'(?x)(?<!\d)(?:\+?381|0)\s*(?:\(?\d{2,3}\)?[\s/-]*)\d{3}[\s/-]*\d{3,4}(?!\d)', '[PHONE]', t)
-    t = _re.sub(r'(?i)\bRS\s*\d(?:\s*\d){19}\b', '[IBAN]', t)
-    t = _re.sub(r'(?<!\d)(?:\d[ -]?){13,19}(?!\d)', '[CARD_OR_LONG_NUMBER]', t)
-    t = _re.sub(r'\b[A-ZČĆŠĐŽ]{1,2}\s*\d{3,4}\s*[- ]?\s*[A-ZČĆŠĐŽ]{1,2}\b', '[PLATE]', t)
-    t = _re.sub(r'(?i)\b(ličn(?:a|e)\s+karta|lk|pasoš|putna\s+isprava|broj\s+dokumenta)\s*[:#]?\s*\w+\b', r'\1: [DOC_ID]', t)
-    t = _re.sub(r'(?i)\b(ul\.?|ulica|bulevar|булевар|bb)\s+[A-Za-zА-Яа-яČĆŠĐŽčćšđž0-9 .-]{2,}\b', '[ADDRESS]', t)
-
-    role_pat = _re.compile(r'(?i)\b(tužilac|okrivljeni|okrivljena|optuženi|optužena|tuženi|tužena|tužilja|branilac|punomoćnik|puno(?:m|ć)nik|oštećeni|oštećena|svedok|svjedok|sudija|predsednik\s+veća|predsjednik\s+vijeća)\b\s*[:\-]\s*([A-ZČĆŠĐŽ][a-zčćšđž]+(?:\s+[A-ZČĆŠĐŽ][a-zčćšđž]+){1,2})')
-    t = role_pat.sub(lambda m: f"{m.group(1)}: [NAME]", t)
-
-    t = _re.sub(r'\b([A-ZА-ЯČĆŠĐŽ]\.)\s*([A-ZА-ЯČĆŠĐŽ]\.)\b', '[INITIALS]', t)
-
-    t = _re.sub(r'[ \t]+', ' ', t)
-    t = _re.sub(r'\n{3,}', '\n\n', t)
-    return t.strip()
-
-ACCOUNT = os.environ["AZURE_STORAGE_ACCOUNT_NAME"]
-KEY = os.environ["AZURE_STORAGE_ACCOUNT_KEY"]
+import time
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from blob_plan import plan_text_work, mark_skipped, mark_written
+from anonymizer import Anonymizer
+from pdf_extract import extract_pdf, report_pdf
+from office_extract import extract_odf_text, extract_docx_text, extract_doc_text
+from storage import get_container
+
 RAW_CONTAINER = os.environ.get("RAW_CONTAINER","raw")
 TEXT_CONTAINER = os.environ.get("TEXT_CONTAINER","text")
 
+# download/upload u thread pool-u, ekstrakcija + anonimizacija u process pool-u
+IO_WORKERS = int(os.environ.get("IO_WORKERS", "8"))
+CPU_WORKERS = int(os.environ.get("CPU_WORKERS", str(os.cpu_count() or 1)))
+# threadovi koji dele PDF po stranama na process pool i cekaju delove (ne zauzimaju io threadove)
+PDF_COORDINATORS = int(os.environ.get("PDF_COORDINATORS", "4"))
+# backpressure: najvise ovoliko blobova (i njihovih bajtova) istovremeno u memoriji
+MAX_INFLIGHT = int(os.environ.get("MAX_INFLIGHT", str(2 * (IO_WORKERS + CPU_WORKERS))))
+PROGRESS_EVERY = int(os.environ.get("PROGRESS_EVERY", "500"))
+# formati koje extract_blob ume da ekstrahuje; upisuje se u skip markere (vidi blob_plan)
+EXTRACTORS = ("pdf", "odf", "docx", "doc")
+
 def detect_format(data: bytes) -> str:
     if data.startswith(b"%PDF"):
         return "pdf"
@@ -63,89 +45,169 @@ def detect_format_with_name(name: str, data: bytes) -> str:
     return detect_format(data)
 
 
-def extract_odf_text(data: bytes) -> str:
-    z = zipfile.ZipFile(io.BytesIO(data))
-    xml = z.read("content.xml")
-    root = etree.fromstring(xml)
-    text = " ".join(root.xpath("//text()"))
-    return " ".join(text.split())
+def extract_blob(name: str, data: bytes):
+    """Ekstrakcija teksta za jedan blob (izvrsava se u process pool-u).
+    Vraca (fmt, txt ili None, broj PII zamena po kategoriji)."""
+    fmt = detect_format_with_name(name, data)
+    anon = Anonymizer()
+    if fmt == "pdf":
+        txt = extract_pdf(data)["text"]
+    elif fmt == "odf":
+        txt = extract_odf_text(data)
+    elif fmt == "docx":
+        txt = extract_docx_text(data)
+    elif fmt == "doc":
+        txt = extract_doc_text(data)
+        txt = anon.anonymize(txt)
+    else:
+        return fmt, None, {}
+    return fmt, txt, dict(anon.counts)
+
+
+_log_lock = threading.Lock()
+
+def log(*args):
+    # vise threadova pise istovremeno -> cele linije
+    with _log_lock:
+        print(*args, flush=True)
+
+
+class CpuPool:
+    """ProcessPoolExecutor koji se pravi ponovo kad ga srusi worker (segfault, OOM kill):
+    blobovi koji su tada bili u obradi padaju, ostali idu na novi pool."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(workers)
+        self.lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        pool = self.pool
+        try:
+            return pool.submit(fn, *args)
+        except BrokenProcessPool:
+            with self.lock:
+                if self.pool is pool:
+                    log("WARN process pool broken, restarting")
+                    pool.shutdown(wait=False)
+                    self.pool = ProcessPoolExecutor(self.workers)
+            return self.pool.submit(fn, *args)
 
-def extract_docx_text(data: bytes) -> str:
-    with io.BytesIO(data) as f:
-        doc = Document(f)
-        parts = [p.text for p in doc.paragraphs if p.text and p.text.strip()]
-    return "\n".join(parts)
+    def shutdown(self):
+        self.pool.shutdown()
 
-def extract_pdf_text(data: bytes) -> str:
-    import tempfile
-    with tempfile.NamedTemporaryFile(suffix=".pdf", delete=True) as tmp:
-        tmp.write(data); tmp.flush()
-        txt = pdf_extract_text(tmp.name) or ""
-    return txt.strip()
 
+class StageStats:
+    """Brojaci po fazi: broj stavki, bajtova i ukupno vreme rada (zbir preko workera)."""
 
-def extract_doc_text(data: bytes) -> str:
-    # Uses antiword (installed via apt)
-    with tempfile.NamedTemporaryFile(suffix=".doc", delete=True) as tmp:
-        tmp.write(data); tmp.flush()
-        try:
-            out = subprocess.check_output(["antiword", tmp.name], stderr=subprocess.STDOUT)
-            return out.decode("utf-8", errors="ignore").strip()
-        except subprocess.CalledProcessError as e:
-            msg = e.output.decode("utf-8", errors="ignore")
-            raise RuntimeError(f"antiword failed: {msg[:300]}")
+    def __init__(self, name: str):
+        self.name = name
+        self.n = 0
+        self.bytes = 0
+        self.busy = 0.0
+        self.lock = threading.Lock()
 
-def main():
-    transport = RequestsTransport(connection_timeout=10, read_timeout=180)
-    url = f"https://{ACCOUNT}.blob.core.windows.net"
-    bsc = BlobServiceClient(account_url=url, credential=KEY, transport=transport)
-
-    raw = bsc.get_container_client(RAW_CONTAINER)
-    textc = bsc.get_container_client(TEXT_CONTAINER)
+    def add(self, nbytes: int, seconds: float):
+        with self.lock:
+            self.n += 1
+            self.bytes += nbytes
+            self.busy += seconds
 
-    count = 0
-    for b in raw.list_blobs():
-        count += 1
-        name = b.name
-        data = raw.get_blob_client(name).download_blob().readall()
-        fmt = detect_format_with_name(name, data)
-        base = os.path.splitext(os.path.basename(name))[0]
-        out_name = f"{base}.txt"
+    def report(self, wall: float) -> str:
+        return (f"{self.name}: {self.n} blobs, {self.bytes/1e6:.1f} MB, "
+                f"{self.n/max(wall,1e-9):.1f} blobs/s, {self.bytes/1e6/max(wall,1e-9):.2f} MB/s, busy {self.busy:.0f}s")
 
-        out_bc = textc.get_blob_client(out_name)
-        if out_bc.exists():
-            print("SKIP:", out_name)
-            continue
 
+def main():
+    raw = get_container(RAW_CONTAINER)
+    textc = get_container(TEXT_CONTAINER)
+
+    stats = {s: StageStats(s) for s in ("download", "extract", "upload")}
+    pii, pii_lock = Counter(), threading.Lock()
+    slots = threading.BoundedSemaphore(MAX_INFLIGHT)
+    io_pool = ThreadPoolExecutor(IO_WORKERS, thread_name_prefix="io")
+    cpu_pool = CpuPool(CPU_WORKERS)
+    pdf_pool = ThreadPoolExecutor(PDF_COORDINATORS, thread_name_prefix="pdf")
+    t0 = time.time()
+
+    def download(name, out_name, etag, overwrite):
+        t = time.perf_counter()
+        data = raw.get(name)
+        stats["download"].add(len(data), time.perf_counter() - t)
+        t = time.perf_counter()
+        if detect_format_with_name(name, data) == "pdf":
+            # PDF: strane se dele na cpu_pool, pdf thread ceka i spaja (io threadovi ostaju slobodni)
+            fut = pdf_pool.submit(extract_pdf_blob, name, data)
+        else:
+            fut = cpu_pool.submit(extract_blob, name, data)
+        fut.add_done_callback(lambda f: io_pool.submit(guard, upload, name, out_name, etag, overwrite, len(data), t, f))
+
+    def extract_pdf_blob(name, data):
+        res = extract_pdf(data, cpu_pool)
+        report_pdf(name, res, log)
+        return "pdf", res["text"], {}
+
+    def upload(name, out_name, etag, overwrite, nbytes, t, fut):
         try:
-            if fmt == "pdf":
-                txt = extract_pdf_text(data)
-            elif fmt == "odf":
-                txt = extract_odf_text(data)
-            elif fmt == "docx":
-                txt = extract_docx_text(data)
-            elif fmt == "doc":
-                txt = extract_doc_text(data)
-                txt = anonymize_sr(txt)
-            else:
-                print("SKIP unsupported:", name, fmt)
-                continue
-
-            if not txt or len(txt.strip()) < 50:
-                print("WARN short:", name, fmt)
-                continue
-
-            out_bc.upload_blob(
-                txt.encode("utf-8"),
-                overwrite=False,
-                metadata={"source_blob": name, "file_type": fmt}
-            )
-            print("WROTE:", out_name, "from:", name, "type:", fmt, "chars:", len(txt))
-
+            fmt, txt, pii_counts = fut.result()
         except Exception as e:
-            print("ERROR processing:", name, fmt, e)
+            log("ERROR processing:", name, e)
+            return
+        stats["extract"].add(nbytes, time.perf_counter() - t)
+        with pii_lock:
+            pii.update(pii_counts)
+        if txt is None:
+            log("SKIP unsupported:", name, fmt)
+            mark_skipped(textc, name, out_name, etag, f"unsupported:{fmt}", EXTRACTORS, overwrite)
+            return
+        if not txt or len(txt.strip()) < 50:
+            log("WARN short:", name, fmt)
+            mark_skipped(textc, name, out_name, etag, f"short:{fmt}", EXTRACTORS, overwrite)
+            return
+        payload = txt.encode("utf-8")
+        t = time.perf_counter()
+        textc.put(
+            out_name,
+            payload,
+            overwrite=overwrite,
+            metadata={"source_blob": name, "file_type": fmt, "source_etag": etag}
+        )
+        mark_written(textc, out_name, overwrite)
+        stats["upload"].add(len(payload), time.perf_counter() - t)
+        log("WROTE:", out_name, "from:", name, "type:", fmt, "chars:", len(txt))
+
+    def guard(fn, name, *args):
+        # svaki blob drzi jedan slot do kraja obrade (ili greske)
+        try:
+            fn(name, *args)
+        except Exception as e:
+            log("ERROR processing:", name, e)
+            slots.release()
+            return
+        if fn is upload:
+            slots.release()
 
-    print("Done. Processed blobs:", count)
+    count = 0
+    for name, out_name, etag, overwrite in plan_text_work(raw, textc, EXTRACTORS):
+        count += 1
+        slots.acquire()
+        io_pool.submit(guard, download, name, out_name, etag, overwrite)
+        if PROGRESS_EVERY and count % PROGRESS_EVERY == 0:
+            wall = time.time() - t0
+            log("PROGRESS:", count, "listed |", " | ".join(s.report(wall) for s in stats.values()))
+
+    # sacekaj da se svi slotovi vrate (sve faze zavrsene)
+    for _ in range(MAX_INFLIGHT):
+        slots.acquire()
+    io_pool.shutdown()
+    pdf_pool.shutdown()
+    cpu_pool.shutdown()
+
+    wall = time.time() - t0
+    log("Done. Processed blobs:", count, f"in {wall:.1f}s")
+    for s in stats.values():
+        log(" ", s.report(wall))
+    log("  PII replacements:", ", ".join(f"{k}={v}" for k, v in sorted(pii.items())) or "none")
 
 if __name__ == "__main__":
     main()
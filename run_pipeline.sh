@@ -13,7 +13,10 @@ export OUT_BLOB="${OUT_BLOB:-corpus_anon.jsonl}"
 echo "== Step 1: raw -> text (extract + anonymize) =="
 python3 -u process_raw_to_text_key.py
 
-echo "== Step 2: text -> corpus jsonl (filename + text) =="
+echo "== Step 2: near-duplicates (MinHash/LSH) -> near_duplicates.jsonl =="
+python3 -u near_dedup.py
+
+echo "== Step 3: text -> corpus jsonl (filename + text) =="
 python3 -u build_corpus_minimal.py
 
 echo "Done."
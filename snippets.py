@@ -0,0 +1,72 @@
+import numpy as np
+
+SNIPPET_TOKENS = 30     # sirina prozora sa pogocima (u tokenima)
+SNIPPET_CONTEXT = 8     # tokena konteksta sa obe strane
+HL_START, HL_END = "<em>", "</em>"
+
+
+def query_positions(index, doc: int, qtok):
+    """Pozicije (redni broj tokena) termina upita u dokumentu, iz pozicionih postinga."""
+    engine = index.engine
+    out = []
+    for t in set(qtok):
+        tid = engine.term_id(t)
+        if tid is None:
+            continue
+        docs, _ = engine.postings(tid)
+        j = int(np.searchsorted(docs, doc))
+        if j < len(docs) and docs[j] == doc:
+            out += [(p, t) for p in index.positions.term_positions(engine, tid, [doc])[1].tolist()]
+    out.sort()
+    return out
+
+
+def best_window(hits, width: int):
+    """Prozor od `width` tokena sa najvise razlicitih termina (pa najvise pogodaka)."""
+    best, best_key = (0, 0), (-1, -1)
+    j = 0
+    for i in range(len(hits)):
+        while hits[i][0] - hits[j][0] >= width:
+            j += 1
+        window = hits[j:i + 1]
+        key = (len({t for _, t in window}), len(window))
+        if key > best_key:
+            best, best_key = (j, i), key
+    return best
+
+
+def make_snippet(index, doc: int, text: str, qtok, width=SNIPPET_TOKENS, context=SNIPPET_CONTEXT) -> str:
+    if index.positions is not None:
+        hits = query_positions(index, doc, qtok)
+        starts = index.positions.token_starts(doc)
+    else:
+        # stari pickle indeks nema pozicije -> jedini slucaj kad se tekst skenira
+        spans = index.tokenizer.spans(text)
+        q = set(qtok)
+        hits = [(i, tok) for i, (tok, _) in enumerate(spans) if tok in q]
+        starts = [s for _, s in spans]
+    if not starts:
+        return text[:300]
+    if not hits:
+        first = starts[min(len(starts) - 1, width + context)]
+        return text[:first].rstrip() + (" …" if first < len(text) else "")
+
+    j, i = best_window(hits, width)
+    lo_tok = max(0, hits[j][0] - context)
+    hi_tok = min(len(starts) - 1, hits[i][0] + context)
+    lo = starts[lo_tok]
+    hi = token_end(index, text, starts[hi_tok])
+
+    out, cur = [], lo
+    for p, _ in hits[j:i + 1]:
+        s = starts[p]
+        e = token_end(index, text, s)
+        out += [text[cur:s], HL_START, text[s:e], HL_END]
+        cur = e
+    out.append(text[cur:hi])
+    return ("… " if lo > 0 else "") + "".join(out) + (" …" if hi < len(text) else "")
+
+
+def token_end(index, text: str, start: int) -> int:
+    m = index.tokenizer.token_re.match(text, start)
+    return m.end() if m else start
@@ -0,0 +1,388 @@
+import io, os, json, mmap, uuid, base64, shutil, tempfile, threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Jedan interfejs za blob storage (list, get, get_range, put, open_reader/open_writer, exists, metadata).
+# STORAGE=azure (podrazumevano) ili STORAGE=local:<dir> (kontejner = poddirektorijum,
+# metadata u <dir>/.meta/<kontejner>/<blob>.json), pa ceo pipeline radi i bez Azure naloga.
+STORAGE = os.environ.get("STORAGE", "azure")
+# velicina HTTP pool-a deljenog Azure klijenta (jedan po procesu)
+STORAGE_POOL_SIZE = int(os.environ.get("STORAGE_POOL_SIZE", "32"))
+# open_writer: velicina bloka i broj blokova koji se paralelno salju (Azure staged blocks)
+STORAGE_BLOCK_BYTES = int(os.environ.get("STORAGE_BLOCK_BYTES", str(8 << 20)))
+STORAGE_UPLOAD_CONCURRENCY = int(os.environ.get("STORAGE_UPLOAD_CONCURRENCY", "4"))
+META_DIR = ".meta"
+
+
+class BlobExists(Exception):
+    """put(..., overwrite=False) na blob koji vec postoji."""
+
+
+class BlobNotFound(Exception):
+    pass
+
+
+class BlobInfo:
+    __slots__ = ("name", "size", "etag", "metadata")
+
+    def __init__(self, name, size, etag, metadata=None):
+        self.name = name
+        self.size = size
+        self.etag = etag
+        self.metadata = metadata
+
+
+class LocalContainer:
+    """Kontejner kao direktorijum na lokalnom disku; get_range/view idu preko mmap-a."""
+
+    def __init__(self, root: str, name: str):
+        self.name = name
+        self.dir = os.path.join(root, name)
+        self.meta_dir = os.path.join(root, META_DIR, name)
+        os.makedirs(self.dir, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        p = os.path.normpath(os.path.join(self.dir, name))
+        if not p.startswith(self.dir + os.sep):
+            raise ValueError(f"invalid blob name: {name!r}")
+        return p
+
+    def _meta_path(self, name: str) -> str:
+        return os.path.join(self.meta_dir, name + ".json")
+
+    @staticmethod
+    def _etag(st) -> str:
+        return f"{st.st_mtime_ns:x}-{st.st_size:x}"
+
+    def list(self, prefix: str = "", metadata: bool = False):
+        """Blobovi sortirani po imenu (kao Azure listing)."""
+        names = []
+        for d, _, files in os.walk(self.dir):
+            rel = os.path.relpath(d, self.dir)
+            for f in files:
+                if f.startswith(".tmp-"):
+                    continue
+                n = f if rel == "." else f"{rel}/{f}".replace(os.sep, "/")
+                if n.startswith(prefix):
+                    names.append(n)
+        names.sort()
+        for n in names:
+            try:
+                st = os.stat(self.path(n))
+            except FileNotFoundError:
+                continue
+            yield BlobInfo(n, st.st_size, self._etag(st), self.metadata(n) if metadata else None)
+
+    def exists(self, name: str) -> bool:
+        return os.path.isfile(self.path(name))
+
+    def info(self, name: str) -> BlobInfo:
+        try:
+            st = os.stat(self.path(name))
+        except FileNotFoundError:
+            raise BlobNotFound(f"{self.name}/{name}") from None
+        return BlobInfo(name, st.st_size, self._etag(st), self.metadata(name))
+
+    def metadata(self, name: str) -> dict:
+        try:
+            with open(self._meta_path(name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def get(self, name: str) -> bytes:
+        try:
+            with open(self.path(name), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise BlobNotFound(f"{self.name}/{name}") from None
+
+    def get_range(self, name: str, offset: int, length: int) -> bytes:
+        with self.view(name) as m:
+            return m[offset:offset + length]
+
+    def view(self, name: str):
+        """mmap (read-only) celog bloba; za prazan blob prazan memoryview."""
+        try:
+            with open(self.path(name), "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return memoryview(b"")
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            raise BlobNotFound(f"{self.name}/{name}") from None
+
+    def put(self, name: str, data, overwrite: bool = True, metadata: dict | None = None, length: int | None = None):
+        """data = bytes ili fajl objekat; upis ide u temp fajl pa os.replace (atomicno)."""
+        p = self.path(name)
+        if not overwrite and os.path.exists(p):
+            raise BlobExists(f"{self.name}/{name}")
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(p))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    f.write(data)
+                else:
+                    shutil.copyfileobj(data, f, 1 << 20)
+            if overwrite:
+                os.replace(tmp, p)
+            else:
+                # link ne prepisuje postojeci fajl -> trka dva pisca daje BlobExists
+                try:
+                    os.link(tmp, p)
+                except FileExistsError:
+                    raise BlobExists(f"{self.name}/{name}") from None
+                finally:
+                    os.unlink(tmp)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self._write_meta(name, metadata)
+
+    def delete(self, name: str):
+        try:
+            os.unlink(self.path(name))
+        except FileNotFoundError:
+            raise BlobNotFound(f"{self.name}/{name}") from None
+        self._write_meta(name, None)
+
+    def _write_meta(self, name: str, metadata: dict | None):
+        mp = self._meta_path(name)
+        if metadata:
+            os.makedirs(os.path.dirname(mp), exist_ok=True)
+            with open(mp, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, ensure_ascii=False)
+        elif os.path.exists(mp):
+            os.unlink(mp)
+
+    def open_reader(self, name: str):
+        """Bafer-ovan fajl objekat za sekvencijalno citanje (readline, iteracija po linijama)."""
+        try:
+            return open(self.path(name), "rb")
+        except FileNotFoundError:
+            raise BlobNotFound(f"{self.name}/{name}") from None
+
+    def open_writer(self, name: str, metadata: dict | None = None):
+        return LocalWriter(self, name, metadata)
+
+
+class LocalWriter:
+    """Streaming upis u temp fajl pored cilja; blob se pojavljuje tek na close()."""
+
+    def __init__(self, container: LocalContainer, name: str, metadata: dict | None):
+        self.container, self.name, self.metadata = container, name, metadata
+        p = container.path(name)
+        os.makedirs(os.path.dirname(p), exist_ok=True)
+        fd, self.tmp = tempfile.mkstemp(prefix=".tmp-", dir=os.path.dirname(p))
+        self.f = os.fdopen(fd, "wb", buffering=1 << 20)
+        self.bytes = 0
+
+    def write(self, data: bytes):
+        self.f.write(data)
+        self.bytes += len(data)
+
+    def close(self):
+        self.f.close()
+        os.replace(self.tmp, self.container.path(self.name))
+        self.container._write_meta(self.name, self.metadata)
+
+    def abort(self):
+        self.f.close()
+        os.unlink(self.tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class ChunkStream(io.RawIOBase):
+    """Iterator bajt-chunkova kao readable stream (za io.BufferedReader)."""
+
+    def __init__(self, chunks):
+        self.chunks = iter(chunks)
+        self.rest = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, b):
+        while not self.rest:
+            self.rest = next(self.chunks, None)
+            if self.rest is None:
+                self.rest = b""
+                return 0
+        n = min(len(b), len(self.rest))
+        b[:n] = self.rest[:n]
+        self.rest = self.rest[n:]
+        return n
+
+
+class AzureBlockWriter:
+    """Streaming upis kao staged blocks: pun blok (STORAGE_BLOCK_BYTES) ide u stage_block na
+    thread pool-u, najvise STORAGE_UPLOAD_CONCURRENCY blokova u letu (memorija ogranicena
+    na toliko blokova), a close() radi commit_block_list. Bez commit-a blob ostaje nepromenjen."""
+
+    def __init__(self, blob_client, metadata: dict | None):
+        self.bc, self.metadata = blob_client, metadata
+        self.buf = bytearray()
+        self.block_ids = []
+        self.inflight = []
+        self.pool = ThreadPoolExecutor(STORAGE_UPLOAD_CONCURRENCY, thread_name_prefix="stage")
+        self.bytes = 0
+
+    def write(self, data: bytes):
+        self.buf += data
+        self.bytes += len(data)
+        while len(self.buf) >= STORAGE_BLOCK_BYTES:
+            self._stage(bytes(self.buf[:STORAGE_BLOCK_BYTES]))
+            del self.buf[:STORAGE_BLOCK_BYTES]
+
+    def _stage(self, chunk: bytes):
+        # ID-jevi moraju biti iste duzine unutar bloba
+        block_id = base64.b64encode(uuid.uuid4().hex.encode()).decode()
+        self.block_ids.append(block_id)
+        self.inflight.append(self.pool.submit(self.bc.stage_block, block_id, chunk, length=len(chunk)))
+        if len(self.inflight) >= STORAGE_UPLOAD_CONCURRENCY:
+            self.inflight.pop(0).result()
+
+    def close(self):
+        from azure.storage.blob import BlobBlock
+        try:
+            if self.buf or not self.block_ids:
+                self._stage(bytes(self.buf))
+                self.buf = bytearray()
+            for f in self.inflight:
+                f.result()
+            self.bc.commit_block_list([BlobBlock(block_id=b) for b in self.block_ids], metadata=self.metadata)
+        finally:
+            self.pool.shutdown()
+
+    def abort(self):
+        # nekomitovani blokovi isticu sami (Azure ih brise posle 7 dana)
+        for f in self.inflight:
+            f.cancel()
+        self.pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class AzureContainer:
+    def __init__(self, client):
+        self.client = client
+        self.name = client.container_name
+
+    def list(self, prefix: str = "", metadata: bool = False):
+        kw = {"include": ["metadata"]} if metadata else {}
+        for b in self.client.list_blobs(name_starts_with=prefix or None, **kw):
+            yield BlobInfo(b.name, b.size, b.etag, b.metadata if metadata else None)
+
+    def exists(self, name: str) -> bool:
+        return self.client.get_blob_client(name).exists()
+
+    def info(self, name: str) -> BlobInfo:
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            p = self.client.get_blob_client(name).get_blob_properties()
+        except ResourceNotFoundError:
+            raise BlobNotFound(f"{self.name}/{name}") from None
+        return BlobInfo(name, p.size, p.etag, p.metadata)
+
+    def metadata(self, name: str) -> dict:
+        return self.info(name).metadata or {}
+
+    def get(self, name: str) -> bytes:
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            return self.client.get_blob_client(name).download_blob().readall()
+        except ResourceNotFoundError:
+            raise BlobNotFound(f"{self.name}/{name}") from None
+
+    def get_range(self, name: str, offset: int, length: int) -> bytes:
+        if length <= 0:
+            return b""
+        return self.client.get_blob_client(name).download_blob(offset=offset, length=length).readall()
+
+    def view(self, name: str):
+        return memoryview(self.get(name))
+
+    def put(self, name: str, data, overwrite: bool = True, metadata: dict | None = None, length: int | None = None):
+        from azure.core.exceptions import ResourceExistsError
+        try:
+            self.client.get_blob_client(name).upload_blob(data, length=length, overwrite=overwrite, metadata=metadata)
+        except ResourceExistsError:
+            raise BlobExists(f"{self.name}/{name}") from None
+
+    def delete(self, name: str):
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            self.client.get_blob_client(name).delete_blob()
+        except ResourceNotFoundError:
+            raise BlobNotFound(f"{self.name}/{name}") from None
+
+    def open_reader(self, name: str):
+        from azure.core.exceptions import ResourceNotFoundError
+        try:
+            downloader = self.client.get_blob_client(name).download_blob()
+        except ResourceNotFoundError:
+            raise BlobNotFound(f"{self.name}/{name}") from None
+        return io.BufferedReader(ChunkStream(downloader.chunks()), 1 << 20)
+
+    def open_writer(self, name: str, metadata: dict | None = None):
+        return AzureBlockWriter(self.client.get_blob_client(name), metadata)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+def azure_service():
+    """Jedan BlobServiceClient po procesu, sa zajednickim requests pool-om konekcija.
+    AZURE_STORAGE_CONNECTION_STRING ili AZURE_STORAGE_ACCOUNT_NAME + AZURE_STORAGE_ACCOUNT_KEY."""
+    global _service
+    with _service_lock:
+        if _service is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            from azure.storage.blob import BlobServiceClient
+            from azure.core.pipeline.transport import RequestsTransport
+
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=STORAGE_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            transport = RequestsTransport(session=session, session_owner=False,
+                                          connection_timeout=10, read_timeout=180)
+            conn = os.environ.get("AZURE_STORAGE_CONNECTION_STRING")
+            if conn:
+                _service = BlobServiceClient.from_connection_string(conn, transport=transport)
+            else:
+                account = os.environ.get("AZURE_STORAGE_ACCOUNT_NAME")
+                key = os.environ.get("AZURE_STORAGE_ACCOUNT_KEY")
+                if not account or not key:
+                    raise SystemExit("Set AZURE_STORAGE_CONNECTION_STRING or AZURE_STORAGE_ACCOUNT_NAME/"
+                                     "AZURE_STORAGE_ACCOUNT_KEY (or STORAGE=local:<dir>).")
+                _service = BlobServiceClient(account_url=f"https://{account}.blob.core.windows.net",
+                                             credential=key, transport=transport)
+        return _service
+
+
+def get_container(name: str, storage: str | None = None):
+    """Kontejner za aktivni backend (STORAGE env ili eksplicitni `storage`)."""
+    spec = storage or STORAGE
+    if spec == "local" or spec.startswith("local:"):
+        root = spec[len("local:"):] if spec.startswith("local:") else ""
+        return LocalContainer(os.path.abspath(root or "storage"), name)
+    if spec != "azure":
+        raise ValueError(f"unknown STORAGE backend: {spec!r} (azure | local:<dir>)")
+    return AzureContainer(azure_service().get_container_client(name))
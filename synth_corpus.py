@@ -0,0 +1,308 @@
+import os, io, random, zipfile, argparse
+from xml.sax.saxutils import escape
+from decision_classifier import strip_diacritics
+
+# Deterministicki generator sintetickih presuda za benchmark-e (bench_suite.py):
+# latinica i cirilica, imena fajlova po FNAME_RE (sud-upisnik-broj-godina.txt), tacno jedan
+# "pogodak" po dokumentu (gruba nepaznja / negacija / sinonim / nista) i PII recenice.
+# Isti seed -> isti korpus. Render u TXT, DOCX, ODT i PDF (bez spoljnih paketa).
+#   python3 synth_corpus.py out_dir --docs 1000 --formats txt,docx,odt,pdf
+
+COURTS = [
+    "osnovni-sud-u-beogradu", "osnovni-sud-u-novom-sadu", "visi-sud-u-nisu", "visi-sud-u-kragujevcu",
+    "apelacioni-sud-u-beogradu", "apelacioni-sud-u-novom-sadu", "vrhovni-kasacioni-sud",
+    "privredni-sud-u-beogradu", "privredni-apelacioni-sud", "upravni-sud",
+]
+UPISNIK = ["gzh", "gz", "rev", "rev2", "kzz", "p", "p1", "pz", "kz", "prev"]
+
+FILLER_LAT = [
+    "Prvostepeni sud je pravilno utvrdio činjenično stanje i pravilno primenio materijalno pravo.",
+    "Sud je ocenio iskaze svedoka i nalaz veštaka saobraćajne struke kao objektivne i stručne.",
+    "Žalba se odbija kao neosnovana, a troškovi postupka se dosuđuju prema uspehu u sporu.",
+    "Tužbeni zahtev je delimično usvojen, dok je u preostalom delu odbijen kao neosnovan.",
+    "Sud je izveo dokaz čitanjem ugovora o zakupu poslovnog prostora i zapisnika o primopredaji.",
+    "Visina naknade štete utvrđena je na osnovu nalaza i mišljenja veštaka finansijske struke.",
+    "Revizija je izjavljena blagovremeno i dozvoljena je u smislu odredaba zakona.",
+    "Odluka o kamati zasniva se na odredbama Zakona o obligacionim odnosima.",
+]
+FILLER_CYR = [
+    "Првостепени суд је правилно утврдио чињенично стање и правилно применио материјално право.",
+    "Суд је оценио исказе сведока и налаз вештака саобраћајне струке као објективне и стручне.",
+    "Жалба се одбија као неоснована, а трошкови поступка се досуђују према успеху у спору.",
+    "Тужбени захтев је делимично усвојен, док је у преосталом делу одбијен као неоснован.",
+    "Висина накнаде штете утврђена је на основу налаза и мишљења вештака финансијске струке.",
+    "Ревизија је изјављена благовремено и дозвољена је у смислу одредаба закона.",
+]
+# po jedan pasus za svaku kategoriju; gross/synonym pasusi ne sadrze reci negacije
+HITS = {
+    "gross": (
+        ["Po oceni suda, postupanje tuženog predstavlja grubu nepažnju jer je propustio osnovne mere zaštite.",
+         "Sud nalazi da je oštećeni postupao sa grubom nepažnjom prilikom upravljanja vozilom."],
+        ["По оцени суда, поступање туженог представља грубу непажњу јер је пропустио основне мере заштите.",
+         "Утврђено је да постоји груба непажња запосленог приликом руковања машином."],
+    ),
+    "negated": (
+        ["Sud nalazi da ponašanje oštećenog ne predstavlja grubu nepažnju u smislu zakona.",
+         "Propust tuženog nije gruba nepažnja, već obična nepažnja koja ne isključuje odgovornost."],
+        ["Суд налази да понашање оштећеног не представља грубу непажњу у смислу закона.",
+         "Пропуст туженог није груба непажња, већ обична непажња."],
+    ),
+    "synonym": (
+        ["Reč je o krajnjoj nepažnji vozača, koji brzinu kretanja vozila prilagođava tek pred raskrsnicom.",
+         "Radi se o izrazitoj nepažnji zaposlenog prilikom čuvanja poverene opreme."],
+        ["Код возача је постојала изразита непажња, јер брзину кретања возила прилагођава тек пред раскрсницом.",
+         "Утврђена је тешка непажња запосленог приликом чувања поверене опреме."],
+    ),
+    "none": ([], []),
+}
+EXPECTED_RULE = {"gross": "GROSS_TERM", "negated": "GROSS_TERM_NEGATED", "synonym": "SYNONYM_ONLY", "none": "NO_MATCH"}
+CATEGORY_WEIGHTS = (("gross", 30), ("negated", 25), ("synonym", 15), ("none", 30))
+
+FIRST = ["Marko", "Jovana", "Petar", "Milica", "Nikola", "Ana", "Stefan", "Jelena"]
+LAST = ["Marković", "Petrović", "Jovanović", "Nikolić", "Ilić", "Đorđević", "Stojanović", "Pavlović"]
+STREETS = ["Njegoševa", "Kneza Miloša", "Cara Dušana", "Bulevar oslobođenja", "Vojvode Stepe"]
+PII_TEMPLATES = [
+    "Tužilac: {name}, JMBG {jmbg}, sa prebivalištem u ul. {street} {num}.",
+    "Kontakt telefon {phone}, elektronska pošta {email}.",
+    "Uplata je izvršena na račun {iban}.",
+    "Vozilo registarskih oznaka {plate} bilo je parkirano ispred zgrade.",
+    "Svedok - {name} izjavio je da je lična karta: {doc} izdata ranije.",
+    "Оштећени је навео адресу булевар Краља Александра {num} и телефон {phone}.",
+]
+
+CYR2LAT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "ђ": "dj", "е": "e", "ж": "z", "з": "z", "и": "i",
+    "ј": "j", "к": "k", "л": "l", "љ": "lj", "м": "m", "н": "n", "њ": "nj", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "ћ": "c", "у": "u", "ф": "f", "х": "h", "ц": "c", "ч": "c", "џ": "dz", "ш": "s",
+    "А": "A", "Б": "B", "В": "V", "Г": "G", "Д": "D", "Ђ": "Dj", "Е": "E", "Ж": "Z", "З": "Z", "И": "I",
+    "Ј": "J", "К": "K", "Л": "L", "Љ": "Lj", "М": "M", "Н": "N", "Њ": "Nj", "О": "O", "П": "P", "Р": "R",
+    "С": "S", "Т": "T", "Ћ": "C", "У": "U", "Ф": "F", "Х": "H", "Ц": "C", "Ч": "C", "Џ": "Dz", "Ш": "S",
+})
+
+
+class SynthDoc:
+    __slots__ = ("name", "text", "category", "script", "expected_rule", "duplicate_of")
+
+    def __init__(self, name, text, category, script, duplicate_of=None):
+        self.name = name
+        self.text = text
+        self.category = category
+        self.script = script
+        self.expected_rule = EXPECTED_RULE[category]
+        self.duplicate_of = duplicate_of
+
+
+def _pii(rnd: random.Random) -> str:
+    t = rnd.choice(PII_TEMPLATES)
+    return t.format(
+        name=f"{rnd.choice(FIRST)} {rnd.choice(LAST)}",
+        jmbg="".join(str(rnd.randrange(10)) for _ in range(13)),
+        street=rnd.choice(STREETS), num=rnd.randrange(1, 200),
+        phone=f"+381 {rnd.randrange(10, 40)} {rnd.randrange(100, 999)} {rnd.randrange(1000, 9999)}",
+        email=f"{rnd.choice(FIRST).lower()}.{rnd.randrange(100)}@example.rs",
+        iban="RS35 " + " ".join(f"{rnd.randrange(10000):04d}" for _ in range(4)) + f" {rnd.randrange(100):02d}",
+        plate=f"{rnd.choice(['BG', 'NS', 'NI', 'KG'])} {rnd.randrange(100, 9999)}-{rnd.choice(['AB', 'TX', 'ZZ'])}",
+        doc=f"{rnd.randrange(10**8, 10**9)}",
+    )
+
+
+def generate(n: int, seed: int = 1, paras: tuple = (8, 40), cyrillic: float = 0.3, pii: float = 0.15):
+    """-> lista SynthDoc; imena su jedinstvena i odgovaraju FNAME_RE."""
+    rnd = random.Random(seed)
+    cats = [c for c, _ in CATEGORY_WEIGHTS]
+    weights = [w for _, w in CATEGORY_WEIGHTS]
+    docs, names = [], set()
+    while len(docs) < n:
+        name = (f"{rnd.choice(COURTS)}-{rnd.choice(UPISNIK)}-{rnd.randrange(100, 100000)}-"
+                f"{rnd.randrange(2008, 2025)}.txt")
+        if name in names:
+            continue
+        names.add(name)
+        script = "cyr" if rnd.random() < cyrillic else "lat"
+        filler = FILLER_CYR if script == "cyr" else FILLER_LAT
+        ps = []
+        for _ in range(rnd.randint(*paras)):
+            p = " ".join(rnd.choice(filler) for _ in range(rnd.randint(1, 4)))
+            if rnd.random() < pii:
+                p += " " + _pii(rnd)
+            ps.append(p)
+        cat = rnd.choices(cats, weights)[0]
+        hits = HITS[cat][1 if script == "cyr" else 0]
+        if hits:
+            ps.insert(rnd.randrange(len(ps) + 1), rnd.choice(hits))
+        docs.append(SynthDoc(name, "\n\n".join(ps), cat, script))
+    return docs
+
+
+def corpus_texts(path=None, n: int = 1000, seed: int = 1, **kw):
+    """Tekstovi za bench_classifier/bench_anonymizer: .txt fajlovi iz `path` (sortirano po imenu)
+    ili, bez `path`, generate(n, seed, **kw)."""
+    if path is None:
+        return [d.text for d in generate(n, seed, **kw)]
+    texts = []
+    for name in sorted(os.listdir(path)):
+        if name.endswith(".txt"):
+            with open(os.path.join(path, name), encoding="utf-8", errors="ignore") as f:
+                texts.append(f.read())
+    return texts
+
+
+def near_duplicates(docs, frac: float = 0.1, seed: int = 1):
+    """-> kopije za deo dokumenata (near_dedup.py): drugo ime i sitne izmene kao kod ponovne
+    objave ili druge ekstrakcije (prelom redova, izbacen pasus, par izmenjenih reci, podnozje).
+    SynthDoc.duplicate_of = ime originala; pogodak (kategorija) ostaje isti."""
+    rnd = random.Random(seed)
+    names = {d.name for d in docs}
+    out = []
+    for d in rnd.sample(docs, int(len(docs) * frac)):
+        while True:
+            name = (f"{rnd.choice(COURTS)}-{rnd.choice(UPISNIK)}-{rnd.randrange(100, 100000)}-"
+                    f"{rnd.randrange(2008, 2025)}.txt")
+            if name not in names:
+                break
+        names.add(name)
+        ps = d.text.split("\n\n")
+        edit = rnd.choice(("reflow", "drop", "words", "footer"))
+        if edit == "reflow":
+            ps = [p.replace(". ", ".\n") for p in ps]
+        elif edit == "drop":
+            hits = set(HITS[d.category][0] + HITS[d.category][1])
+            keep = [i for i, p in enumerate(ps) if p not in hits]
+            if len(keep) > 8:
+                del ps[rnd.choice(keep)]
+        elif edit == "words":
+            i = rnd.randrange(len(ps))
+            words = ps[i].split(" ")
+            for _ in range(rnd.randint(1, 3)):
+                words[rnd.randrange(len(words))] = str(rnd.randrange(10, 1000))
+            ps[i] = " ".join(words)
+        else:
+            ps.append(f"Objavljeno {rnd.randrange(1, 29)}.{rnd.randrange(1, 13)}.{rnd.randrange(2010, 2025)}. godine.")
+        out.append(SynthDoc(name, "\n\n".join(ps), d.category, d.script, duplicate_of=d.name))
+    return out
+
+
+# --- render ---
+
+def render_txt(text: str) -> bytes:
+    return text.encode("utf-8")
+
+
+def render_docx(text: str) -> bytes:
+    body = "".join(f'<w:p><w:r><w:t xml:space="preserve">{escape(p)}</w:t></w:r></w:p>' for p in text.split("\n\n"))
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        z.writestr("[Content_Types].xml",
+                   '<?xml version="1.0" encoding="UTF-8"?><Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                   '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                   '<Default Extension="xml" ContentType="application/xml"/>'
+                   '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/></Types>')
+        z.writestr("_rels/.rels",
+                   '<?xml version="1.0" encoding="UTF-8"?><Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                   '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/></Relationships>')
+        z.writestr("word/document.xml",
+                   '<?xml version="1.0" encoding="UTF-8"?><w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                   f"<w:body>{body}</w:body></w:document>")
+    return buf.getvalue()
+
+
+def render_odt(text: str) -> bytes:
+    body = "".join(f"<text:p>{escape(p)}</text:p>" for p in text.split("\n\n"))
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        # mimetype mora biti prvi i nekompresovan
+        z.writestr(zipfile.ZipInfo("mimetype"), "application/vnd.oasis.opendocument.text", zipfile.ZIP_STORED)
+        z.writestr("META-INF/manifest.xml",
+                   '<?xml version="1.0" encoding="UTF-8"?><manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0">'
+                   '<manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.text"/>'
+                   '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/></manifest:manifest>')
+        z.writestr("content.xml",
+                   '<?xml version="1.0" encoding="UTF-8"?><office:document-content '
+                   'xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+                   'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">'
+                   f"<office:body><office:text>{body}</office:text></office:body></office:document-content>")
+    return buf.getvalue()
+
+
+PDF_LINES_PER_PAGE = 50
+PDF_LINE_CHARS = 95
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def render_pdf(text: str) -> bytes:
+    """Minimalan PDF sa Helvetica fontom (bez ugradjenih fontova), pa se tekst svodi na
+    ASCII (cirilica transliterovana, bez dijakritika): meri se brzina ekstrakcije, ne verno pismo."""
+    lines = []
+    for p in text.split("\n\n"):
+        p = strip_diacritics(p.translate(CYR2LAT)).encode("ascii", "replace").decode("ascii")
+        while len(p) > PDF_LINE_CHARS:
+            cut = p.rfind(" ", 0, PDF_LINE_CHARS)
+            cut = cut if cut > 0 else PDF_LINE_CHARS
+            lines.append(p[:cut])
+            p = p[cut:].lstrip()
+        lines.append(p)
+        lines.append("")
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, max(len(lines), 1), PDF_LINES_PER_PAGE)]
+
+    objs = {1: b"<< /Type /Catalog /Pages 2 0 R >>",
+            3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"}
+    kids = []
+    for i, page in enumerate(pages):
+        pid, cid = 4 + 2 * i, 5 + 2 * i
+        kids.append(f"{pid} 0 R")
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 800 Td"] + [f"({_pdf_escape(ln)}) Tj T*" for ln in page] + ["ET"]
+        stream = "\n".join(ops).encode("latin-1")
+        objs[pid] = (f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+                     f"/Resources << /Font << /F1 3 0 R >> >> /Contents {cid} 0 R >>").encode()
+        objs[cid] = b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream"
+    objs[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = {}
+    for num in sorted(objs):
+        offsets[num] = len(out)
+        out += b"%d 0 obj\n" % num + objs[num] + b"\nendobj\n"
+    xref = len(out)
+    n = max(objs) + 1
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % n
+    for num in range(1, n):
+        out += b"%010d 00000 n \n" % offsets[num]
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (n, xref)
+    return bytes(out)
+
+
+RENDERERS = {"txt": render_txt, "docx": render_docx, "odt": render_odt, "pdf": render_pdf}
+
+
+def render(doc: SynthDoc, fmt: str) -> tuple[str, bytes]:
+    """-> (ime fajla sa ekstenzijom formata, bajtovi)."""
+    base = os.path.splitext(doc.name)[0]
+    return f"{base}.{fmt}", RENDERERS[fmt](doc.text)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Deterministic synthetic Serbian court decisions.")
+    ap.add_argument("out_dir")
+    ap.add_argument("--docs", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--formats", default="txt")
+    args = ap.parse_args(argv)
+
+    fmts = [f.strip() for f in args.formats.split(",") if f.strip()]
+    bad = [f for f in fmts if f not in RENDERERS]
+    if bad:
+        raise SystemExit(f"Unknown formats: {', '.join(bad)} (choose from {', '.join(RENDERERS)})")
+    os.makedirs(args.out_dir, exist_ok=True)
+    nbytes = 0
+    for d in generate(args.docs, args.seed):
+        for fmt in fmts:
+            name, data = render(d, fmt)
+            with open(os.path.join(args.out_dir, name), "wb") as f:
+                f.write(data)
+            nbytes += len(data)
+    print(f"Wrote {args.docs} docs x {len(fmts)} formats to {args.out_dir} ({nbytes/1e6:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import os, re
+from functools import lru_cache
+
+# Zajednicki tokenizer za indeks i upite: cirilica -> latinica, bez dijakritika (jedna
+# translate tabela), opciono lako skidanje srpskih nastavaka. "gruba nepažnja",
+# "gruba nepaznja" i "груба непажња" daju iste termine. Podesavanje se upisuje u meta.json
+# indeksa, pa upiti uvek koriste isti tokenizer kao indeks; indeks bez tog polja
+# (stari format, pickle) koristi LEGACY (samo lowercase, kao ranije normalize()).
+# TOKEN_STEM=1 ukljucuje nastavke pri build_index.py; TOKEN_CACHE_SIZE = broj kesiranih termina.
+TOKEN_STEM = os.environ.get("TOKEN_STEM", "0") == "1"
+TOKEN_CACHE_SIZE = int(os.environ.get("TOKEN_CACHE_SIZE", "200000"))
+
+# tokeni se traze u originalnom tekstu (IGNORECASE), a lower() ide po tokenu: lower() celog
+# teksta moze da promeni duzinu ("İ" -> "i" + U+0307) i pomeri pozicije tokena
+TOKEN_RE = re.compile(r"[0-9a-zA-Zа-яА-ЯђјљњћџЂЈЉЊЋЏčćšđžČĆŠĐŽ]+", re.IGNORECASE)
+LEGACY_TOKEN_RE = re.compile(r"[0-9a-zA-Zа-яА-ЯčćšđžČĆŠĐŽ]+", re.IGNORECASE)
+
+# posle lower(): đ/ђ -> dj (kako se pise bez dijakritika), ostalo slovo za slovo;
+# tacka iz lower("İ") otpada
+FOLD = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "ђ": "dj", "е": "e", "ж": "z", "з": "z", "и": "i",
+    "ј": "j", "к": "k", "л": "l", "љ": "lj", "м": "m", "н": "n", "њ": "nj", "о": "o", "п": "p", "р": "r",
+    "с": "s", "т": "t", "ћ": "c", "у": "u", "ф": "f", "х": "h", "ц": "c", "ч": "c", "џ": "dz", "ш": "s",
+    "č": "c", "ć": "c", "š": "s", "ž": "z", "đ": "dj", "\u0307": "",
+})
+
+# najduzi nastavak prvi; koren mora da ostane bar STEM_MIN slova
+SUFFIXES = sorted((
+    "ovima", "evima", "ijama", "ijem", "ijeg", "ijoj", "ima", "ama", "ovi", "evi", "ova", "eva",
+    "oga", "ega", "omu", "emu", "ome", "om", "em", "og", "eg", "oj", "ih", "im", "a", "e", "i", "o", "u",
+), key=len, reverse=True)
+STEM_MIN = 3
+
+
+def stem(t: str) -> str:
+    if t.isdigit():
+        return t
+    for s in SUFFIXES:
+        if t.endswith(s) and len(t) - len(s) >= STEM_MIN:
+            return t[:-len(s)]
+    return t
+
+
+class Tokenizer:
+    """spans(text) -> [(termin, char_start)] u originalnom tekstu; tokens(text) -> [termin]."""
+
+    VERSION = 1
+
+    def __init__(self, fold: bool = True, stem: bool = TOKEN_STEM, cache_size: int = TOKEN_CACHE_SIZE):
+        self.fold, self.stem = fold, stem
+        self.token_re = TOKEN_RE if fold else LEGACY_TOKEN_RE
+        self.term = lru_cache(maxsize=cache_size)(self._term)
+
+    def _term(self, tok: str) -> str:
+        tok = tok.lower()
+        if self.fold:
+            tok = tok.translate(FOLD)
+        return stem(tok) if self.stem else tok
+
+    def spans(self, text: str):
+        term = self.term
+        return [(term(m.group()), m.start()) for m in self.token_re.finditer(text)]
+
+    def tokens(self, text: str):
+        term = self.term
+        return [term(t) for t in self.token_re.findall(text)]
+
+    def config(self) -> dict | None:
+        if not self.fold:
+            return None
+        return {"version": self.VERSION, "fold": True, "stem": self.stem}
+
+    @classmethod
+    def from_config(cls, cfg: dict | None) -> "Tokenizer":
+        if not cfg:
+            return LEGACY
+        if cfg.get("version") != cls.VERSION:
+            raise ValueError(f"Unsupported tokenizer version: {cfg.get('version')}")
+        return cls(fold=cfg.get("fold", True), stem=cfg.get("stem", False))
+
+
+# ranije ponasanje (normalize() u api.py/search_bm25.py): bez preslikavanja pisma
+LEGACY = Tokenizer(fold=False, stem=False)